@@ -24,8 +24,11 @@ from app.db.universal_models import LogEntry
 from app.integrations.alert_creation_settings.models.alert_creation_settings import (
     AlertCreationSettings,
 )
+from app.integrations.mimecast.models.mimecast import MimecastCheckpoint
 from app.integrations.models.customer_integration_settings import CustomerIntegrations
 from app.integrations.monitoring_alert.models.monitoring_alert import MonitoringAlerts
+from app.integrations.sap_siem.models.sap_siem import SapSiemCheckpoint
+from app.integrations.sap_siem.models.sap_siem import SapSiemDedupEntry
 from app.network_connectors.models.network_connectors import AvailableNetworkConnectors
 from app.network_connectors.models.network_connectors import (
     AvailableNetworkConnectorsKeys,
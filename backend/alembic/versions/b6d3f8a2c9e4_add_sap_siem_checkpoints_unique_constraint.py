@@ -0,0 +1,42 @@
+"""Add SAP SIEM Checkpoints Unique Constraint
+
+Revision ID: b6d3f8a2c9e4
+Revises: 8e5c2a9d7f41
+Create Date: 2024-05-20 09:18:55.240318
+
+"""
+from typing import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b6d3f8a2c9e4"
+down_revision: Union[str, None] = "8e5c2a9d7f41"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep only the most advanced checkpoint of runs that created the same checkpoint at the same time
+    op.execute(
+        """
+        DELETE older FROM sap_siem_checkpoints AS older
+        JOIN sap_siem_checkpoints AS newer
+            ON older.customer_code = newer.customer_code
+            AND older.checkpoint_name = newer.checkpoint_name
+            AND older.scope = newer.scope
+            AND (
+                (older.last_event_timestamp, older.last_event_id) < (newer.last_event_timestamp, newer.last_event_id)
+                OR (
+                    (older.last_event_timestamp, older.last_event_id) = (newer.last_event_timestamp, newer.last_event_id)
+                    AND older.id < newer.id
+                )
+            )
+        """,
+    )
+    op.create_unique_constraint("uq_sap_siem_checkpoint", "sap_siem_checkpoints", ["customer_code", "checkpoint_name", "scope"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_sap_siem_checkpoint", "sap_siem_checkpoints", type_="unique")
@@ -19,6 +19,7 @@ from app.auth.schema.auth import UserLoginResponse
 from app.auth.schema.auth import UserResponse
 from app.auth.schema.user import UserBaseResponse
 from app.auth.services.universal import find_user
+from app.auth.services.universal import invalidate_cached_user
 from app.auth.services.universal import select_all_users
 from app.auth.utils import AuthHandler
 from app.db.db_session import get_db
@@ -242,6 +243,7 @@ async def reset_password_via_username(
     user.password = hashed_pwd
     session.add(user)
     await session.commit()
+    invalidate_cached_user(user.username)
     return {"message": "Password reset successfully", "success": True}
 
 
@@ -276,4 +278,5 @@ async def reset_password_me(
     user.password = hashed_pwd
     session.add(user)
     await session.commit()
+    invalidate_cached_user(user.username)
     return {"message": "Password reset successfully", "success": True}
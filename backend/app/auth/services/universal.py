@@ -1,3 +1,9 @@
+import os
+import time
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
 from loguru import logger
 
 # ! New with Async
@@ -11,6 +17,15 @@ from app.db.db_session import async_engine
 
 passwords_in_memory = {}
 
+# Seconds an authenticated user is served from the cache. Password resets and removals through this app
+# invalidate the entry right away; the expiry bounds how stale another worker's copy can get.
+AUTH_USER_CACHE_TTL_SECONDS = int(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", 30))
+# Number of users kept in the cache
+AUTH_USER_CACHE_MAX_SIZE = int(os.getenv("AUTH_USER_CACHE_MAX_SIZE", 1024))
+
+# Cached users, keyed by username (the subject of their tokens). Unknown usernames are not cached.
+user_cache: Dict[str, Tuple[float, User]] = {}
+
 
 async def select_all_users():
     """
@@ -45,6 +60,47 @@ async def find_user(name: str):
         return None
 
 
+async def find_cached_user(name: str) -> Optional[User]:
+    """
+    Find a user by their username, serving it from the cache for `AUTH_USER_CACHE_TTL_SECONDS`.
+
+    Used to resolve the subject of a token on every request. Each call gets its own copy of the cached user,
+    so callers cannot change the cached one.
+
+    Args:
+        name (str): The username of the user to find.
+
+    Returns:
+        User: The user object if found, None otherwise.
+    """
+    cached = user_cache.get(name)
+    if cached is None or cached[0] <= time.monotonic():
+        user = await find_user(name)
+        if user is None:
+            user_cache.pop(name, None)
+            return None
+        if name not in user_cache and len(user_cache) >= AUTH_USER_CACHE_MAX_SIZE:
+            # Drop the user cached first
+            del user_cache[next(iter(user_cache))]
+        cached = (time.monotonic() + AUTH_USER_CACHE_TTL_SECONDS, User(**user.dict()))
+        user_cache[name] = cached
+    return User(**cached[1].dict())
+
+
+def invalidate_cached_user(name: Optional[str] = None) -> None:
+    """
+    Drops the cached user, e.g. after their password changed or they were removed. Drops all of them if
+    no username is given.
+
+    Args:
+        name (Optional[str]): The username of the user that changed.
+    """
+    if name is None:
+        user_cache.clear()
+        return
+    user_cache.pop(name, None)
+
+
 async def get_role(name: str):
     """
     Retrieve the role name for a given user name.
@@ -182,6 +238,7 @@ async def remove_scheduler_user(session: AsyncSession):
         # Remove the scheduler user
         await session.delete(scheduler_user)
         await session.commit()  # This is awaited because commit is async
+        invalidate_cached_user(scheduler_user.username)
         logger.info("Scheduler user removed.")
     else:
         logger.info("Scheduler user does not exist.")
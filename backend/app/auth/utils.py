@@ -9,6 +9,7 @@ from fastapi.security import SecurityScopes
 from loguru import logger
 from passlib.context import CryptContext
 
+from app.auth.services.universal import find_cached_user
 from app.auth.services.universal import find_user
 from app.auth.services.universal import get_role
 
@@ -220,7 +221,7 @@ class AuthHandler:
                 detail="Username not found in token",
                 headers={"WWW-Authenticate": authenticate_value},
             )
-        user = await find_user(username)
+        user = await find_cached_user(username)
 
         if user is None:
             raise HTTPException(
@@ -1,3 +1,5 @@
+import asyncio
+import os
 from typing import Any
 from typing import Callable
 from typing import Dict
@@ -21,6 +23,11 @@ from loguru import logger
 from app.connectors.utils import get_connector_info_from_db
 from app.db.db_session import get_db_session
 
+# Maximum number of requests sent to DFIR-IRIS at the same time
+DFIR_IRIS_MAX_CONCURRENT_REQUESTS = int(os.getenv("DFIR_IRIS_MAX_CONCURRENT_REQUESTS", 4))
+# The IRIS client is synchronous, so its requests run in worker threads, limited by this semaphore
+iris_request_semaphore = asyncio.Semaphore(DFIR_IRIS_MAX_CONCURRENT_REQUESTS)
+
 
 async def verify_dfir_iris_credentials(attributes: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -125,7 +132,8 @@ async def fetch_and_parse_data(
     """
     try:
         logger.info(f"Executing {action.__name__}... on args: {args} and kwargs: {kwargs}")
-        status = action(*args, **kwargs)
+        async with iris_request_semaphore:
+            status = await asyncio.to_thread(action, *args, **kwargs)
         assert_api_resp(status, soft_fail=False)
         data = get_data_from_resp(status)
         logger.info(f"Successfully executed {action.__name__}")
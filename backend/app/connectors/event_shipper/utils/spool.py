@@ -0,0 +1,230 @@
+import asyncio
+import json
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Awaitable
+from typing import Callable
+from typing import List
+from typing import Optional
+
+import aiofiles
+from loguru import logger
+
+# Each record is stored as: 4 byte payload length | 4 byte CRC32 of the payload | payload (JSON)
+RECORD_HEADER = struct.Struct(">II")
+SEGMENT_PREFIX = "segment_"
+SEGMENT_SUFFIX = ".spool"
+CURSOR_FILENAME = "replay.cursor"
+
+DEFAULT_SPOOL_DIRECTORY = Path(__file__).resolve().parents[4] / "data" / "event_shipper_spool"
+
+
+class EventSpool:
+    """
+    Append-only on-disk spool for events that could not be delivered to the Graylog GELF input.
+
+    Events are written to numbered segment files as length and checksum prefixed records. Replay reads
+    the segments oldest first, so events reach Graylog in the order they were collected. Fully replayed
+    segments are deleted and a cursor file remembers the position inside a partially replayed segment.
+    When the spool grows past `max_bytes` the oldest segments are dropped.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: int = 1024 * 1024 * 1024,
+        segment_bytes: int = 16 * 1024 * 1024,
+    ):
+        self.directory = Path(directory) if directory else DEFAULT_SPOOL_DIRECTORY
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.lock = asyncio.Lock()
+        self.replay_lock = asyncio.Lock()
+        # Segments numbered up to this value are being replayed and no longer accept appends
+        self.sealed_segment = 0
+        self.dropped_bytes = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Bytes held in the segments, kept up to date on append, drop and replay so the hot path never stats
+        # the segment files
+        self.spooled_bytes = sum(segment.stat().st_size for segment in self._segments())
+
+    def _segments(self) -> List[Path]:
+        return sorted(self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"))
+
+    def _segment_number(self, segment: Path) -> int:
+        return int(segment.name[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)])
+
+    def _new_segment(self, number: int) -> Path:
+        return self.directory / f"{SEGMENT_PREFIX}{number:012d}{SEGMENT_SUFFIX}"
+
+    def pending_bytes(self) -> int:
+        """
+        Returns the number of bytes currently held in the spool.
+        """
+        return self.spooled_bytes
+
+    def is_empty(self) -> bool:
+        return self.spooled_bytes == 0
+
+    async def _read_cursor(self) -> Optional[tuple]:
+        cursor_path = self.directory / CURSOR_FILENAME
+        if not cursor_path.exists():
+            return None
+        async with aiofiles.open(cursor_path, "r") as f:
+            content = (await f.read()).strip()
+        if not content:
+            return None
+        segment_name, offset = content.rsplit(":", 1)
+        return segment_name, int(offset)
+
+    async def _write_cursor(self, segment: Path, offset: int) -> None:
+        async with aiofiles.open(self.directory / CURSOR_FILENAME, "w") as f:
+            await f.write(f"{segment.name}:{offset}")
+
+    def _clear_cursor(self) -> None:
+        cursor_path = self.directory / CURSOR_FILENAME
+        if cursor_path.exists():
+            os.remove(cursor_path)
+
+    def _enforce_size_cap(self, incoming: int) -> None:
+        segments = self._segments()
+        total = sum(segment.stat().st_size for segment in segments)
+        # Never drop the active (newest) segment, only the ones already closed
+        while segments[:-1] and total + incoming > self.max_bytes:
+            oldest = segments.pop(0)
+            size = oldest.stat().st_size
+            logger.warning(f"Event shipper spool is full, dropping oldest segment {oldest.name} ({size} bytes)")
+            os.remove(oldest)
+            self.dropped_bytes += size
+            self.spooled_bytes -= size
+            total -= size
+
+    async def append(self, message: dict) -> None:
+        """
+        Appends an event to the newest segment, rolling over to a new segment when it is full.
+
+        Args:
+            message (dict): The event to spool.
+        """
+        await self.extend([message])
+
+    async def extend(self, messages: List[dict]) -> None:
+        """
+        Appends the events, in order, to the newest segment, rolling over to a new segment when it is full.
+        The events are written under a single lock, keeping the segment open between records.
+
+        Args:
+            messages (List[dict]): The events to spool.
+        """
+        records = []
+        for message in messages:
+            payload = json.dumps(message, default=str).encode("utf-8")
+            records.append(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        async with self.lock:
+            f = None
+            segment = None
+            try:
+                for record in records:
+                    self._enforce_size_cap(len(record))
+                    segments = self._segments()
+                    if not segments:
+                        target = self._new_segment(1)
+                    elif (
+                        self._segment_number(segments[-1]) <= self.sealed_segment
+                        or segments[-1].stat().st_size + len(record) > self.segment_bytes
+                    ):
+                        target = self._new_segment(self._segment_number(segments[-1]) + 1)
+                    else:
+                        target = segments[-1]
+                    if target != segment:
+                        if f is not None:
+                            await f.close()
+                        segment = target
+                        f = await aiofiles.open(segment, "ab")
+                    await f.write(record)
+                    # Flushed per record so the size checks above see what was written
+                    await f.flush()
+                    self.spooled_bytes += len(record)
+            finally:
+                if f is not None:
+                    await f.close()
+
+    async def replay(self, send: Callable[[dict], Awaitable[None]]) -> int:
+        """
+        Replays spooled events in order through `send`.
+
+        Replay stops at the first event that `send` fails to deliver, leaving it and everything after it
+        in the spool. Records with a bad checksum or a truncated tail are logged and skipped.
+
+        Args:
+            send (Callable[[dict], Awaitable[None]]): Coroutine that delivers one event and raises on failure.
+
+        Returns:
+            int: The number of events replayed.
+
+        Raises:
+            Exception: The delivery error that stopped the replay.
+        """
+        replayed = 0
+        async with self.replay_lock:
+            # Seal the current segments so new events are appended to a fresh segment while we replay
+            async with self.lock:
+                segments = self._segments()
+                if segments:
+                    self.sealed_segment = self._segment_number(segments[-1])
+            cursor = await self._read_cursor()
+            for segment in segments:
+                offset = cursor[1] if cursor and cursor[0] == segment.name else 0
+                if not segment.exists():
+                    # Dropped by the size cap while we were replaying
+                    continue
+                async with aiofiles.open(segment, "rb") as f:
+                    await f.seek(offset)
+                    while True:
+                        header = await f.read(RECORD_HEADER.size)
+                        if len(header) < RECORD_HEADER.size:
+                            break
+                        length, checksum = RECORD_HEADER.unpack(header)
+                        payload = await f.read(length)
+                        if len(payload) < length:
+                            logger.error(f"Truncated record at offset {offset} in spool segment {segment.name}, skipping the remainder")
+                            break
+                        if zlib.crc32(payload) != checksum:
+                            logger.error(f"Checksum mismatch at offset {offset} in spool segment {segment.name}, skipping record")
+                        else:
+                            try:
+                                await send(json.loads(payload))
+                            except Exception as e:
+                                logger.warning(f"Replay of spooled events stopped after {replayed} events: {e}")
+                                await self._write_cursor(segment, offset)
+                                raise
+                            replayed += 1
+                        offset += RECORD_HEADER.size + length
+                async with self.lock:
+                    if segment.exists():
+                        self.spooled_bytes -= segment.stat().st_size
+                        os.remove(segment)
+            self._clear_cursor()
+        if replayed:
+            logger.info(f"Replayed {replayed} spooled events to the event shipper")
+        return replayed
+
+
+# Global variable to hold the spool instance
+spool_instance = None
+
+
+def get_event_spool() -> EventSpool:
+    """
+    Returns the process wide event spool, creating it from the environment on first use.
+    """
+    global spool_instance
+    if spool_instance is None:
+        spool_instance = EventSpool(
+            directory=os.getenv("EVENT_SHIPPER_SPOOL_DIR"),
+            max_bytes=int(os.getenv("EVENT_SHIPPER_SPOOL_MAX_BYTES", 1024 * 1024 * 1024)),
+            segment_bytes=int(os.getenv("EVENT_SHIPPER_SPOOL_SEGMENT_BYTES", 16 * 1024 * 1024)),
+        )
+    return spool_instance
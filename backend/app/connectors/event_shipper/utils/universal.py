@@ -1,19 +1,163 @@
+import asyncio
+import gzip
+import json
+import math
+import os
+import socket
+import zlib
+from typing import Dict
+from typing import List
 from typing import Optional
+from typing import Tuple
 
 import asyncgelf
+from loguru import logger
 
 from app.connectors.utils import get_connector_info_from_db
 from app.db.db_session import get_db_session
 
+# GELF chunking, see https://go2docs.graylog.org/current/getting_in_log_data/gelf.html
+GELF_CHUNK_MAGIC = b"\x1e\x0f"
+GELF_CHUNK_HEADER_SIZE = 12  # magic (2) + message id (8) + sequence number (1) + sequence count (1)
+GELF_MAX_CHUNKS = 128
+GELF_UDP_CHUNK_SIZE = int(os.getenv("EVENT_SHIPPER_UDP_CHUNK_SIZE", 8154))
+
+# Datagram transports are reused across messages, keyed by (host, port)
+udp_transports: Dict[Tuple[str, int], asyncio.DatagramTransport] = {}
+local_fqdn = socket.getfqdn()
+
+
+class GelfMessageTooLarge(ValueError):
+    """
+    The GELF message does not fit in the 128 chunks a UDP input reassembles.
+    """
+
+
+def build_gelf_message(message: dict) -> dict:
+    """
+    Wraps the event in a GELF message, the same way asyncgelf does for the TCP transport.
+    """
+    return {
+        "version": 1.1,
+        "host": local_fqdn,
+        "short_message": json.dumps(message),
+        "level": 1,
+    }
+
+
+def compress_gelf_payload(payload: bytes, compression: Optional[str]) -> bytes:
+    if compression == "zlib":
+        return zlib.compress(payload, 1)
+    if compression == "gzip":
+        return gzip.compress(payload, compresslevel=1)
+    return payload
+
+
+def build_gelf_chunks(payload: bytes, chunk_size: int = GELF_UDP_CHUNK_SIZE) -> List[bytes]:
+    """
+    Splits a GELF payload into datagrams. Payloads that fit in a single datagram are sent unchunked.
+
+    Args:
+        payload (bytes): The (optionally compressed) GELF message.
+        chunk_size (int): The maximum size of a datagram, including the chunk header.
+
+    Returns:
+        List[bytes]: The datagrams to send.
+
+    Raises:
+        GelfMessageTooLarge: If the payload needs more than 128 chunks.
+    """
+    if len(payload) <= chunk_size:
+        return [payload]
+    data_size = chunk_size - GELF_CHUNK_HEADER_SIZE
+    total_chunks = math.ceil(len(payload) / data_size)
+    if total_chunks > GELF_MAX_CHUNKS:
+        raise GelfMessageTooLarge(f"GELF message of {len(payload)} bytes needs {total_chunks} chunks, the maximum is {GELF_MAX_CHUNKS}")
+    message_id = os.urandom(8)
+    return [
+        GELF_CHUNK_MAGIC + message_id + bytes([sequence, total_chunks]) + payload[sequence * data_size : (sequence + 1) * data_size]
+        for sequence in range(total_chunks)
+    ]
+
+
+async def get_udp_transport(host: str, port: int) -> asyncio.DatagramTransport:
+    transport = udp_transports.get((host, port))
+    if transport is None or transport.is_closing():
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(host, port))
+        udp_transports[(host, port)] = transport
+    return transport
+
 
 class GelfLogger:
-    def __init__(self, host: str, port: str, compress: Optional[bool] = False):
+    def __init__(
+        self,
+        host: str,
+        port: str,
+        compress: Optional[bool] = False,
+        transport: Optional[str] = "tcp",
+        compression: Optional[str] = None,
+    ):
         self.host = host
         self.port = port
         self.compress = compress
+        self.transport = transport
+        self.compression = compression
+
+    async def send(self, message):
+        """
+        Sends the message over the configured transport.
+        """
+        if self.transport == "udp":
+            return await self.udp_handler(message)
+        return await self.tcp_handler(message)
+
+    async def send_batch(self, messages) -> int:
+        """
+        Sends the messages over the configured transport. Over TCP all messages are written to a single
+        connection, over UDP they share the cached datagram transport.
+
+        A message that cannot be serialized is dropped and logged. Raises `ConnectionError` before anything
+        was sent when the GELF input cannot be reached.
+
+        Returns:
+            int: The number of messages sent.
+        """
+        messages = [message if isinstance(message, dict) else message.to_dict() for message in messages]
+        sendable = []
+        for message in messages:
+            try:
+                json.dumps(message)
+            except (TypeError, ValueError) as e:
+                logger.error(f"Dropping message that could not be sent to log shipper: {e}")
+                continue
+            sendable.append(message)
+
+        over_tcp = sendable
+        if self.transport == "udp":
+            over_tcp = []
+            transport = await get_udp_transport(self.host, int(self.port))
+            for message in sendable:
+                payload = compress_gelf_payload(json.dumps(build_gelf_message(message)).encode("utf-8"), self.compression)
+                try:
+                    datagrams = build_gelf_chunks(payload)
+                except GelfMessageTooLarge as e:
+                    logger.warning(f"{e}, sending it over TCP instead")
+                    over_tcp.append(message)
+                    continue
+                for datagram in datagrams:
+                    transport.sendto(datagram)
+        if over_tcp:
+            await self.tcp_handler(over_tcp)
+        return len(sendable)
 
     async def tcp_handler(self, message):
-        if not isinstance(message, dict):
+        """
+        Sends the message, or a list of messages over a single connection, as GELF over TCP.
+        """
+        if isinstance(message, list):
+            message = [item if isinstance(item, dict) else item.to_dict() for item in message]
+        elif not isinstance(message, dict):
             message = message.to_dict()
 
         handler = asyncgelf.GelfTcp(
@@ -23,13 +167,37 @@ class GelfLogger:
         )
 
         response = await handler.tcp_handler(message)
+        # asyncgelf returns the connection error as a string instead of raising it
+        if response is not None:
+            raise ConnectionError(f"Failed to connect to GELF input {self.host}:{self.port}: {response}")
         return response
 
+    async def udp_handler(self, message):
+        """
+        Sends the message as (optionally compressed) GELF over UDP, chunking it when it does not fit
+        in a single datagram. UDP does not block on a slow input, but delivery is not acknowledged.
+        A message too large for 128 chunks is sent over TCP instead.
+        """
+        if not isinstance(message, dict):
+            message = message.to_dict()
+
+        payload = compress_gelf_payload(json.dumps(build_gelf_message(message)).encode("utf-8"), self.compression)
+        try:
+            datagrams = build_gelf_chunks(payload)
+        except GelfMessageTooLarge as e:
+            logger.warning(f"{e}, sending it over TCP instead")
+            return await self.tcp_handler(message)
+        transport = await get_udp_transport(self.host, int(self.port))
+        for datagram in datagrams:
+            transport.sendto(datagram)
+
 
-async def create_gelf_logger():
+async def create_gelf_logger(transport: Optional[str] = "tcp", compression: Optional[str] = None):
     async with get_db_session() as session:
         connector_info = await get_connector_info_from_db("Event Shipper", session)
     return GelfLogger(
         host=connector_info["connector_url"],
         port=str(connector_info["connector_extra_data"]),
+        transport=transport,
+        compression=compression,
     )
@@ -22,6 +22,7 @@ from app.connectors.models import Connectors
 from app.connectors.schema import ConnectorResponse
 from app.connectors.shuffle.utils.universal import verify_shuffle_connection
 from app.connectors.sublime.utils.universal import verify_sublime_connection
+from app.connectors.utils import connector_cache
 from app.connectors.velociraptor.utils.universal import verify_velociraptor_connection
 from app.connectors.wazuh_indexer.utils.universal import verify_wazuh_indexer_connection
 from app.connectors.wazuh_manager.utils.universal import verify_wazuh_manager_connection
@@ -340,6 +341,7 @@ class ConnectorServices:
                     connector.connector_last_updated = datetime.now()
                     session.add(connector)
                     await session.commit()
+                connector_cache.invalidate()
 
             else:
                 logger.error(
@@ -392,6 +394,7 @@ class ConnectorServices:
             # Commit the changes to the database
             session.add(connector_record)
             await session.commit()
+            connector_cache.invalidate()
 
             # Convert the SQLModel object to a Pydantic model
             connector_response = ConnectorResponse.from_orm(connector_record)
@@ -450,6 +453,7 @@ class ConnectorServices:
                 connector_record.connector_api_key = file_path
                 session.add(connector_record)
                 await session.commit()
+                connector_cache.invalidate()
 
                 connector_response = ConnectorResponse.from_orm(connector_record)
                 return connector_response
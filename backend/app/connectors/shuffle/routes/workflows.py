@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 from fastapi import HTTPException
+from fastapi import Query
 from fastapi import Security
 from loguru import logger
 
@@ -8,7 +9,9 @@ from app.connectors.shuffle.schema.workflows import RequestWorkflowExecutionMode
 from app.connectors.shuffle.schema.workflows import RequestWorkflowExecutionResponse
 from app.connectors.shuffle.schema.workflows import WorkflowExecutionBodyModel
 from app.connectors.shuffle.schema.workflows import WorkflowExecutionResponseModel
+from app.connectors.shuffle.schema.workflows import WorkflowExecutionStateResponse
 from app.connectors.shuffle.schema.workflows import WorkflowsResponse
+from app.connectors.shuffle.services.executions import get_workflow_execution
 from app.connectors.shuffle.services.workflows import execute_workflow
 from app.connectors.shuffle.services.workflows import get_workflow_executions
 from app.connectors.shuffle.services.workflows import get_workflows
@@ -102,20 +105,25 @@ async def get_all_workflow_executions() -> WorkflowExecutionResponseModel:
 @shuffle_workflows_router.post(
     "/execute",
     response_model=RequestWorkflowExecutionResponse,
-    description="Execute a workflow",
+    description="Execute a workflow. Returns the execution right away, unless `wait` is set, "
+    "in which case it waits up to `timeout` seconds for the execution to finish.",
     dependencies=[Security(AuthHandler().require_any_scope("admin", "analyst"))],
 )
 async def execute_workflow_request(
     workflow_execution_body: RequestWorkflowExecutionModel,
+    wait: bool = Query(False, description="Wait for the execution to finish"),
+    timeout: float = Query(60, gt=0, description="How long to wait for the execution, in seconds"),
 ) -> RequestWorkflowExecutionResponse:
     """
     Execute a workflow.
 
     Args:
         workflow_execution_body (WorkflowExecutionBodyModel): The workflow execution body model.
+        wait (bool): Whether to wait for the execution to finish.
+        timeout (float): How long to wait for the execution, in seconds.
 
     Returns:
-        RequestWorkflowExecutionResponse: The response model containing the workflow executions.
+        RequestWorkflowExecutionResponse: The response containing the state of the execution.
 
     Raises:
         HTTPException: If the workflow is not found.
@@ -124,8 +132,62 @@ async def execute_workflow_request(
 
     await validate_execution_id(workflow_execution_body.workflow_id)
 
+    handle = await execute_workflow(workflow_execution_body)
+    state = await handle.wait(timeout) if wait else handle.state()
     return RequestWorkflowExecutionResponse(
+        success=state.status == "FINISHED" if wait else True,
+        message="Successfully executed workflow" if state.done else "Workflow execution started",
+        data=state.dict(),
+    )
+
+
+@shuffle_workflows_router.get(
+    "/executions/{execution_id}",
+    response_model=WorkflowExecutionStateResponse,
+    description="Get the state of a workflow execution started through CoPilot",
+    dependencies=[Security(AuthHandler().require_any_scope("admin", "analyst"))],
+)
+async def get_workflow_execution_state(execution_id: str) -> WorkflowExecutionStateResponse:
+    """
+    Get the current state of a workflow execution.
+
+    Args:
+        execution_id (str): The ID of the workflow execution.
+
+    Returns:
+        WorkflowExecutionStateResponse: The response containing the state of the execution.
+    """
+    state = get_workflow_execution(execution_id).state()
+    return WorkflowExecutionStateResponse(
         success=True,
-        message="Successfully executed workflow",
-        data=await execute_workflow(workflow_execution_body),
+        message="Successfully fetched workflow execution",
+        execution=state,
+    )
+
+
+@shuffle_workflows_router.get(
+    "/executions/{execution_id}/wait",
+    response_model=WorkflowExecutionStateResponse,
+    description="Wait up to `timeout` seconds for a workflow execution started through CoPilot to finish",
+    dependencies=[Security(AuthHandler().require_any_scope("admin", "analyst"))],
+)
+async def wait_for_workflow_execution(
+    execution_id: str,
+    timeout: float = Query(60, gt=0, description="How long to wait for the execution, in seconds"),
+) -> WorkflowExecutionStateResponse:
+    """
+    Wait for a workflow execution to finish.
+
+    Args:
+        execution_id (str): The ID of the workflow execution.
+        timeout (float): How long to wait for the execution, in seconds.
+
+    Returns:
+        WorkflowExecutionStateResponse: The response containing the state of the execution.
+    """
+    state = await get_workflow_execution(execution_id).wait(timeout)
+    return WorkflowExecutionStateResponse(
+        success=state.done,
+        message="Workflow execution finished" if state.done else "Workflow execution is still running",
+        execution=state,
     )
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Any
 from typing import Dict
 from typing import List
@@ -64,3 +65,20 @@ class RequestWorkflowExecutionResponse(BaseModel):
     message: str = Field(..., description="Response message")
     success: bool = Field(..., description="Success status")
     data: Dict[str, Any] = Field(..., description="Data object")
+
+
+class WorkflowExecutionState(BaseModel):
+    execution_id: str = Field(..., description="The unique identifier for the workflow execution")
+    workflow_id: str = Field(..., description="Unique identifier for the workflow")
+    status: str = Field(..., description="The last status reported by Shuffle, e.g. EXECUTING, FINISHED or ABORTED")
+    done: bool = Field(..., description="Whether the execution stopped being tracked")
+    started_at: datetime = Field(..., description="When the execution was started")
+    finished_at: Optional[datetime] = Field(None, description="When the execution stopped being tracked")
+    result: Optional[Dict[str, Any]] = Field(None, description="The execution results once it finished")
+    error: Optional[str] = Field(None, description="Why tracking the execution failed, if it did")
+
+
+class WorkflowExecutionStateResponse(BaseModel):
+    message: str = Field(..., description="Response message")
+    success: bool = Field(..., description="Success status")
+    execution: WorkflowExecutionState = Field(..., description="The state of the workflow execution")
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from datetime import timedelta
+from typing import AsyncIterator
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from fastapi import HTTPException
+from loguru import logger
+
+from app.connectors.shuffle.schema.workflows import ExecuteWorklow
+from app.connectors.shuffle.schema.workflows import WorkflowExecutionState
+from app.connectors.shuffle.utils.universal import send_post_request
+
+# Seconds between two polls of a running execution, doubling from the first up to the second value
+SHUFFLE_EXECUTION_POLL_INTERVAL = float(os.getenv("SHUFFLE_EXECUTION_POLL_INTERVAL", 1))
+SHUFFLE_EXECUTION_MAX_POLL_INTERVAL = float(os.getenv("SHUFFLE_EXECUTION_MAX_POLL_INTERVAL", 5))
+# Seconds after which an execution that did not finish stops being polled
+SHUFFLE_EXECUTION_TIMEOUT = int(os.getenv("SHUFFLE_EXECUTION_TIMEOUT", 300))
+# Seconds a finished execution can still be looked up
+SHUFFLE_EXECUTION_RETENTION = int(os.getenv("SHUFFLE_EXECUTION_RETENTION", 3600))
+
+# Statuses after which Shuffle no longer updates an execution
+FINAL_EXECUTION_STATUSES = {"FINISHED", "ABORTED", "FAILURE"}
+
+
+class WorkflowExecutionHandle:
+    """
+    Tracks a workflow execution running in Shuffle. A background task polls its results, while callers
+    wait for it, read its current state or subscribe to its status changes.
+    """
+
+    def __init__(self, execution: ExecuteWorklow, workflow_id: str):
+        self.execution = execution
+        self.execution_id = str(execution.execution_id)
+        self.workflow_id = workflow_id
+        self.status = "EXECUTING"
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.started_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self.done = asyncio.Event()
+        self.subscribers: List[asyncio.Queue] = []
+        self.task: Optional[asyncio.Task] = None
+
+    def state(self) -> WorkflowExecutionState:
+        return WorkflowExecutionState(
+            execution_id=self.execution_id,
+            workflow_id=self.workflow_id,
+            status=self.status,
+            done=self.done.is_set(),
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            result=self.result,
+            error=self.error,
+        )
+
+    def update(self, status: str, result: Optional[dict] = None, error: Optional[str] = None, done: bool = False) -> None:
+        """
+        Records the status of the execution and notifies the subscribers if it changed.
+        """
+        if status == self.status and not done:
+            return
+        self.status = status
+        if done:
+            self.result = result
+            self.error = error
+            self.finished_at = datetime.utcnow()
+            self.done.set()
+        state = self.state()
+        for queue in self.subscribers:
+            queue.put_nowait(state)
+
+    async def wait(self, timeout: Optional[float] = None) -> WorkflowExecutionState:
+        """
+        Waits until the execution is done, or until `timeout` seconds passed, and returns its state.
+        """
+        try:
+            await asyncio.wait_for(self.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.state()
+
+    async def subscribe(self) -> AsyncIterator[WorkflowExecutionState]:
+        """
+        Yields the current state of the execution and then every status change, up to the final state.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self.subscribers.append(queue)
+        try:
+            state = self.state()
+            yield state
+            while not state.done:
+                state = await queue.get()
+                yield state
+        finally:
+            self.subscribers.remove(queue)
+
+
+# The tracked executions by execution ID
+workflow_executions: Dict[str, WorkflowExecutionHandle] = {}
+
+
+async def poll_workflow_execution(handle: WorkflowExecutionHandle) -> None:
+    """
+    Polls the results of the execution until it reaches a final status or `SHUFFLE_EXECUTION_TIMEOUT` passes.
+    """
+    interval = SHUFFLE_EXECUTION_POLL_INTERVAL
+    deadline = time.monotonic() + SHUFFLE_EXECUTION_TIMEOUT
+    while True:
+        try:
+            response = await send_post_request(
+                "/api/v1/streams/results",
+                {"execution_id": handle.execution_id, "authorization": str(handle.execution.authorization)},
+            )
+            if response is None:
+                handle.update(handle.status, error="No Shuffle connector found in the database", done=True)
+                return
+            data = response.get("data") or {}
+            status = data.get("status") or handle.status
+            if status in FINAL_EXECUTION_STATUSES:
+                logger.info(f"Workflow execution with ID {handle.execution_id} is {status}")
+                handle.update(status, result=data, done=True)
+                return
+            handle.update(status)
+        except Exception as e:
+            logger.error(f"Error retrieving workflow execution results: {e}")
+
+        if time.monotonic() + interval > deadline:
+            logger.info(f"Workflow execution with ID {handle.execution_id} did not finish within {SHUFFLE_EXECUTION_TIMEOUT}s")
+            handle.update(handle.status, error=f"Did not finish within {SHUFFLE_EXECUTION_TIMEOUT}s", done=True)
+            return
+        await asyncio.sleep(interval)
+        interval = min(interval * 2, SHUFFLE_EXECUTION_MAX_POLL_INTERVAL)
+
+
+def purge_finished_executions() -> None:
+    expired_before = datetime.utcnow() - timedelta(seconds=SHUFFLE_EXECUTION_RETENTION)
+    for execution_id, handle in list(workflow_executions.items()):
+        if handle.finished_at is not None and handle.finished_at < expired_before:
+            del workflow_executions[execution_id]
+
+
+def track_workflow_execution(execution: ExecuteWorklow, workflow_id: str) -> WorkflowExecutionHandle:
+    """
+    Starts polling the execution in the background and returns its handle right away.
+
+    Args:
+        execution (ExecuteWorklow): The execution returned by Shuffle when the workflow was started.
+        workflow_id (str): The ID of the workflow.
+
+    Returns:
+        WorkflowExecutionHandle: The handle to wait for, read or subscribe to.
+    """
+    purge_finished_executions()
+    handle = WorkflowExecutionHandle(execution, workflow_id)
+    workflow_executions[handle.execution_id] = handle
+    handle.task = asyncio.create_task(poll_workflow_execution(handle))
+    return handle
+
+
+def get_workflow_execution(execution_id: str) -> WorkflowExecutionHandle:
+    """
+    Returns the handle of a tracked execution.
+
+    Raises:
+        HTTPException: If the execution is not tracked, or no longer.
+    """
+    handle = workflow_executions.get(execution_id)
+    if handle is None:
+        raise HTTPException(status_code=404, detail=f"Workflow execution with ID {execution_id} not found")
+    return handle
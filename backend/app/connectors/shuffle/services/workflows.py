@@ -1,4 +1,3 @@
-import asyncio
 from typing import List
 
 from fastapi import HTTPException
@@ -9,6 +8,8 @@ from app.connectors.shuffle.schema.workflows import RequestWorkflowExecutionMode
 from app.connectors.shuffle.schema.workflows import WorkflowExecutionBodyModel
 from app.connectors.shuffle.schema.workflows import WorkflowExecutionStatusResponseModel
 from app.connectors.shuffle.schema.workflows import WorkflowsResponse
+from app.connectors.shuffle.services.executions import WorkflowExecutionHandle
+from app.connectors.shuffle.services.executions import track_workflow_execution
 from app.connectors.shuffle.utils.universal import send_get_request
 from app.connectors.shuffle.utils.universal import send_post_request
 
@@ -104,80 +105,36 @@ async def get_workflow_executions(
         )
 
 
-async def execute_workflow(workflow_execution_body: RequestWorkflowExecutionModel):
+async def execute_workflow(workflow_execution_body: RequestWorkflowExecutionModel) -> WorkflowExecutionHandle:
     """
     Execute a workflow.
 
+    The execution is tracked in the background, so the handle is returned as soon as Shuffle started it.
+
     Args:
-        workflow_execution_body (WorkflowExecutionBodyModel): The workflow execution body model.
+        workflow_execution_body (RequestWorkflowExecutionModel): The workflow execution body model.
 
     Returns:
-        WorkflowExecutionResponseModel: The response model containing the workflow executions.
+        WorkflowExecutionHandle: The handle to wait for the execution, read its state or subscribe to it.
 
     Raises:
-        HTTPException: If the workflow is not found.
+        HTTPException: If the workflow could not be executed.
     """
     logger.info(f"Executing workflow with ID: {workflow_execution_body.workflow_id}")
-    response = ExecuteWorklow(
-        **(
-            await send_post_request(
-                f"/api/v1/workflows/{workflow_execution_body.workflow_id}/execute",
-                {"execution_argument": workflow_execution_body.execution_argument},
-            )
-        )["data"],
+    response = await send_post_request(
+        f"/api/v1/workflows/{workflow_execution_body.workflow_id}/execute",
+        {"execution_argument": workflow_execution_body.execution_argument},
     )
-    logger.info(f"Response from executing workflow: {response}")
-    try:
-        if response.success:
-            workflow_completed = await wait_for_workflow_execution_results(response)
-            if workflow_completed:
-                logger.info(f"Successfully executed workflow with ID: {workflow_execution_body.workflow_id}")
-                return await get_workflow_exectution_results(response)
-        else:
-            raise HTTPException(
-                status_code=404,
-                detail="Failed to execute workflow",
-            )
-    except Exception as e:
-        logger.error(f"Failed to execute workflow with error: {e}")
+    if response is None or not response["success"]:
         raise HTTPException(
-            status_code=500,
-            detail=f"Failed to execute workflow with error: {e}",
+            status_code=404,
+            detail="Failed to execute workflow",
         )
-
-
-async def wait_for_workflow_execution_results(execution: ExecuteWorklow):
-    """
-    Function to get the workflow results until the status of `FINISHED` is reached.
-    """
-    logger.info(f"Retrieving workflow execution results for execution ID: {execution.execution_id}")
-    for i in range(10):
-        try:
-            response = await send_post_request(
-                "/api/v1/streams/results",
-                {"execution_id": str(execution.execution_id), "authorization": str(execution.authorization)},
-            )
-            status = response.get("data", {}).get("status")
-            if status == "FINISHED":
-                logger.info(f"Workflow execution with ID {execution.execution_id} has finished")
-                return True
-        except Exception as e:
-            logger.error(f"Error retrieving workflow execution results: {e}")
-        await asyncio.sleep(2**i)
-    logger.info(f"Workflow execution with ID {execution.execution_id} did not finish after 5 attempts")
-    raise HTTPException(
-        status_code=500,
-        detail=f"Workflow execution with ID {execution.execution_id} did not finish after 5 attempts",
-    )
-
-
-async def get_workflow_exectution_results(execution: ExecuteWorklow):
-    """
-    Function to get the workflow results.
-    """
-    logger.info(f"Retrieving workflow execution results for execution ID: {execution.execution_id}")
-    response = await send_post_request(
-        "/api/v1/streams/results",
-        {"execution_id": str(execution.execution_id), "authorization": str(execution.authorization)},
-    )
-    return response.get("data", {})
+    execution = ExecuteWorklow(**response["data"])
+    logger.info(f"Response from executing workflow: {execution}")
+    if not execution.success:
+        raise HTTPException(
+            status_code=404,
+            detail="Failed to execute workflow",
+        )
+    return track_workflow_execution(execution, workflow_execution_body.workflow_id)
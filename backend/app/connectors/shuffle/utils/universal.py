@@ -1,7 +1,9 @@
+import os
 from typing import Any
 from typing import Dict
 from typing import Optional
 
+import httpx
 import requests
 from fastapi import HTTPException
 from loguru import logger
@@ -9,6 +11,26 @@ from loguru import logger
 from app.connectors.utils import get_connector_info_from_db
 from app.db.db_session import get_db_session
 
+# Timeout in seconds of the requests sent to Shuffle
+SHUFFLE_REQUEST_TIMEOUT = int(os.getenv("SHUFFLE_REQUEST_TIMEOUT", 30))
+
+# Client shared by the requests sent to Shuffle, so they reuse its connections
+shuffle_client: Optional[httpx.AsyncClient] = None
+
+
+def get_shuffle_client() -> httpx.AsyncClient:
+    global shuffle_client
+    if shuffle_client is None or shuffle_client.is_closed:
+        shuffle_client = httpx.AsyncClient(verify=False, timeout=SHUFFLE_REQUEST_TIMEOUT)
+    return shuffle_client
+
+
+async def close_shuffle_client() -> None:
+    global shuffle_client
+    if shuffle_client is not None:
+        await shuffle_client.aclose()
+        shuffle_client = None
+
 
 async def verify_shuffle_credentials(attributes: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -94,11 +116,10 @@ async def send_get_request(
         HEADERS = {
             "Authorization": f"Bearer {attributes['connector_api_key']}",
         }
-        response = requests.get(
+        response = await get_shuffle_client().get(
             f"{attributes['connector_url']}{endpoint}",
             headers=HEADERS,
             params=params,
-            verify=False,
         )
         return {
             "data": response.json(),
@@ -144,13 +165,11 @@ async def send_post_request(
         HEADERS = {
             "Authorization": f"Bearer {attributes['connector_api_key']}",
         }
-        response = requests.post(
+        response = await get_shuffle_client().post(
             f"{attributes['connector_url']}{endpoint}",
             headers=HEADERS,
             json=data,
-            verify=False,
         )
-        logger.info(f"Response from Shuffle API: {response.json()}")
 
         if response.status_code == 204:
             return {
@@ -165,7 +184,6 @@ async def send_post_request(
                 "message": "Successfully retrieved data" if response.status_code < 400 else "Failed to retrieve data",
             }
     except Exception as e:
-        logger.debug(f"Response: {response}")
         logger.error(f"Failed to send POST request to {endpoint} with error: {e}")
         raise HTTPException(
             status_code=500,
@@ -1,3 +1,5 @@
+import os
+import time
 from typing import Any
 from typing import Dict
 from typing import Optional
@@ -9,6 +11,52 @@ from sqlalchemy.future import select
 from app.connectors.models import Connectors
 from app.connectors.schema import ConnectorResponse
 
+# How long the connector settings are served from the cache. Changes through the connector routes invalidate
+# the cache right away; the expiry bounds how stale another worker's copy can get.
+CONNECTOR_CACHE_TTL_SECONDS = int(os.getenv("CONNECTOR_CACHE_TTL_SECONDS", 300))
+
+
+class ConnectorCache:
+    """
+    The settings of all connectors, loaded with one query and served from memory until they are invalidated
+    or expire.
+
+    `version` goes up whenever the cached settings change. Clients built from connector settings and kept
+    between calls compare it to the version they were built with to know when to rebuild, closing the old one.
+    The Wazuh-Indexer client is the only such client, the shared Shuffle client takes the connector settings
+    with every request.
+    """
+
+    def __init__(self):
+        self.connectors: Dict[str, Dict[str, Any]] = {}
+        self.expires = 0.0
+        self.version = 0
+
+    async def load(self, db: AsyncSession) -> None:
+        result = await db.execute(select(Connectors))
+        connectors = {connector.connector_name: ConnectorResponse.from_orm(connector).dict() for connector in result.scalars().all()}
+        if connectors != self.connectors:
+            self.connectors = connectors
+            self.version += 1
+        self.expires = time.monotonic() + CONNECTOR_CACHE_TTL_SECONDS
+        logger.info(f"Loaded {len(connectors)} connectors into the cache, version {self.version}")
+
+    async def get(self, connector_name: str, db: AsyncSession) -> Optional[Dict[str, Any]]:
+        if self.expires <= time.monotonic():
+            await self.load(db)
+        connector = self.connectors.get(connector_name)
+        # A copy, so callers cannot change the cached settings
+        return dict(connector) if connector is not None else None
+
+    def invalidate(self) -> None:
+        """
+        Makes the next lookup reload the connector settings, e.g. after a connector was updated.
+        """
+        self.expires = 0.0
+
+
+connector_cache = ConnectorCache()
+
 
 # ! New with Async
 async def get_connector_info_from_db(
@@ -18,6 +66,9 @@ async def get_connector_info_from_db(
     """
     Fetches connector information from the database based on the given connector name.
 
+    The connectors are served from `connector_cache`, so the database is only queried when the cache was
+    invalidated or expired.
+
     Args:
         connector_name (str): The name of the connector to fetch.
         db (AsyncSession): The database session.
@@ -26,13 +77,8 @@ async def get_connector_info_from_db(
         Optional[Dict[str, Any]]: A dictionary containing the connector information if found,
         otherwise None.
     """
-    logger.info(f"Fetching connector {connector_name} from database")
-    query = select(Connectors).where(Connectors.connector_name == connector_name)
-    result = await db.execute(query)
-    connector = result.scalars().first()
-    if connector:
-        connector_pydantic = ConnectorResponse.from_orm(connector)
-        return connector_pydantic.dict()
-    else:
+    logger.info(f"Fetching connector {connector_name}")
+    connector = await connector_cache.get(connector_name, db)
+    if connector is None:
         logger.warning("No connector found.")
-        return None
+    return connector
@@ -9,6 +9,7 @@ from elasticsearch7 import Elasticsearch
 from fastapi import HTTPException
 from loguru import logger
 
+from app.connectors.utils import connector_cache
 from app.connectors.utils import get_connector_info_from_db
 from app.connectors.wazuh_indexer.schema.indices import IndexConfigModel
 from app.connectors.wazuh_indexer.schema.indices import Indices
@@ -73,16 +74,27 @@ async def verify_wazuh_indexer_connection(connector_name: str) -> str:
     return await verify_wazuh_indexer_credentials(attributes)
 
 
+# Clients shared by the requests sent to the Wazuh Indexer, so they reuse their connections. Keyed by connector
+# name, with the connector cache version they were built with.
+wazuh_indexer_clients: Dict[str, Tuple[int, Elasticsearch]] = {}
+
+
 async def create_wazuh_indexer_client(connector_name: str) -> Elasticsearch:
     """
     Returns an Elasticsearch client for the Wazuh Indexer service.
 
+    The client is shared until the connector settings change, then it is rebuilt with the new ones and the
+    connections of the old one are closed.
+
     Returns:
         Elasticsearch: Elasticsearch client for the Wazuh Indexer service.
     """
     # attributes = get_connector_info_from_db(connector_name)
     async with get_db_session() as session:  # This will correctly enter the context manager
         attributes = await get_connector_info_from_db(connector_name, session)
+    pooled = wazuh_indexer_clients.get(connector_name)
+    if pooled is not None and pooled[0] == connector_cache.version:
+        return pooled[1]
     if attributes is None:
         raise HTTPException(
             status_code=500,
@@ -94,7 +106,7 @@ async def create_wazuh_indexer_client(connector_name: str) -> Elasticsearch:
             detail=f"Please update the {connector_name} connector URL",
         )
     try:
-        return Elasticsearch(
+        client = Elasticsearch(
             [attributes["connector_url"]],
             http_auth=(
                 attributes["connector_username"],
@@ -110,6 +122,13 @@ async def create_wazuh_indexer_client(connector_name: str) -> Elasticsearch:
             status_code=500,
             detail=f"Failed to create Elasticsearch client: {e}",
         )
+    wazuh_indexer_clients[connector_name] = (connector_cache.version, client)
+    if pooled is not None:
+        try:
+            pooled[1].close()
+        except Exception as e:
+            logger.warning(f"Failed to close the previous {connector_name} client: {e}")
+    return client
 
 
 async def format_node_allocation(node_allocation):
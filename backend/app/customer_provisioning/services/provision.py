@@ -29,6 +29,7 @@ from app.integrations.alert_creation_settings.models.alert_creation_settings imp
     AlertCreationSettings,
 )
 from app.utils import get_connector_attribute
+from app.utils import invalidate_customer_alert_settings
 
 
 # ! MAIN FUNCTION ! #
@@ -234,6 +235,7 @@ async def update_customer_alert_settings_table(
     )
     session.add(customer_alert_settings)
     await session.commit()
+    invalidate_customer_alert_settings(request.customer_code)
     return customer_alert_settings
 
 
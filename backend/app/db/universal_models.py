@@ -3,7 +3,9 @@ from typing import Optional
 
 from sqlalchemy import Column
 from sqlalchemy import Float
+from sqlalchemy import Index
 from sqlalchemy import LargeBinary
+from sqlalchemy import Text
 from sqlmodel import Field
 from sqlmodel import Relationship
 from sqlmodel import SQLModel
@@ -153,8 +155,13 @@ class Agents(SQLModel, table=True):
 
 class LogEntry(SQLModel, table=True):
     __tablename__ = "log_entries"
+    __table_args__ = (
+        Index("ix_log_entries_timestamp", "timestamp"),
+        Index("ix_log_entries_user_id_timestamp", "user_id", "timestamp"),
+        Index("ix_log_entries_event_type_timestamp", "event_type", "timestamp"),
+    )
     id: Optional[int] = Field(primary_key=True)
-    timestamp: datetime = Field(default=datetime.utcnow())
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
     event_type: str = Field(default="Info", max_length=256)
     user_id: int = Field(default=None, nullable=True)
     route: str = Field(default=None, nullable=True, max_length=256)
@@ -171,6 +178,9 @@ class License(SQLModel, table=True):
     customer_name: str = Field(max_length=1024)
     customer_email: str = Field(max_length=1024)
     company_name: str = Field(max_length=1024)
+    # The features enabled by the last successful verification, as a JSON list, and when it happened
+    verified_features: Optional[str] = Field(default=None, sa_column=Column(Text, nullable=True))
+    verified_at: Optional[datetime] = Field(default=None, nullable=True)
 
 
 class SchedulerJob(SQLModel, table=True):
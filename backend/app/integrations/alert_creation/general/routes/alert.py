@@ -3,15 +3,12 @@ from fastapi import Depends
 from fastapi import HTTPException
 from loguru import logger
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 
 from app.db.db_session import get_db
 from app.integrations.alert_creation.general.schema.alert import CreateAlertRequest
 from app.integrations.alert_creation.general.schema.alert import CreateAlertResponse
 from app.integrations.alert_creation.general.services.alert import create_alert
-from app.integrations.alert_creation_settings.models.alert_creation_settings import (
-    AlertCreationSettings,
-)
+from app.utils import get_customer_alert_settings
 
 general_alerts_router = APIRouter()
 
@@ -34,12 +31,7 @@ async def is_rule_id_valid(
         f"Checking if rule_id: {create_alert_request.rule_id} is valid for customer: {create_alert_request.agent_labels_customer}",
     )
 
-    result = await session.execute(
-        select(AlertCreationSettings).where(
-            AlertCreationSettings.customer_code == create_alert_request.agent_labels_customer,
-        ),
-    )
-    settings = result.scalars().first()
+    settings = await get_customer_alert_settings(create_alert_request.agent_labels_customer, session=session)
 
     if settings and str(create_alert_request.rule_id) in (settings.excluded_wazuh_rules or "").split(","):
         return False
@@ -65,12 +57,7 @@ async def is_customer_code_valid(
         f"Checking if customer_code: {create_alert_request.agent_labels_customer} is valid.",
     )
 
-    result = await session.execute(
-        select(AlertCreationSettings).where(
-            AlertCreationSettings.customer_code == create_alert_request.agent_labels_customer,
-        ),
-    )
-    settings = result.scalars().first()
+    settings = await get_customer_alert_settings(create_alert_request.agent_labels_customer, session=session)
 
     if settings:
         return True
@@ -19,6 +19,9 @@ from app.integrations.alert_creation.general.schema.alert import ValidIocFields
 from app.integrations.alert_creation.general.services.alert_multi_exclude import (
     AlertDetailsService,
 )
+from app.integrations.alert_creation_settings.models.alert_creation_settings import (
+    AlertCreationSettings,
+)
 from app.integrations.utils.alerts import get_asset_type_id
 from app.integrations.utils.alerts import send_to_shuffle
 from app.integrations.utils.alerts import validate_ioc_type
@@ -39,7 +42,7 @@ def valid_ioc_fields() -> Set[str]:
 
 async def construct_alert_source_link(
     alert_details: CreateAlertRequest,
-    session: AsyncSession,
+    alert_settings: AlertCreationSettings,
 ) -> str:
     """
     Construct the alert source link for the alert details.
@@ -47,6 +50,8 @@ async def construct_alert_source_link(
     ----------
     alert_details: CreateAlertRequest
         The alert details.
+    alert_settings: AlertCreationSettings
+        The alert creation settings of the customer.
     Returns
     -------
     str
@@ -58,12 +63,7 @@ async def construct_alert_source_link(
     else:
         query_string = f"%22query%22:%22_id:%5C%22{alert_details.id}%5C%22%20AND%20"
 
-    grafana_url = (
-        await get_customer_alert_settings(
-            customer_code=alert_details.agent_labels_customer,
-            session=session,
-        )
-    ).grafana_url
+    grafana_url = alert_settings.grafana_url
 
     return (
         f"{grafana_url}/explore?left=%5B%22now-6h%22,%22now%22,%22WAZUH%22,%7B%22refId%22:%22A%22,"
@@ -123,7 +123,7 @@ async def build_asset_payload(agent_data: AgentsResponse, alert_details) -> Iris
 async def build_alert_context_payload(
     alert_details: CreateAlertRequest,
     agent_data: AgentsResponse,
-    session: AsyncSession,
+    alert_settings: AlertCreationSettings,
 ) -> IrisAlertContext:
     """
     Builds the payload for the alert context.
@@ -131,30 +131,15 @@ async def build_alert_context_payload(
     Args:
         alert_details (CreateAlertRequest): The details of the alert.
         agent_data (AgentsResponse): The agent data.
-        session (AsyncSession): The async session.
+        alert_settings (AlertCreationSettings): The alert creation settings of the customer.
 
     Returns:
         IrisAlertContext: The built alert context payload.
     """
     return IrisAlertContext(
-        customer_iris_id=(
-            await get_customer_alert_settings(
-                customer_code=alert_details.agent_labels_customer,
-                session=session,
-            )
-        ).iris_customer_id,
-        customer_name=(
-            await get_customer_alert_settings(
-                customer_code=alert_details.agent_labels_customer,
-                session=session,
-            )
-        ).customer_name,
-        customer_cases_index=(
-            await get_customer_alert_settings(
-                customer_code=alert_details.agent_labels_customer,
-                session=session,
-            )
-        ).iris_index,
+        customer_iris_id=alert_settings.iris_customer_id,
+        customer_name=alert_settings.customer_name,
+        customer_cases_index=alert_settings.iris_index,
         alert_id=alert_details.id,
         alert_name=alert_details.rule_description,
         alert_level=alert_details.rule_level,
@@ -181,16 +166,16 @@ async def build_alert_payload(
     alert_details: CreateAlertRequest,
     agent_data,
     ioc_payload: Optional[IrisIoc],
-    session: AsyncSession,
+    alert_settings: AlertCreationSettings,
 ) -> IrisAlertPayload:
     """
-    Builds the payload for an alert based on the provided alert details, agent data, IoC payload, and session.
+    Builds the payload for an alert based on the provided alert details, agent data, IoC payload, and alert settings.
 
     Args:
         alert_details (CreateAlertRequest): The details of the alert.
         agent_data: The agent data associated with the alert.
         ioc_payload (Optional[IrisIoc]): The IoC payload associated with the alert.
-        session (AsyncSession): The session used for database operations.
+        alert_settings (AlertCreationSettings): The alert creation settings of the customer.
 
     Returns:
         IrisAlertPayload: The built alert payload.
@@ -199,14 +184,9 @@ async def build_alert_payload(
     context_payload = await build_alert_context_payload(
         alert_details=alert_details,
         agent_data=agent_data,
-        session=session,
+        alert_settings=alert_settings,
     )
-    timefield = (
-        await get_customer_alert_settings(
-            customer_code=alert_details.agent_labels_customer,
-            session=session,
-        )
-    ).timefield
+    timefield = alert_settings.timefield
     # Get the timefield value from the alert_details
     if hasattr(alert_details, timefield):
         alert_details.time_field = getattr(alert_details, timefield)
@@ -217,19 +197,14 @@ async def build_alert_payload(
             alert_title=alert_details.rule_description,
             alert_source_link=await construct_alert_source_link(
                 alert_details,
-                session=session,
+                alert_settings=alert_settings,
             ),
             alert_description=alert_details.rule_description,
             alert_source="CoPilot",
             assets=[asset_payload],
             alert_status_id=3,
             alert_severity_id=5,
-            alert_customer_id=(
-                await get_customer_alert_settings(
-                    customer_code=alert_details.agent_labels_customer,
-                    session=session,
-                )
-            ).iris_customer_id,
+            alert_customer_id=alert_settings.iris_customer_id,
             alert_source_content=alert_details.to_dict(),
             alert_context=context_payload,
             alert_iocs=[ioc_payload],
@@ -241,19 +216,14 @@ async def build_alert_payload(
             alert_title=alert_details.rule_description,
             alert_source_link=await construct_alert_source_link(
                 alert_details,
-                session=session,
+                alert_settings=alert_settings,
             ),
             alert_description=alert_details.rule_description,
             alert_source="SOCFORTRESS RULE",
             assets=[asset_payload],
             alert_status_id=3,
             alert_severity_id=5,
-            alert_customer_id=(
-                await get_customer_alert_settings(
-                    customer_code=alert_details.agent_labels_customer,
-                    session=session,
-                )
-            ).iris_customer_id,
+            alert_customer_id=alert_settings.iris_customer_id,
             alert_source_content=alert_details.to_dict(),
             alert_context=context_payload,
             alert_source_event_time=alert_details.time_field,
@@ -290,11 +260,15 @@ async def create_alert(
     logger.info(f"Getting agent data for {alert.agent_name}")
     agent_details = await get_agent(agent_id=alert.agent_id, db=session)
     ioc_payload = await build_ioc_payload(alert_details=alert)
+    alert_settings = await get_customer_alert_settings(
+        customer_code=alert.agent_labels_customer,
+        session=session,
+    )
     iris_alert_payload = await build_alert_payload(
         alert_details=alert,
         agent_data=agent_details,
         ioc_payload=ioc_payload,
-        session=session,
+        alert_settings=alert_settings,
     )
     client, alert_client = await initialize_client_and_alert("DFIR-IRIS")
     result = await fetch_and_validate_data(
@@ -319,18 +293,14 @@ async def create_alert(
             alert_id,
             {"iocs": [dict(IrisIoc(**iris_alert_payload.alert_iocs[0].to_dict()))]},
         )
-    customer_name = (
-        await get_customer_alert_settings(
-            customer_code=alert.agent_labels_customer,
-            session=session,
-        )
-    ).customer_name
+    customer_name = alert_settings.customer_name
+    alert_source_link = await construct_alert_source_link(alert, alert_settings=alert_settings)
     await send_to_shuffle(
         ShufflePayload(
             alert_id=alert_id,
             customer=customer_name,
             customer_code=alert.agent_labels_customer,
-            alert_source_link=await construct_alert_source_link(alert, session=session),
+            alert_source_link=alert_source_link,
             rule_description=alert.rule_description,
             hostname=alert.agent_name,
         ),
@@ -338,13 +308,8 @@ async def create_alert(
     )
     return CreateAlertResponse(
         alert_id=alert_id,
-        customer=(
-            await get_customer_alert_settings(
-                customer_code=alert.agent_labels_customer,
-                session=session,
-            )
-        ).customer_name,
-        alert_source_link=await construct_alert_source_link(alert, session=session),
+        customer=customer_name,
+        alert_source_link=alert_source_link,
         success=True,
         message=f"Successfully created alert {alert_id} in IRIS.",
     )
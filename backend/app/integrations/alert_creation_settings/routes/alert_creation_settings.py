@@ -34,6 +34,7 @@ from app.integrations.alert_creation_settings.schema.alert_creation_settings imp
     EventOrderResponse,
 )
 from app.utils import get_customer_alert_event_configs
+from app.utils import invalidate_customer_alert_settings
 
 alert_creation_settings_router = APIRouter()
 
@@ -129,6 +130,9 @@ async def create_alert_creation_settings(
     session.add(alert_creation_settings_db)
     await session.commit()
     await session.refresh(alert_creation_settings_db)
+    invalidate_customer_alert_settings(alert_creation_settings_db.customer_code)
+    if alert_creation_settings_db.office365_organization_id:
+        invalidate_customer_alert_settings(alert_creation_settings_db.office365_organization_id)
 
     return alert_creation_settings_db
 
@@ -226,6 +230,7 @@ async def add_event_order(
         session.add(event_config_db)
 
     await session.commit()
+    invalidate_customer_alert_settings(settings.customer_code)
 
     # Query the EventOrder instance again to ensure event_configs are loaded
     result = await session.execute(
@@ -299,6 +304,7 @@ async def update_event_orders(
 
     await session.commit()
     await session.refresh(settings)
+    invalidate_customer_alert_settings(settings.customer_code)
 
     return settings
 
@@ -361,6 +367,7 @@ async def delete_event_order(
         )
 
     await session.commit()
+    invalidate_customer_alert_settings(settings.customer_code)
 
     return {
         "message": f"Event order with order_label: {order_label} and related alert creation event configs deleted.",
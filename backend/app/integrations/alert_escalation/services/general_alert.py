@@ -1,3 +1,4 @@
+import asyncio
 from typing import Optional
 from typing import Set
 
@@ -379,7 +380,8 @@ async def add_alert_to_document(
             connector_info["connector_url"],
             soc_alert_id,
         )
-        es_client.update(
+        await asyncio.to_thread(
+            es_client.update,
             index=alert.index_name,
             id=alert.alert_id,
             body={"doc": {"alert_url": full_url}},
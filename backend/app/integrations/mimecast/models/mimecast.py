@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import Field
+from sqlmodel import SQLModel
+
+
+class MimecastCheckpoint(SQLModel, table=True):
+    """
+    Represents the Mimecast checkpoints table.
+    Table is used to store the last mc-siem-token per customer, so SIEM log collection resumes
+    from the page after the last one shipped instead of downloading the logs again.
+    """
+
+    __tablename__ = "mimecast_checkpoints"
+    id: Optional[int] = Field(primary_key=True)
+    customer_code: str = Field(max_length=50, index=True, unique=True, description="The customer code.")
+    siem_token: str = Field(max_length=1024, description="The mc-siem-token of the next page of SIEM logs.")
+    updated_at: datetime = Field(default_factory=datetime.utcnow, description="When the checkpoint was last moved.")
@@ -9,8 +9,9 @@ from app.db.db_session import get_db
 from app.integrations.mimecast.schema.mimecast import MimecastAuthKeys
 from app.integrations.mimecast.schema.mimecast import MimecastRequest
 from app.integrations.mimecast.schema.mimecast import MimecastResponse
+from app.integrations.mimecast.schema.mimecast import MimecastTTPSummaryResponse
 from app.integrations.mimecast.schema.mimecast import MimecastTTPURLSRequest
-from app.integrations.mimecast.services.mimecast import get_ttp_urls
+from app.integrations.mimecast.services.mimecast import get_ttp_logs
 from app.integrations.mimecast.services.mimecast import invoke_mimecast
 from app.integrations.routes import find_customer_integration
 from app.integrations.utils.utils import extract_auth_keys
@@ -61,19 +62,19 @@ async def invoke_mimecast_route(
 
     auth_keys = MimecastAuthKeys(**mimecast_auth_keys)
 
-    return await invoke_mimecast(mimecast_request, auth_keys)
+    return await invoke_mimecast(mimecast_request, auth_keys, session)
 
 
 @integration_mimecast_router.post(
     "/ttp/urls",
-    response_model=MimecastResponse,
-    description="Pull down Mimecast TTP URLs for a given time range. "
+    response_model=MimecastTTPSummaryResponse,
+    description="Pull down Mimecast TTP URL, attachment and impersonation logs for a given time range and ship them. "
     "Link to docs: https://integrations.mimecast.com/documentation/endpoint-reference/logs-and-statistics/get-ttp-url-logs/ ",
 )
 async def mimecast_ttp_url_route(
     mimecast_request: MimecastRequest,
     session: AsyncSession = Depends(get_db),
-):
+) -> MimecastTTPSummaryResponse:
     logger.info("Mimecast TTP URL request received")
     customer_code = mimecast_request.customer_code
     customer_integration_response = await get_customer_integration_response(
@@ -98,7 +99,8 @@ async def mimecast_ttp_url_route(
         SecretKey=auth_keys.SECRET_KEY,
         EmailAddress=auth_keys.EMAIL_ADDRESS,
         time_range=mimecast_request.time_range,
+        event_shipper_settings=auth_keys.event_shipper_settings(),
     )
     logger.info(f"Mimecast TTP URL request: {mimecast_request}")
 
-    return await get_ttp_urls(mimecast_request, customer_code=customer_code)
+    return await get_ttp_logs(mimecast_request, customer_code=customer_code)
@@ -14,6 +14,10 @@ from pydantic import Field
 from pydantic import HttpUrl
 from pydantic import root_validator
 
+from app.integrations.utils.schema import EventShipperSettings
+from app.integrations.utils.schema import GelfCompression
+from app.integrations.utils.schema import GelfTransport
+
 
 class PipelineRuleTitles(Enum):
     WAZUH_INFO = "WAZUH CREATE FIELD SYSLOG LEVEL - INFO"
@@ -81,6 +85,19 @@ class MimecastAuthKeys(BaseModel):
         description="URI FOR YOUR API Endpoint",
         examples=["/api/audit/get-siem-logs"],
     )
+    GELF_TRANSPORT: Optional[GelfTransport] = Field(
+        GelfTransport.TCP,
+        description="GELF TRANSPORT USED TO SHIP EVENTS TO GRAYLOG (tcp OR udp)",
+        examples=["udp"],
+    )
+    GELF_COMPRESSION: Optional[GelfCompression] = Field(
+        None,
+        description="COMPRESSION FOR GELF UDP MESSAGES (zlib OR gzip)",
+        examples=["zlib"],
+    )
+
+    def event_shipper_settings(self) -> EventShipperSettings:
+        return EventShipperSettings(transport=self.GELF_TRANSPORT or GelfTransport.TCP, compression=self.GELF_COMPRESSION)
 
 
 class APIEndpointRegion(BaseModel):
@@ -176,7 +193,10 @@ class MimecastTTPURLSRequest(BaseModel):
         None,
         description="The headers generated for the request.",
     )
-    pagination_token: str = Field(None, description="Pagination token for API calls")
+    event_shipper_settings: Optional[EventShipperSettings] = Field(
+        None,
+        description="The GELF transport and compression used to ship the events.",
+    )
 
     lower_bound: str = None
     upper_bound: str = None
@@ -246,8 +266,9 @@ class DataItem(BaseModel):
         description="Start date-time in ISO 8601 format.",
     )
     to: datetime = Field(..., description="End date-time in ISO 8601 format.")
-    route: str = Field(..., description="Routing information.")
-    scanResult: str = Field(..., description="Scan result.")
+    route: Optional[str] = Field(None, description="Routing information.")
+    scanResult: Optional[str] = Field(None, description="Scan result, used by the URL logs.")
+    result: Optional[str] = Field(None, description="Scan result, used by the attachment logs.")
 
     class Config:
         allow_population_by_field_name = True  # This allows field population by both alias and field name
@@ -324,3 +345,40 @@ class TtpURLAttachmentResponseBody(BaseModel):
     meta: ResponseMeta
     data: List[ResponseDataItemAttachment]
     fail: List[Dict]  # Adjust this based on the actual structure of the "fail" field
+
+
+class ResponseImpersonationLogs(BaseModel):
+    id: str
+    senderAddress: str
+    recipientAddress: str
+    subject: str
+    definition: str
+    hits: int
+    identifiers: List[str]
+    action: str
+    taggedExternal: bool
+    taggedMalicious: bool
+    senderIpAddress: str
+    eventTime: str
+    impersonationResults: List[Dict]
+
+
+class ResponseDataItemImpersonation(BaseModel):
+    impersonationLogs: List[ResponseImpersonationLogs]
+
+
+class TtpImpersonationResponseBody(BaseModel):
+    meta: ResponseMeta
+    data: List[ResponseDataItemImpersonation]
+    fail: List[Dict]  # Adjust this based on the actual structure of the "fail" field
+
+
+class MimecastTTPSummaryResponse(BaseModel):
+    success: bool
+    message: str
+    log_counts: Dict[str, int] = Field(..., description="The number of logs shipped per TTP log type.")
+    duration_seconds: float = Field(..., description="How long the collection took.")
+    last_page_tokens: Dict[str, Optional[str]] = Field(
+        ...,
+        description="The page token of the last page collected per TTP log type, None if it was the first page.",
+    )
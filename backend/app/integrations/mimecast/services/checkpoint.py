@@ -0,0 +1,64 @@
+import os
+from datetime import datetime
+from typing import Optional
+
+import aiofiles
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.integrations.mimecast.models.mimecast import MimecastCheckpoint
+
+# Where the tokens were saved before they moved to the database
+LEGACY_CHECKPOINT_DIRECTORY = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "checkpoint"))
+
+
+async def read_legacy_checkpoint(customer_code: str) -> Optional[str]:
+    """
+    Reads the token from the checkpoint file the customer was collected with before, if any.
+    """
+    checkpoint_filename = os.path.join(LEGACY_CHECKPOINT_DIRECTORY, f"mimecast_{customer_code}.checkpoint")
+    if not os.path.exists(checkpoint_filename):
+        return None
+    async with aiofiles.open(checkpoint_filename, "r") as f:
+        return (await f.read()).strip() or None
+
+
+async def get_siem_token(session: AsyncSession, customer_code: str) -> Optional[str]:
+    """
+    Retrieves the mc-siem-token to resume the customer's SIEM log collection from.
+
+    Args:
+        session (AsyncSession): The database session.
+        customer_code (str): The customer code.
+
+    Returns:
+        Optional[str]: The token, or None if nothing was collected yet.
+    """
+    result = await session.execute(select(MimecastCheckpoint).where(MimecastCheckpoint.customer_code == customer_code))
+    checkpoint = result.scalars().first()
+    if checkpoint is not None:
+        return checkpoint.siem_token
+    token = await read_legacy_checkpoint(customer_code)
+    if token:
+        logger.info(f"Resuming Mimecast SIEM logs for customer {customer_code} from the legacy checkpoint file")
+    return token
+
+
+async def save_siem_token(session: AsyncSession, customer_code: str, token: str) -> None:
+    """
+    Saves the mc-siem-token of the next page of the customer's SIEM logs.
+
+    Args:
+        session (AsyncSession): The database session.
+        customer_code (str): The customer code.
+        token (str): The mc-siem-token returned with the last page shipped.
+    """
+    result = await session.execute(select(MimecastCheckpoint).where(MimecastCheckpoint.customer_code == customer_code))
+    checkpoint = result.scalars().first()
+    if checkpoint is None:
+        session.add(MimecastCheckpoint(customer_code=customer_code, siem_token=token))
+    else:
+        checkpoint.siem_token = token
+        checkpoint.updated_at = datetime.utcnow()
+    await session.commit()
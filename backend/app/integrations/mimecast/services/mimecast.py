@@ -1,3 +1,4 @@
+import asyncio
 import base64
 import datetime
 import hashlib
@@ -5,86 +6,45 @@ import hmac
 import io
 import json
 import os
-import shutil
 import time
 import uuid
+from typing import Iterator
+from typing import Optional
+from typing import Tuple
 from zipfile import ZipFile
 
-import aiofiles
-import requests
+import httpx
 from fastapi import HTTPException
 from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.integrations.mimecast.schema.mimecast import DataItem
 from app.integrations.mimecast.schema.mimecast import MimecastAPIEndpointResponse
 from app.integrations.mimecast.schema.mimecast import MimecastAuthKeys
 from app.integrations.mimecast.schema.mimecast import MimecastRequest
 from app.integrations.mimecast.schema.mimecast import MimecastResponse
+from app.integrations.mimecast.schema.mimecast import MimecastTTPSummaryResponse
 from app.integrations.mimecast.schema.mimecast import MimecastTTPURLSRequest
 from app.integrations.mimecast.schema.mimecast import RequestBody
+from app.integrations.mimecast.schema.mimecast import TtpImpersonationResponseBody
+from app.integrations.mimecast.schema.mimecast import TtpURLAttachmentResponseBody
 from app.integrations.mimecast.schema.mimecast import TtpURLResponseBody
+from app.integrations.mimecast.services.checkpoint import get_siem_token
+from app.integrations.mimecast.services.checkpoint import save_siem_token
 from app.integrations.utils.collection import send_post_request
-from app.integrations.utils.event_shipper import event_shipper
+from app.integrations.utils.event_shipper import event_shipper_batch
 from app.integrations.utils.schema import EventShipperPayload
+from app.integrations.utils.schema import EventShipperSettings
 
-
-async def get_checkpoint_filename(customer_code: str):
-    """
-    Retrieves the checkpoint filename for the Mimecast integration.
-    If the checkpoint file does not exist, it will be created asynchronously.
-    """
-    # Relative path from the current script to the checkpoint directory
-    checkpoint_directory = os.path.join(os.path.dirname(__file__), "..", "checkpoint")
-    checkpoint_filename = os.path.join(
-        checkpoint_directory,
-        f"mimecast_{customer_code}.checkpoint",
-    )
-
-    # Normalize the path to remove relative path components
-    checkpoint_filename = os.path.normpath(checkpoint_filename)
-
-    # Create the checkpoint directory if it does not exist
-    if not os.path.exists(checkpoint_directory):
-        os.makedirs(checkpoint_directory)
-
-    # Create the checkpoint file if it does not exist
-    if not os.path.exists(checkpoint_filename):
-        async with aiofiles.open(checkpoint_filename, "w") as f:
-            await f.write("")
-
-    return checkpoint_filename
-
-
-async def get_log_file_path(customer_code: str):
-    """
-    Retrieves the log file path for the Mimecast integration and customer.
-
-    Args:
-        customer_code (str): The code of the customer.
-
-    Returns:
-        str: The log file path for the Mimecast integration and customer.
-    """
-    # Relative path from the current script to the log directory
-    log_directory = os.path.join(os.path.dirname(__file__), "..", "logs")
-    # Normalize the path to remove relative path components
-    log_directory = os.path.abspath(log_directory)
-
-    # Create a directory for the customer if it does not exist
-    customer_log_directory = os.path.join(log_directory, customer_code)
-    if not os.path.exists(customer_log_directory):
-        os.makedirs(customer_log_directory)
-
-    # Return the customer directory
-    return customer_log_directory
-
-
-async def read_file(filename: str):
-    """
-    Reads the contents of the given file.
-    """
-    async with aiofiles.open(filename, "r") as f:
-        return await f.read()
+# Number of SIEM log events handed to the event shipper at once
+MIMECAST_SHIP_BATCH_SIZE = int(os.getenv("MIMECAST_SHIP_BATCH_SIZE", 500))
+# Number of SIEM log pages collected per customer in one run, the next run resumes from the last one
+MIMECAST_SIEM_MAX_PAGES_PER_RUN = int(os.getenv("MIMECAST_SIEM_MAX_PAGES_PER_RUN", 50))
+# Number of TTP log requests in flight at once per tenant, to stay within its API rate limit
+MIMECAST_TTP_CONCURRENCY = int(os.getenv("MIMECAST_TTP_CONCURRENCY", 3))
+# How often a TTP log request is retried after hitting the rate limit, and the longest wait in seconds
+MIMECAST_TTP_MAX_RETRIES = int(os.getenv("MIMECAST_TTP_MAX_RETRIES", 3))
+MIMECAST_TTP_MAX_RETRY_WAIT = int(os.getenv("MIMECAST_TTP_MAX_RETRY_WAIT", 60))
 
 
 async def get_hdr_date():
@@ -139,19 +99,19 @@ async def get_base_url(
 
 
 async def get_mta_siem_logs(
-    checkpoint_filename: str,
+    token: Optional[str],
     base_url: str,
     auth_keys: MimecastAuthKeys,
 ):
     """
-    Retrieves the MTA SIEM logs from the Mimecast integration.
+    Retrieves the page of MTA SIEM logs that starts at the given mc-siem-token.
     """
     # Build post body for request
     post_body = dict()
     post_body["data"] = [{}]
     post_body["data"][0]["type"] = "MTA"
     post_body["data"][0]["compress"] = True
-    post_body["data"][0]["token"] = await read_file(checkpoint_filename)
+    post_body["data"][0]["token"] = token or ""
 
     # Create variables required for request headers
     request_id = str(uuid.uuid4())
@@ -177,11 +137,12 @@ async def get_mta_siem_logs(
         "Content-Type": "application/json",
     }
     try:
-        response = requests.post(
-            url=base_url + auth_keys.URI,
-            headers=headers,
-            data=json.dumps(post_body),
-        )
+        async with httpx.AsyncClient(timeout=120) as client:
+            response = await client.post(
+                url=base_url + auth_keys.URI,
+                headers=headers,
+                content=json.dumps(post_body),
+            )
         return response.content, response.headers
     except Exception as e:
         logger.error(
@@ -193,116 +154,92 @@ async def get_mta_siem_logs(
         )
 
 
-async def process_response(response, checkpoint_filename: str, log_file_path: str):
+async def process_response(
+    response,
+    customer_code: str,
+    settings: Optional[EventShipperSettings] = None,
+) -> Optional[str]:
     """
     Processes the response body from the Mimecast integration.
-    """
-    if response != "error":
-        resp_body = response[0]
-        resp_headers = response[1]
-        content_type = resp_headers["Content-Type"]
-
-        # End if response is JSON as there is no log file to download
-        if content_type == "application/json":
-            logger.info("No more logs available")
-            return False
-        # Process log file
-        elif content_type == "application/octet-stream":
-            logger.info("Content-Type: application/octet-stream")
-            file_name = resp_headers["Content-Disposition"].split('="')
-            file_name = file_name[1][:-1]
-
-            # Save mc-siem-token page token to check point directory
-            await write_checkpoint_file(
-                checkpoint_filename,
-                resp_headers["mc-siem-token"],
-            )
-            log_filename = os.path.join(log_file_path, file_name)
-            await write_log_file(log_filename, resp_body)
-            return None
 
+    The log file, or every file of the zip archive, is read from memory and shipped in batches.
 
-async def write_checkpoint_file(filename: str, data: str):
-    """
-    Writes the given data to the given file.
+    Returns:
+        Optional[str]: The mc-siem-token of the next page once all events are shipped, or None if no
+        more logs are available.
     """
-    async with aiofiles.open(filename, "w") as f:
-        await f.write(data)
+    resp_body = response[0]
+    resp_headers = response[1]
+    content_type = resp_headers["Content-Type"]
+
+    # End if response is JSON as there is no log file to download
+    if content_type == "application/json":
+        logger.info("No more logs available")
+        return None
+    # Process log file
+    elif content_type == "application/octet-stream":
+        logger.info("Content-Type: application/octet-stream")
+        file_name = resp_headers["Content-Disposition"].split('="')
+        file_name = file_name[1][:-1]
 
+        events_shipped = await ship_log_lines(iter_log_lines(file_name, resp_body), customer_code, settings)
+        logger.info(f"Shipped {events_shipped} events from {file_name}")
+        return resp_headers["mc-siem-token"]
+    logger.error(f"Unexpected Content-Type from Mimecast SIEM logs: {content_type}")
+    return None
 
-async def write_log_file(filename: str, resp_body):
+
+def iter_log_lines(file_name: str, resp_body: bytes) -> Iterator[str]:
     """
-    Writes the given data to the given file.
+    Yields the lines of the downloaded log file. A zip archive is opened in memory and its files are
+    decompressed one line at a time, so no file is written to disk.
     """
-    if ".zip" in filename:
+    if ".zip" in file_name:
         try:
-            byte_content = io.BytesIO(resp_body)
-            zip_file = ZipFile(byte_content)
-            zip_file.extractall(filename)
+            zip_file = ZipFile(io.BytesIO(resp_body))
         except Exception as e:
-            logger.error(f"Unable to extract zip file. Exception: {e}")
-            raise HTTPException(status_code=400, detail="Unable to extract zip file.")
+            logger.error(f"Unable to open zip file. Exception: {e}")
+            raise HTTPException(status_code=400, detail="Unable to open zip file.")
+        with zip_file:
+            for member in zip_file.infolist():
+                if member.is_dir():
+                    continue
+                logger.info(f"Processing {member.filename} from {file_name}")
+                with zip_file.open(member) as member_file:
+                    yield from io.TextIOWrapper(member_file, encoding="utf-8")
     else:
-        async with aiofiles.open(filename, "w") as f:
-            await f.write(resp_body)
+        yield from io.StringIO(resp_body.decode("utf-8"))
 
 
-async def process_log_file(
-    filename: str,
-    filename2: str,
-    log_file_path: str,
-    customer_code: str,
-):
-    """
-    Process a log file by reading its contents and shipping events.
+async def ship_log_lines(lines: Iterator[str], customer_code: str, settings: Optional[EventShipperSettings] = None) -> int:
     """
-    log_file_full_path = build_log_file_path(log_file_path, filename, filename2)
-    file_creation_time = get_file_creation_time(log_file_full_path)
-    logger.info(f"File creation time: {file_creation_time} and filename: {filename2}")
+    Converts each log line to JSON and ships the events in batches of `MIMECAST_SHIP_BATCH_SIZE`.
 
-    await read_and_ship_log_file(log_file_full_path, customer_code)
-    await safely_delete_file(log_file_full_path)
-
-
-def build_log_file_path(log_file_path: str, filename: str, filename2: str) -> str:
-    """
-    Constructs the full path for a log file.
-    """
-    return os.path.join(log_file_path, filename, filename2)
-
-
-def get_file_creation_time(file_path: str) -> str:
-    """
-    Returns the creation time of a file.
-    """
-    return time.ctime(os.path.getctime(file_path))
-
-
-async def read_and_ship_log_file(file_path: str, customer_code: str):
-    """
-    Reads a log file line by line, converts each line to JSON, and ships the event.
-    """
-    with open(file_path, "r", encoding="utf-8") as file:
-        for line in file:
-            log_entry = convert_to_json(line)
-            message = EventShipperPayload(
+    Returns:
+        int: The number of events shipped.
+    """
+    batch = []
+    events_shipped = 0
+    for line in lines:
+        log_entry = convert_to_json(line)
+        if not log_entry:
+            continue
+        batch.append(
+            EventShipperPayload(
                 customer_code=customer_code,
                 integration="mimecast",
                 version="1.0",
                 **log_entry,
-            )
-            await event_shipper(message)
-
-
-async def safely_delete_file(file_path: str):
-    """
-    Attempts to delete a file and logs the outcome.
-    """
-    try:
-        os.remove(file_path)
-        logger.info(f"Successfully deleted the file: {file_path}")
-    except OSError as e:
-        logger.error(f"Error: {e.strerror}. File: {file_path}")
+            ),
+        )
+        if len(batch) == MIMECAST_SHIP_BATCH_SIZE:
+            await event_shipper_batch(batch, settings=settings)
+            events_shipped += len(batch)
+            batch = []
+    if batch:
+        await event_shipper_batch(batch, settings=settings)
+        events_shipped += len(batch)
+    return events_shipped
 
 
 def convert_to_json(log_line: str) -> dict:
@@ -317,26 +254,16 @@ def convert_to_json(log_line: str) -> dict:
     return log_dict
 
 
-async def delete_log_directory(log_file_path: str):
-    """
-    Deletes the log directory for the given customer.
-    """
-    try:
-        shutil.rmtree(log_file_path)
-        logger.info(f"Successfully deleted the directory: {log_file_path}")
-    except OSError as e:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Error: {e.strerror}. Directory: {log_file_path}",
-        )
-
-
 async def invoke_mimecast(
     mimecast_request: MimecastRequest,
     auth_keys: MimecastAuthKeys,
+    session: AsyncSession,
 ) -> MimecastResponse:
     """
     Invokes the Mimecast integration.
+
+    Pages through the customer's SIEM logs from the saved mc-siem-token until no more logs are available
+    or `MIMECAST_SIEM_MAX_PAGES_PER_RUN` pages were collected, saving the token after each page.
     """
     mimecast_base_url = await get_base_url(auth_keys)
     try:
@@ -349,36 +276,43 @@ async def invoke_mimecast(
             status_code=400,
             detail="Unable to retrieve base URL for Mimecast integration.",
         )
-    checkpoint_filename = await get_checkpoint_filename(mimecast_request.customer_code)
-    log_file_path = await get_log_file_path(mimecast_request.customer_code)
-    response = await get_mta_siem_logs(
-        checkpoint_filename,
-        mimecast_base_url.data.data[0].region.api,
-        auth_keys,
-    )
-
-    await process_response(response, checkpoint_filename, log_file_path)
-    for filename in os.listdir(log_file_path):
-        if os.path.isdir(os.path.join(log_file_path, filename)):
-            for filename2 in os.listdir(os.path.join(log_file_path, filename)):
-                await process_log_file(
-                    filename,
-                    filename2,
-                    log_file_path,
-                    customer_code=mimecast_request.customer_code,
-                )
-            logger.info(f"Log file path: {log_file_path}")
-        else:
-            await process_log_file(filename, filename2, log_file_path)
-
-    await delete_log_directory(log_file_path)
+    customer_code = mimecast_request.customer_code
+    token = await get_siem_token(session, customer_code)
+    pages = 0
+    while pages < MIMECAST_SIEM_MAX_PAGES_PER_RUN:
+        response = await get_mta_siem_logs(
+            token,
+            mimecast_base_url.data.data[0].region.api,
+            auth_keys,
+        )
+        next_token = await process_response(
+            response,
+            customer_code=customer_code,
+            settings=auth_keys.event_shipper_settings(),
+        )
+        if next_token is None:
+            break
+        # Only move the checkpoint once the page is shipped, so a failed run is retried from the same page
+        await save_siem_token(session, customer_code, next_token)
+        token = next_token
+        pages += 1
+    logger.info(f"Collected {pages} pages of Mimecast SIEM logs for customer {customer_code}")
     return MimecastResponse(
         success=True,
         message="Successfully invoked Mimecast integration.",
     )
 
 
-# ! TTP URLS ! #
+# ! TTP LOGS ! #
+# The TTP log types: the endpoint, the model of the response, the field of the logs in the response
+# and the filters sent with the request
+TTP_LOG_TYPES = {
+    "url": ("/api/ttp/url/get-logs", TtpURLResponseBody, "clickLogs", {"route": "all", "scanResult": "all"}),
+    "attachment": ("/api/ttp/attachment/get-logs", TtpURLAttachmentResponseBody, "attachmentLogs", {"route": "all", "result": "all"}),
+    "impersonation": ("/api/ttp/impersonation/get-logs", TtpImpersonationResponseBody, "impersonationLogs", {}),
+}
+
+
 async def custom_datetime_format(dt: datetime.datetime) -> str:
     """Format a datetime object to a custom ISO-like string."""
     return dt.strftime("%Y-%m-%dT%H:%M:%S%z").replace("+00:00", "+0000")
@@ -386,49 +320,115 @@ async def custom_datetime_format(dt: datetime.datetime) -> str:
 
 async def create_ttp_request_body(
     mimecast_request: MimecastTTPURLSRequest,
-) -> RequestBody:
+    log_type: str,
+    page_token: Optional[str] = None,
+) -> dict:
     """Create a request body for the Mimecast API call."""
     meta_data = {}
-    if mimecast_request.pagination_token:
-        meta_data["pagination"] = {"pageToken": mimecast_request.pagination_token}
-    return RequestBody(
+    if page_token:
+        meta_data["pagination"] = {"pageToken": page_token}
+    request_body = RequestBody(
         meta=meta_data,
         data=[
             DataItem(
                 oldestFirst=False,
                 from_=mimecast_request.lower_bound,
-                route="all",
                 to=mimecast_request.upper_bound,
-                scanResult="all",
+                **TTP_LOG_TYPES[log_type][3],
             ),
         ],
     )
-
-
-async def invoke_mimecast_api_ttp_urls(
-    mimecast_request: MimecastTTPURLSRequest,
-) -> TtpURLResponseBody:
-    """Invoke the Mimecast API call to get TTP URLs."""
-    logger.info("Mimecast TTP URL request received")
-    request_body = await create_ttp_request_body(mimecast_request)
-    request_dict = request_body.dict(by_alias=True)
-    logger.info(f"Request: {request_dict}")
+    request_dict = request_body.dict(by_alias=True, exclude_none=True)
     for item in request_dict["data"]:
         item["from"] = await custom_datetime_format(item["from"])
         item["to"] = await custom_datetime_format(item["to"])
-    response = requests.post(
-        url=mimecast_request.BaseURL + "/api/ttp/url/get-logs",
-        headers=mimecast_request.headers.dict(by_alias=True),
-        data=str(request_dict),
-    )
-    return TtpURLResponseBody(**response.json())
+    return request_dict
 
 
-async def get_ttp_urls(
+async def invoke_mimecast_api_ttp_logs(
+    client: httpx.AsyncClient,
+    mimecast_request: MimecastTTPURLSRequest,
+    log_type: str,
+    page_token: Optional[str],
+    rate_limit: asyncio.Semaphore,
+):
+    """
+    Invoke the Mimecast API call to get one page of TTP logs.
+
+    At most `MIMECAST_TTP_CONCURRENCY` requests of the tenant are in flight at once. When Mimecast
+    answers 429 the request is retried after the reset time it returns.
+    """
+    uri, response_model = TTP_LOG_TYPES[log_type][:2]
+    request_dict = await create_ttp_request_body(mimecast_request, log_type, page_token)
+    for attempt in range(MIMECAST_TTP_MAX_RETRIES + 1):
+        async with rate_limit:
+            # Headers are signed per request, as the signature covers the URI, date and request ID
+            response = await client.post(
+                url=mimecast_request.BaseURL + uri,
+                headers=mimecast_request.generate_headers(uri),
+                json=request_dict,
+            )
+        if response.status_code != 429 or attempt == MIMECAST_TTP_MAX_RETRIES:
+            break
+        reset_seconds = min(int(response.headers.get("X-RateLimit-Reset", 1000)) / 1000, MIMECAST_TTP_MAX_RETRY_WAIT)
+        logger.warning(f"Mimecast rate limit hit for TTP {log_type} logs, retrying in {reset_seconds}s")
+        await asyncio.sleep(reset_seconds)
+    response.raise_for_status()
+    response_body = response_model(**response.json())
+    if response_body.fail:
+        raise HTTPException(status_code=400, detail=f"Mimecast TTP {log_type} logs request failed: {response_body.fail}")
+    return response_body
+
+
+async def collect_ttp_logs(
+    client: httpx.AsyncClient,
     mimecast_request: MimecastTTPURLSRequest,
+    log_type: str,
     customer_code: str,
-) -> MimecastResponse:
-    logger.info("Mimecast TTP URL request received")
+    rate_limit: asyncio.Semaphore,
+) -> Tuple[int, Optional[str]]:
+    """
+    Pages through the TTP logs of one type and ships each page as it arrives.
+
+    Returns:
+        Tuple[int, Optional[str]]: The number of logs shipped and the page token of the last page.
+    """
+    logs_field = TTP_LOG_TYPES[log_type][2]
+    page_token = None
+    logs_shipped = 0
+    while True:
+        response = await invoke_mimecast_api_ttp_logs(client, mimecast_request, log_type, page_token, rate_limit)
+        messages = [
+            EventShipperPayload(
+                customer_code=customer_code,
+                integration="mimecast",
+                version="1.0",
+                **log.dict(by_alias=True),
+            )
+            for data in response.data
+            for log in getattr(data, logs_field)
+        ]
+        if messages:
+            await event_shipper_batch(messages, settings=mimecast_request.event_shipper_settings)
+            logs_shipped += len(messages)
+
+        # Check if there is a "next" page token in the response
+        next_page_token = response.meta.pagination.next
+        if not next_page_token:
+            return logs_shipped, page_token
+        page_token = next_page_token
+
+
+async def get_ttp_logs(
+    mimecast_request: MimecastTTPURLSRequest,
+    customer_code: str,
+) -> MimecastTTPSummaryResponse:
+    """
+    Collects the TTP URL, attachment and impersonation logs of the time range concurrently, over one
+    client, and ships them page by page.
+    """
+    logger.info("Mimecast TTP logs request received")
+    start = time.monotonic()
     # Get the BaseURL for the Mimecast integration
     mimecast_base_url = await get_base_url(
         MimecastAuthKeys(
@@ -443,31 +443,29 @@ async def get_ttp_urls(
     # Add it to the request object
     mimecast_request.BaseURL = mimecast_base_url.data.data[0].region.api
 
-    mimecast_request.pagination_token = None  # Initialize pagination_token to None
-
-    while True:
-        response = await invoke_mimecast_api_ttp_urls(mimecast_request)
-        logger.info(f"Response: {response}")
-
-        for data in response.data[0].clickLogs:
-            message = EventShipperPayload(
-                customer_code=customer_code,
-                integration="mimecast",
-                version="1.0",
-                **data.dict(by_alias=True),
-            )
-            await event_shipper(message)
-
-        # Check if there is a "next" page token in the response
-        next_page_token = response.meta.pagination.next
-
-        if not next_page_token:
-            break  # No more pages, break the loop
-
-        # Update the pagination_token for the next API call
-        mimecast_request.pagination_token = next_page_token
+    rate_limit = asyncio.Semaphore(MIMECAST_TTP_CONCURRENCY)
+    async with httpx.AsyncClient(timeout=120) as client:
+        results = await asyncio.gather(
+            *(collect_ttp_logs(client, mimecast_request, log_type, customer_code, rate_limit) for log_type in TTP_LOG_TYPES),
+            return_exceptions=True,
+        )
 
-    return MimecastResponse(
-        success=True,
-        message="Mimecast TTP URL request successful",
+    log_counts = {}
+    last_page_tokens = {}
+    failures = {}
+    for log_type, result in zip(TTP_LOG_TYPES, results):
+        if isinstance(result, Exception):
+            logger.error(f"Unable to collect Mimecast TTP {log_type} logs for customer {customer_code}: {result}")
+            failures[log_type] = result
+            continue
+        log_counts[log_type], last_page_tokens[log_type] = result
+    duration = round(time.monotonic() - start, 3)
+    logger.info(f"Shipped Mimecast TTP logs for customer {customer_code} in {duration}s: {log_counts}")
+
+    return MimecastTTPSummaryResponse(
+        success=not failures,
+        message=f"Mimecast TTP logs request failed for: {list(failures)}" if failures else "Mimecast TTP logs request successful",
+        log_counts=log_counts,
+        duration_seconds=duration,
+        last_page_tokens=last_page_tokens,
     )
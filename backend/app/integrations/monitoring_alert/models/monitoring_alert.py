@@ -1,13 +1,35 @@
+from datetime import datetime
+from enum import Enum
 from typing import Optional
 
+from sqlalchemy import Index
 from sqlmodel import Field
 from sqlmodel import SQLModel
 
 
+class MonitoringAlertStatus(str, Enum):
+    PENDING = "PENDING"
+    CLAIMED = "CLAIMED"
+    FAILED = "FAILED"
+
+
 class MonitoringAlerts(SQLModel, table=True):
+    """
+    Represents the monitoring alerts table.
+    Table is the queue between the Graylog webhook and the analysis jobs. An analysis run claims a batch of
+    pending alerts, so concurrent runs do not process the same alert, and deletes them once analyzed.
+    """
+
     __tablename__ = "monitoring_alerts"
+    __table_args__ = (
+        Index("ix_monitoring_alerts_queue", "customer_code", "alert_source", "status", "id", mysql_length={"alert_source": 64}),
+        Index("ix_monitoring_alerts_alert_id", "alert_id", mysql_length=255),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     alert_id: str = Field(max_length=1024, nullable=False)
     alert_index: str = Field(max_length=1024, nullable=False)
     customer_code: str = Field(max_length=50, nullable=False)
     alert_source: str = Field(max_length=1024, nullable=False)
+    status: str = Field(default=MonitoringAlertStatus.PENDING.value, max_length=20, nullable=False)
+    claimed_at: Optional[datetime] = Field(default=None, description="When an analysis run last claimed the alert.")
+    attempts: int = Field(default=0, nullable=False, description="How many times the alert was claimed.")
@@ -26,19 +26,40 @@ from app.integrations.monitoring_alert.schema.monitoring_alert import (
     MonitoringWazuhAlertsRequestModel,
 )
 from app.integrations.monitoring_alert.services.custom import analyze_custom_alert
+from app.integrations.monitoring_alert.services.office365_exchange import (
+    INDEXER_SOURCE_FIELDS as OFFICE365_EXCHANGE_SOURCE_FIELDS,
+)
+from app.integrations.monitoring_alert.services.office365_exchange import (
+    analyze_office365_exchange_online_alert,
+)
 from app.integrations.monitoring_alert.services.office365_exchange import (
     analyze_office365_exchange_online_alerts,
 )
+from app.integrations.monitoring_alert.services.office365_threatintel import (
+    INDEXER_SOURCE_FIELDS as OFFICE365_THREAT_INTEL_SOURCE_FIELDS,
+)
+from app.integrations.monitoring_alert.services.office365_threatintel import (
+    analyze_office365_threatintel_alert,
+)
 from app.integrations.monitoring_alert.services.office365_threatintel import (
     analyze_office365_threatintel_alerts,
 )
+from app.integrations.monitoring_alert.services.suricata import (
+    INDEXER_SOURCE_FIELDS as SURICATA_SOURCE_FIELDS,
+)
+from app.integrations.monitoring_alert.services.suricata import analyze_suricata_alert
 from app.integrations.monitoring_alert.services.suricata import analyze_suricata_alerts
+from app.integrations.monitoring_alert.services.wazuh import (
+    INDEXER_SOURCE_FIELDS as WAZUH_SOURCE_FIELDS,
+)
+from app.integrations.monitoring_alert.services.wazuh import analyze_wazuh_alert
 from app.integrations.monitoring_alert.services.wazuh import analyze_wazuh_alerts
-from app.integrations.sap_siem.services.sap_siem_multiple_logins import (
-    sap_siem_multiple_logins_same_ip,
+from app.integrations.monitoring_alert.utils.dispatcher import (
+    monitoring_alert_dispatcher,
 )
-from app.integrations.sap_siem.services.sap_siem_suspicious_logins import (
-    sap_siem_suspicious_logins,
+from app.integrations.monitoring_alert.utils.pipeline import run_analysis_pipeline
+from app.integrations.sap_siem.services.sap_siem_shared_scan import (
+    sap_siem_run_detector,
 )
 
 monitoring_alerts_router = APIRouter()
@@ -245,6 +266,9 @@ async def create_monitoring_alert(
         logger.error(f"Error creating monitoring alert: {e}")
         raise HTTPException(status_code=500, detail="Error creating monitoring alert")
 
+    # Start the analysis right away, the scheduled job only sweeps up what is left in the queue
+    monitoring_alert_dispatcher.notify(monitoring_alert.alert_source, monitoring_alert.customer_code)
+
     return GraylogPostResponse(
         success=True,
         message="Monitoring alert created successfully",
@@ -321,10 +345,10 @@ async def run_wazuh_analysis(
     """
     This route is used to run analysis on the monitoring alerts.
 
-    1. Get all the monitoring alerts from the database where the customer_code matches the customer_code provided
+    1. Claim the queued monitoring alerts in batches where the customer_code matches the customer_code provided
      and the alert_source is WAZUH.
 
-    2. Call the anlayze_wazuh_alerts function to analyze the alerts.
+    2. Analyze the alerts with the analysis pipeline.
 
     Args:
         request (MonitoringWazuhAlertsRequestModel): The customer code.
@@ -335,30 +359,24 @@ async def run_wazuh_analysis(
     """
     logger.info(f"Running analysis for customer_code: {request.customer_code}")
 
-    customer_meta = await get_customer_meta(request.customer_code, session)
+    # Make sure the customer exists before claiming its alerts
+    await get_customer_meta(request.customer_code, session)
 
-    monitoring_alerts = await session.execute(
-        select(MonitoringAlerts).where(
-            (MonitoringAlerts.customer_code == request.customer_code) & (MonitoringAlerts.alert_source == "WAZUH"),
-        ),
-    )
-    monitoring_alerts = monitoring_alerts.scalars().all()
+    # Claim and analyze the alerts in batches
+    result = await run_analysis_pipeline("WAZUH", [request.customer_code], analyze_wazuh_alert, WAZUH_SOURCE_FIELDS)
 
-    logger.info(f"Found {len(monitoring_alerts)} monitoring alerts")
+    logger.info(f"Analyzed {result.analyzed} of {result.claimed} monitoring alerts")
 
-    if not monitoring_alerts:
+    if not result.claimed:
         logger.info(f"No monitoring alerts found for customer_code: {request.customer_code}")
         return AlertAnalysisResponse(
             success=True,
             message="No monitoring alerts found",
         )
 
-    # Call the analyze_wazuh_alerts function to analyze the alerts
-    await analyze_wazuh_alerts(monitoring_alerts, customer_meta, session)
-
     return AlertAnalysisResponse(
-        success=True,
-        message="Analysis completed successfully",
+        success=not result.failed,
+        message=f"Analysis completed: {result.analyzed} alerts analyzed, {result.failed} failed",
     )
 
 
@@ -373,10 +391,10 @@ async def run_suricata_analysis(
     """
     This route is used to run analysis on the monitoring alerts.
 
-    1. Get all the monitoring alerts from the database where the customer_code matches the customer_code provided
+    1. Claim the queued monitoring alerts in batches where the customer_code matches the customer_code provided
      and the alert_source is SURICATA.
 
-    2. Call the anlayze_wazuh_alerts function to analyze the alerts.
+    2. Analyze the alerts with the analysis pipeline.
 
     Args:
         request (MonitoringWazuhAlertsRequestModel): The customer code.
@@ -387,26 +405,20 @@ async def run_suricata_analysis(
     """
     logger.info(f"Running analysis for customer_code: {request.customer_code}")
 
-    customer_meta = await get_customer_meta(request.customer_code, session)
+    # Make sure the customer exists before claiming its alerts
+    await get_customer_meta(request.customer_code, session)
 
-    monitoring_alerts = await session.execute(
-        select(MonitoringAlerts).where(
-            (MonitoringAlerts.customer_code == request.customer_code) & (MonitoringAlerts.alert_source == "SURICATA"),
-        ),
-    )
-    monitoring_alerts = monitoring_alerts.scalars().all()
+    # Claim and analyze the alerts in batches
+    result = await run_analysis_pipeline("SURICATA", [request.customer_code], analyze_suricata_alert, SURICATA_SOURCE_FIELDS)
 
-    logger.info(f"Found {len(monitoring_alerts)} monitoring alerts")
+    logger.info(f"Analyzed {result.analyzed} of {result.claimed} monitoring alerts")
 
-    if not monitoring_alerts:
+    if not result.claimed:
         raise HTTPException(status_code=404, detail="No monitoring alerts found")
 
-    # Call the analyze_wazuh_alerts function to analyze the alerts
-    await analyze_suricata_alerts(monitoring_alerts, customer_meta, session)
-
     return AlertAnalysisResponse(
-        success=True,
-        message="Analysis completed successfully",
+        success=not result.failed,
+        message=f"Analysis completed: {result.analyzed} alerts analyzed, {result.failed} failed",
     )
 
 
@@ -421,10 +433,10 @@ async def run_office365_exchange_online_analysis(
     """
     This route is used to run analysis on the monitoring alerts.
 
-    1. Get all the monitoring alerts from the database where the customer_code matches the customer_code provided
+    1. Claim the queued monitoring alerts in batches where the customer_code matches the customer_code provided
      and the alert_source is OFFICE365_EXCHANGE_ONLINE.
 
-    2. Call the analyze_office365_exchange_online_alerts function to analyze the alerts.
+    2. Analyze the alerts with the analysis pipeline.
 
     Args:
         request (MonitoringWazuhAlertsRequestModel): The customer code.
@@ -435,26 +447,25 @@ async def run_office365_exchange_online_analysis(
     """
     logger.info(f"Running analysis for customer_code: {request.customer_code}")
 
-    customer_meta = await get_customer_meta(request.customer_code, session)
+    # Make sure the customer exists before claiming its alerts
+    await get_customer_meta(request.customer_code, session)
 
-    monitoring_alerts = await session.execute(
-        select(MonitoringAlerts).where(
-            (MonitoringAlerts.customer_code == request.customer_code) & (MonitoringAlerts.alert_source == "OFFICE365_EXCHANGE_ONLINE"),
-        ),
+    # Claim and analyze the alerts in batches
+    result = await run_analysis_pipeline(
+        "OFFICE365_EXCHANGE_ONLINE",
+        [request.customer_code],
+        analyze_office365_exchange_online_alert,
+        OFFICE365_EXCHANGE_SOURCE_FIELDS,
     )
-    monitoring_alerts = monitoring_alerts.scalars().all()
 
-    logger.info(f"Found {len(monitoring_alerts)} monitoring alerts")
+    logger.info(f"Analyzed {result.analyzed} of {result.claimed} monitoring alerts")
 
-    if not monitoring_alerts:
+    if not result.claimed:
         raise HTTPException(status_code=404, detail="No monitoring alerts found")
 
-    # Call the analyze_office365_exchange_online_alerts function to analyze the alerts
-    await analyze_office365_exchange_online_alerts(monitoring_alerts, customer_meta, session)
-
     return AlertAnalysisResponse(
-        success=True,
-        message="Analysis completed successfully",
+        success=not result.failed,
+        message=f"Analysis completed: {result.analyzed} alerts analyzed, {result.failed} failed",
     )
 
 
@@ -469,10 +480,10 @@ async def run_office365_threat_intel_analysis(
     """
     This route is used to run analysis on the monitoring alerts.
 
-    1. Get all the monitoring alerts from the database where the customer_code matches the customer_code provided
+    1. Claim the queued monitoring alerts in batches where the customer_code matches the customer_code provided
      and the alert_source is OFFICE365_THREAT_INTEL.
 
-    2. Call the analyze_office365_threatintel_alerts function to analyze the alerts.
+    2. Analyze the alerts with the analysis pipeline.
 
     Args:
         request (MonitoringWazuhAlertsRequestModel): The customer code.
@@ -483,26 +494,25 @@ async def run_office365_threat_intel_analysis(
     """
     logger.info(f"Running analysis for customer_code: {request.customer_code}")
 
-    customer_meta = await get_customer_meta(request.customer_code, session)
+    # Make sure the customer exists before claiming its alerts
+    await get_customer_meta(request.customer_code, session)
 
-    monitoring_alerts = await session.execute(
-        select(MonitoringAlerts).where(
-            (MonitoringAlerts.customer_code == request.customer_code) & (MonitoringAlerts.alert_source == "OFFICE365_THREAT_INTEL"),
-        ),
+    # Claim and analyze the alerts in batches
+    result = await run_analysis_pipeline(
+        "OFFICE365_THREAT_INTEL",
+        [request.customer_code],
+        analyze_office365_threatintel_alert,
+        OFFICE365_THREAT_INTEL_SOURCE_FIELDS,
     )
-    monitoring_alerts = monitoring_alerts.scalars().all()
 
-    logger.info(f"Found {len(monitoring_alerts)} monitoring alerts")
+    logger.info(f"Analyzed {result.analyzed} of {result.claimed} monitoring alerts")
 
-    if not monitoring_alerts:
+    if not result.claimed:
         raise HTTPException(status_code=404, detail="No monitoring alerts found")
 
-    # Call the analyze_office365_threatintel_alerts function to analyze the alerts
-    await analyze_office365_threatintel_alerts(monitoring_alerts, customer_meta, session)
-
     return AlertAnalysisResponse(
-        success=True,
-        message="Analysis completed successfully",
+        success=not result.failed,
+        message=f"Analysis completed: {result.analyzed} alerts analyzed, {result.failed} failed",
     )
 
 
@@ -520,7 +530,7 @@ async def run_sap_siem_suspicious_logins_analysis(
     1. Get all the monitoring alerts from the database where the customer_code matches the customer_code provided
      and the alert_source is SAP SIEM.
 
-    2. Call the sap_siem_suspicious_logins function to analyze the alerts.
+    2. Run the suspicious_logins detector of the SAP SIEM shared analysis.
 
     Args:
         request (CollectSapSiemRequest): The customer code.
@@ -532,7 +542,7 @@ async def run_sap_siem_suspicious_logins_analysis(
     logger.info("Running analysis for SAP SIEM suspicious logins")
 
     # Call the analyze_wazuh_alerts function to analyze the alerts
-    await sap_siem_suspicious_logins(threshold=threshold, session=session)
+    await sap_siem_run_detector("suspicious_logins", threshold=threshold, time_range=None, session=session)
 
     return AlertAnalysisResponse(
         success=True,
@@ -555,7 +565,7 @@ async def run_sap_siem_multiple_logins_same_ip_analysis(
     1. Get all the monitoring alerts from the database where the customer_code matches the customer_code provided
      and the alert_source is SAP SIEM.
 
-    2. Call the sap_siem_multiple_logins_same_ip function to analyze the alerts.
+    2. Run the multiple_logins_same_ip detector of the SAP SIEM shared analysis.
 
     Args:
         request (CollectSapSiemRequest): The customer code.
@@ -567,7 +577,7 @@ async def run_sap_siem_multiple_logins_same_ip_analysis(
     logger.info("Running analysis for SAP SIEM multiple logins")
 
     # Call the analyze_wazuh_alerts function to analyze the alerts
-    await sap_siem_multiple_logins_same_ip(threshold=threshold, time_range=time_range, session=session)
+    await sap_siem_run_detector("multiple_logins_same_ip", threshold=threshold, time_range=time_range, session=session)
 
     return AlertAnalysisResponse(
         success=True,
@@ -257,7 +257,7 @@ async def provision_monitoring_alert_testing_route(
         version="1.0",
         **request,
     )
-    await event_shipper(message)
+    await event_shipper(message, spool_on_failure=False)
     return ProvisionWazuhMonitoringAlertResponse(
         success=True,
         message="Event sent to log shipper successfully.",
@@ -209,6 +209,15 @@ class AlertAnalysisResponse(BaseModel):
     )
 
 
+class AlertPipelineResult(BaseModel):
+    alert_source: str = Field(..., description="The source of the analyzed alerts", example="WAZUH")
+    claimed: int = Field(0, description="Number of alerts claimed from the queue")
+    analyzed: int = Field(0, description="Number of alerts analyzed")
+    failed: int = Field(0, description="Number of alerts that failed and were released to the queue")
+    missing: int = Field(0, description="Number of alerts whose document was not found in the Wazuh-Indexer")
+    excluded: int = Field(0, description="Number of alerts acknowledged without escalation because they matched an exclusion")
+
+
 # ! Wazuh Indexer Schema ! #
 class WazuhSourceModel(BaseModel):
     agent_name: str = Field(..., description="The name of the agent.")
@@ -1,8 +1,8 @@
+import asyncio
 import json
 from typing import Optional
 from typing import Set
 
-from fastapi import HTTPException
 from loguru import logger
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -37,10 +37,28 @@ from app.integrations.monitoring_alert.schema.monitoring_alert import (
     SuricataIrisAlertPayload,
 )
 from app.integrations.monitoring_alert.schema.monitoring_alert import SuricataIrisAsset
-from app.integrations.monitoring_alert.utils.db_operations import remove_alert_id
+from app.integrations.monitoring_alert.utils.coalescing import alert_coalescer
+from app.integrations.monitoring_alert.utils.coalescing import coalesce_alert
+from app.integrations.monitoring_alert.utils.db_operations import settle_alerts
+from app.integrations.monitoring_alert.utils.pipeline import AlertExcluded
 from app.integrations.utils.alerts import validate_ioc_type
 from app.utils import get_customer_alert_settings
 
+# The `_source` fields of the Wazuh-Indexer document the analysis uses
+INDEXER_SOURCE_FIELDS = [
+    "agent_labels_customer",
+    "agent_name",
+    "alert_severity",
+    "alert_signature",
+    "alert_signature_id",
+    "app_proto",
+    "dest_ip",
+    "process_id",
+    "src_ip",
+    "timestamp",
+    "timestamp_utc",
+]
+
 
 def valid_ioc_fields() -> Set[str]:
     """
@@ -154,14 +172,18 @@ async def fetch_wazuh_indexer_details(alert_id: str, index: str) -> SuricataAler
     )
 
     es_client = await create_wazuh_indexer_client("Wazuh-Indexer")
-    response = es_client.get(index=index, id=alert_id)
+    response = await asyncio.to_thread(es_client.get, index=index, id=alert_id)
 
     return SuricataAlertModel(**response)
 
 
-async def fetch_alert_details(alert: MonitoringAlerts) -> SuricataAlertModel:
+async def fetch_alert_details(alert: MonitoringAlerts, document: Optional[dict] = None) -> SuricataAlertModel:
     logger.info(f"Analyzing Suricata alert: {alert.alert_id}")
-    alert_details = await fetch_wazuh_indexer_details(alert.alert_id, alert.alert_index)
+    if document is None:
+        alert_details = await fetch_wazuh_indexer_details(alert.alert_id, alert.alert_index)
+    else:
+        # The document was already fetched with the other alerts of its batch
+        alert_details = SuricataAlertModel(**document)
     logger.info(f"Alert details: {alert_details}")
     return alert_details
 
@@ -180,10 +202,7 @@ async def check_event_exclusion(
         session=session,
     )
     if event_exclude_result is True:
-        raise HTTPException(
-            status_code=400,
-            detail="Alert excluded due to multi exclusion as set in the config.ini file.",
-        )
+        raise AlertExcluded("Alert excluded due to multi exclusion as set in the config.ini file.")
     logger.info("Alert is not excluded due to multi exclusion.")
 
 
@@ -481,6 +500,98 @@ async def remove_duplicate_assets(current_assets):
     return current_assets
 
 
+async def escalate_suricata_alert(alert: MonitoringAlerts, alert_details: SuricataAlertModel, session: AsyncSession) -> int:
+    """
+    Create the alert in IRIS if no open alert exists for it, otherwise add the asset to the open alert.
+    Then link the IRIS alert in the Wazuh-Indexer document.
+
+    Args:
+        alert (MonitoringAlerts): The queued monitoring alert.
+        alert_details (SuricataAlertModel): The alert details from the Wazuh-Indexer.
+        session (AsyncSession): The database session.
+
+    Returns:
+        int: The ID of the IRIS alert.
+    """
+    iris_alert_id = await check_if_open_alert_exists_in_iris(alert_details, session=session)
+    if iris_alert_id == []:
+        logger.info(
+            f"Alert {alert_details._id} does not exist in IRIS. Creating alert.",
+        )
+        iris_alert_id = await create_and_update_alert_in_iris(
+            alert_details,
+            session,
+        )
+        logger.info(f"Alert {iris_alert_id} created in IRIS.")
+        es_client = await create_wazuh_indexer_client("Wazuh-Indexer")
+        await add_alert_to_document(
+            es_client=es_client,
+            alert=AddAlertRequest(
+                alert_id=alert_details._id,
+                index_name=alert_details._index,
+            ),
+            soc_alert_id=iris_alert_id,
+            session=session,
+        )
+
+    else:
+        logger.info(
+            f"Alert {iris_alert_id} exists in IRIS. Updating alert with the asset.",
+        )
+
+        # Fetch the current list of assets from the alert to avoid overwriting them
+        client, alert_client = await initialize_client_and_alert("DFIR-IRIS")
+        current_assets = await get_current_assets(
+            client,
+            alert_client,
+            iris_alert_id,
+        )
+        alert_details = await create_alert_details(alert_details)
+        asset_payload = await build_asset_payload(
+            alert_details=alert_details,
+            session=session,
+        )
+        current_assets.append(dict(SuricataIrisAsset(**asset_payload.to_dict())))
+        current_assets = await remove_duplicate_assets(current_assets)
+        await update_alert_with_assets(
+            client,
+            alert_client,
+            iris_alert_id,
+            current_assets,
+        )
+        es_client = await create_wazuh_indexer_client("Wazuh-Indexer")
+        await add_alert_to_document(
+            es_client=es_client,
+            alert=AddAlertRequest(
+                alert_id=alert.alert_id,
+                index_name=alert.alert_index,
+            ),
+            soc_alert_id=iris_alert_id,
+            session=session,
+        )
+    return iris_alert_id
+
+
+async def analyze_suricata_alert(alert: MonitoringAlerts, session: AsyncSession, document: Optional[dict] = None) -> None:
+    """
+    Analyze a single Suricata alert. Repeats of the alert for the same customer, rule and asset within the
+    coalescing window are folded into one IRIS alert, the others are escalated to IRIS.
+
+    Args:
+        alert (MonitoringAlerts): The queued monitoring alert.
+        session (AsyncSession): The database session.
+        document (Optional[dict]): The Wazuh-Indexer document of the alert if already fetched.
+    """
+    alert_details = await fetch_alert_details(alert, document)
+    await coalesce_alert(
+        key=(alert.alert_source, alert.customer_code, alert_details._source["alert_signature_id"], alert_details._source["src_ip"]),
+        alert=AddAlertRequest(alert_id=alert_details._id, index_name=alert_details._index),
+        seen_at=alert_details._source.get("timestamp_utc") or alert_details._source.get("timestamp"),
+        escalate=lambda: escalate_suricata_alert(alert, alert_details, session),
+        session=session,
+    )
+
+
 async def analyze_suricata_alerts(
     monitoring_alerts: MonitoringAlerts,
     customer_meta: CustomersMeta,
@@ -502,66 +613,20 @@ async def analyze_suricata_alerts(
         AlertAnalysisResponse: The analysis response.
     """
     logger.info(f"Analyzing Suricata alerts with customer_meta: {customer_meta}")
-    for alert in monitoring_alerts:
-        alert_details = await fetch_alert_details(alert)
-        iris_alert_id = await check_if_open_alert_exists_in_iris(alert_details, session=session)
-        if iris_alert_id == []:
-            logger.info(
-                f"Alert {alert_details._id} does not exist in IRIS. Creating alert.",
-            )
-            iris_alert_id = await create_and_update_alert_in_iris(
-                alert_details,
-                session,
-            )
-            logger.info(f"Alert {iris_alert_id} created in IRIS.")
-            await remove_alert_id(alert.alert_id, session)
-            es_client = await create_wazuh_indexer_client("Wazuh-Indexer")
-            await add_alert_to_document(
-                es_client=es_client,
-                alert=AddAlertRequest(
-                    alert_id=alert_details._id,
-                    index_name=alert_details._index,
-                ),
-                soc_alert_id=iris_alert_id,
-                session=session,
-            )
-
-        else:
-            logger.info(
-                f"Alert {iris_alert_id} exists in IRIS. Updating alert with the asset.",
-            )
-
-            # Fetch the current list of assets from the alert to avoid overwriting them
-            client, alert_client = await initialize_client_and_alert("DFIR-IRIS")
-            current_assets = await get_current_assets(
-                client,
-                alert_client,
-                iris_alert_id,
-            )
-            alert_details = await create_alert_details(alert_details)
-            asset_payload = await build_asset_payload(
-                alert_details=alert_details,
-                session=session,
-            )
-            current_assets.append(dict(SuricataIrisAsset(**asset_payload.to_dict())))
-            current_assets = await remove_duplicate_assets(current_assets)
-            await update_alert_with_assets(
-                client,
-                alert_client,
-                iris_alert_id,
-                current_assets,
-            )
-            await remove_alert_id(alert.alert_id, session)
-            es_client = await create_wazuh_indexer_client("Wazuh-Indexer")
-            await add_alert_to_document(
-                es_client=es_client,
-                alert=AddAlertRequest(
-                    alert_id=alert.alert_id,
-                    index_name=alert.alert_index,
-                ),
-                soc_alert_id=iris_alert_id,
-                session=session,
-            )
+    claimed_ids = [alert.id for alert in monitoring_alerts]
+    processed_ids = []
+    try:
+        for alert in monitoring_alerts:
+            await analyze_suricata_alert(alert, session)
+            processed_ids.append(alert.id)
+    except Exception:
+        # Discard the failed transaction so the batch can still be settled
+        await session.rollback()
+        raise
+    finally:
+        await settle_alerts(claimed_ids, processed_ids, session)
+    # Record the occurrences folded into existing IRIS alerts during the run
+    await alert_coalescer.flush()
 
     return AlertAnalysisResponse(
         success=True,
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from typing import Optional
 from typing import Set
@@ -39,11 +40,28 @@ from app.integrations.monitoring_alert.schema.monitoring_alert import (
 from app.integrations.monitoring_alert.schema.monitoring_alert import (
     WazuhIrisAlertPayload,
 )
-from app.integrations.monitoring_alert.utils.db_operations import remove_alert_id
+from app.integrations.monitoring_alert.utils.coalescing import alert_coalescer
+from app.integrations.monitoring_alert.utils.coalescing import coalesce_alert
+from app.integrations.monitoring_alert.utils.db_operations import settle_alerts
+from app.integrations.monitoring_alert.utils.pipeline import AlertExcluded
 from app.integrations.utils.alerts import get_asset_type_id
 from app.integrations.utils.alerts import validate_ioc_type
 from app.utils import get_customer_alert_settings
 
+# The `_source` fields of the Wazuh-Indexer document the analysis uses
+INDEXER_SOURCE_FIELDS = [
+    "agent_id",
+    "agent_ip",
+    "agent_labels_customer",
+    "agent_name",
+    "process_id",
+    "rule_description",
+    "rule_id",
+    "rule_level",
+    "timestamp",
+    "timestamp_utc",
+]
+
 
 def valid_ioc_fields() -> Set[str]:
     """
@@ -164,7 +182,7 @@ async def fetch_wazuh_indexer_details(alert_id: str, index: str) -> WazuhAlertMo
     es_client = await create_wazuh_indexer_client("Wazuh-Indexer")
     logger.info(f"Fetching alert from wazuh-indexer: {alert_id}")
     try:
-        response = es_client.get(index=index, id=alert_id)
+        response = await asyncio.to_thread(es_client.get, index=index, id=alert_id)
     except Exception as e:
         logger.info(f"Error fetching alert from wazuh-indexer: {e}")
         raise HTTPException(
@@ -176,9 +194,13 @@ async def fetch_wazuh_indexer_details(alert_id: str, index: str) -> WazuhAlertMo
     return WazuhAlertModel(**response)
 
 
-async def fetch_alert_details(alert: MonitoringAlerts) -> WazuhAlertModel:
+async def fetch_alert_details(alert: MonitoringAlerts, document: Optional[dict] = None) -> WazuhAlertModel:
     logger.info(f"Analyzing Wazuh alert: {alert.alert_id}")
-    alert_details = await fetch_wazuh_indexer_details(alert.alert_id, alert.alert_index)
+    if document is None:
+        alert_details = await fetch_wazuh_indexer_details(alert.alert_id, alert.alert_index)
+    else:
+        # The document was already fetched with the other alerts of its batch
+        alert_details = WazuhAlertModel(**document)
     logger.info(f"Alert details: {alert_details}")
     return alert_details
 
@@ -197,10 +219,7 @@ async def check_event_exclusion(
         session=session,
     )
     if event_exclude_result is True:
-        raise HTTPException(
-            status_code=400,
-            detail="Alert excluded due to multi exclusion as set in the config.ini file.",
-        )
+        raise AlertExcluded("Alert excluded due to multi exclusion as set in the config.ini file.")
     logger.info("Alert is not excluded due to multi exclusion.")
 
 
@@ -503,6 +522,101 @@ async def remove_duplicate_assets(current_assets):
     return current_assets
 
 
+async def escalate_wazuh_alert(alert: MonitoringAlerts, alert_details: WazuhAlertModel, session: AsyncSession) -> int:
+    """
+    Create the alert in IRIS if no open alert exists for it, otherwise add the asset to the open alert.
+    Then link the IRIS alert in the Wazuh-Indexer document.
+
+    Args:
+        alert (MonitoringAlerts): The queued monitoring alert.
+        alert_details (WazuhAlertModel): The alert details from the Wazuh-Indexer.
+        session (AsyncSession): The database session.
+
+    Returns:
+        int: The ID of the IRIS alert.
+    """
+    iris_alert_id = await check_if_open_alert_exists_in_iris(alert_details, session=session)
+    if iris_alert_id == []:
+        logger.info(
+            f"Alert {alert_details._id} does not exist in IRIS. Creating alert.",
+        )
+        iris_alert_id = await create_and_update_alert_in_iris(
+            alert_details,
+            session,
+        )
+        es_client = await create_wazuh_indexer_client("Wazuh-Indexer")
+        await add_alert_to_document(
+            es_client=es_client,
+            alert=AddAlertRequest(
+                alert_id=alert_details._id,
+                index_name=alert_details._index,
+            ),
+            soc_alert_id=iris_alert_id,
+            session=session,
+        )
+
+    else:
+        logger.info(
+            f"Alert {iris_alert_id} exists in IRIS. Updating alert with the asset.",
+        )
+        # Fetch the current list of assets from the alert to avoid overwriting them
+        client, alert_client = await initialize_client_and_alert("DFIR-IRIS")
+        current_assets = await get_current_assets(
+            client,
+            alert_client,
+            iris_alert_id,
+        )
+        alert_details = await create_alert_details(alert_details)
+        agent_details = await get_agent_by_hostname(alert_details.agent_name, session)
+        asset_payload = await build_asset_payload(
+            agent_data=agent_details,
+            alert_details=alert_details,
+            session=session,
+        )
+        current_assets.append(dict(IrisAsset(**asset_payload.to_dict())))
+        current_assets = await remove_duplicate_assets(current_assets)
+        await update_alert_with_assets(
+            client,
+            alert_client,
+            iris_alert_id,
+            current_assets,
+        )
+        es_client = await create_wazuh_indexer_client("Wazuh-Indexer")
+        await add_alert_to_document(
+            es_client=es_client,
+            alert=AddAlertRequest(
+                alert_id=alert_details.id,
+                index_name=alert_details.index,
+            ),
+            soc_alert_id=iris_alert_id,
+            session=session,
+        )
+    return iris_alert_id
+
+
+async def analyze_wazuh_alert(alert: MonitoringAlerts, session: AsyncSession, document: Optional[dict] = None) -> None:
+    """
+    Analyze a single Wazuh alert. Repeats of the alert for the same customer, rule and asset within the
+    coalescing window are folded into one IRIS alert, the others are escalated to IRIS.
+
+    Args:
+        alert (MonitoringAlerts): The queued monitoring alert.
+        session (AsyncSession): The database session.
+        document (Optional[dict]): The Wazuh-Indexer document of the alert if already fetched.
+    """
+    alert_detail_service = await AlertDetailsService.create()
+    logger.info(f"Analyzing Wazuh alert: {alert.alert_id}")
+    alert_details = await fetch_alert_details(alert, document)
+    await check_event_exclusion(alert_details, alert_detail_service, session)
+    await coalesce_alert(
+        key=(alert.alert_source, alert.customer_code, alert_details._source["rule_id"], alert_details._source["agent_name"]),
+        alert=AddAlertRequest(alert_id=alert_details._id, index_name=alert_details._index),
+        seen_at=alert_details._source.get("timestamp_utc") or alert_details._source.get("timestamp"),
+        escalate=lambda: escalate_wazuh_alert(alert, alert_details, session),
+        session=session,
+    )
+
+
 async def analyze_wazuh_alerts(
     monitoring_alerts: MonitoringAlerts,
     customer_meta: CustomersMeta,
@@ -525,69 +639,20 @@ async def analyze_wazuh_alerts(
     """
     logger.info(f"Analyzing Wazuh alerts with customer_meta: {customer_meta}")
     logger.info(f"Analyzing Wazuh alerts: {monitoring_alerts}")
-    alert_detail_service = await AlertDetailsService.create()
-    for alert in monitoring_alerts:
-        logger.info(f"Analyzing Wazuh alert: {alert.alert_id}")
-        alert_details = await fetch_alert_details(alert)
-        await check_event_exclusion(alert_details, alert_detail_service, session)
-        iris_alert_id = await check_if_open_alert_exists_in_iris(alert_details, session=session)
-        if iris_alert_id == []:
-            logger.info(
-                f"Alert {alert_details._id} does not exist in IRIS. Creating alert.",
-            )
-            iris_alert_id = await create_and_update_alert_in_iris(
-                alert_details,
-                session,
-            )
-            await remove_alert_id(alert.alert_id, session)
-            es_client = await create_wazuh_indexer_client("Wazuh-Indexer")
-            await add_alert_to_document(
-                es_client=es_client,
-                alert=AddAlertRequest(
-                    alert_id=alert_details._id,
-                    index_name=alert_details._index,
-                ),
-                soc_alert_id=iris_alert_id,
-                session=session,
-            )
-
-        else:
-            logger.info(
-                f"Alert {iris_alert_id} exists in IRIS. Updating alert with the asset.",
-            )
-            # Fetch the current list of assets from the alert to avoid overwriting them
-            client, alert_client = await initialize_client_and_alert("DFIR-IRIS")
-            current_assets = await get_current_assets(
-                client,
-                alert_client,
-                iris_alert_id,
-            )
-            alert_details = await create_alert_details(alert_details)
-            agent_details = await get_agent_by_hostname(alert_details.agent_name, session)
-            asset_payload = await build_asset_payload(
-                agent_data=agent_details,
-                alert_details=alert_details,
-                session=session,
-            )
-            current_assets.append(dict(IrisAsset(**asset_payload.to_dict())))
-            current_assets = await remove_duplicate_assets(current_assets)
-            await update_alert_with_assets(
-                client,
-                alert_client,
-                iris_alert_id,
-                current_assets,
-            )
-            await remove_alert_id(alert.alert_id, session)
-            es_client = await create_wazuh_indexer_client("Wazuh-Indexer")
-            await add_alert_to_document(
-                es_client=es_client,
-                alert=AddAlertRequest(
-                    alert_id=alert_details.id,
-                    index_name=alert_details.index,
-                ),
-                soc_alert_id=iris_alert_id,
-                session=session,
-            )
+    claimed_ids = [alert.id for alert in monitoring_alerts]
+    processed_ids = []
+    try:
+        for alert in monitoring_alerts:
+            await analyze_wazuh_alert(alert, session)
+            processed_ids.append(alert.id)
+    except Exception:
+        # Discard the failed transaction so the batch can still be settled
+        await session.rollback()
+        raise
+    finally:
+        await settle_alerts(claimed_ids, processed_ids, session)
+    # Record the occurrences folded into existing IRIS alerts during the run
+    await alert_coalescer.flush()
 
     return AlertAnalysisResponse(
         success=True,
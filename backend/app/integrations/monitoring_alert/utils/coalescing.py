@@ -0,0 +1,197 @@
+import asyncio
+import os
+import time
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.connectors.dfir_iris.utils.universal import fetch_and_validate_data
+from app.connectors.dfir_iris.utils.universal import initialize_client_and_alert
+from app.connectors.wazuh_indexer.utils.universal import create_wazuh_indexer_client
+from app.integrations.alert_escalation.schema.general_alert import (
+    CreateAlertRequest as AddAlertRequest,
+)
+from app.integrations.alert_escalation.services.general_alert import (
+    add_alert_to_document,
+)
+
+# Seconds during which repeats of an alert for the same customer, rule and asset are folded into the
+# IRIS alert created for the first one. 0 disables coalescing.
+MONITORING_ALERT_COALESCE_WINDOW_SECONDS = int(os.getenv("MONITORING_ALERT_COALESCE_WINDOW_SECONDS", 300))
+# Number of source document IDs listed on a coalesced IRIS alert
+MONITORING_ALERT_COALESCE_MAX_DOCUMENT_IDS = int(os.getenv("MONITORING_ALERT_COALESCE_MAX_DOCUMENT_IDS", 100))
+
+# Lines around the occurrences in the note of an IRIS alert, so they can be updated without touching the rest
+COALESCED_NOTE_START = "--- Coalesced occurrences ---"
+COALESCED_NOTE_END = "--- End of coalesced occurrences ---"
+
+# The alert source, customer code, rule ID and asset of an alert
+CoalescingKey = Tuple[str, str, str, str]
+# The alert source, customer code and rule ID of an alert, which select the open IRIS alert it is escalated to
+EscalationKey = Tuple[str, str, str]
+
+
+class CoalescedAlert:
+    """
+    The occurrences of an alert folded into one IRIS alert.
+    """
+
+    def __init__(self, iris_alert_id: int, document_id: str, seen_at: Optional[str]):
+        self.iris_alert_id = iris_alert_id
+        self.started = time.monotonic()
+        self.first_seen = seen_at
+        self.last_seen = seen_at
+        self.occurrences = 1
+        self.document_ids: List[str] = [document_id]
+        # Whether occurrences were folded in since the IRIS alert was last updated
+        self.dirty = False
+
+    def add(self, document_id: str, seen_at: Optional[str]) -> None:
+        self.occurrences += 1
+        if seen_at:
+            self.first_seen = min(self.first_seen or seen_at, seen_at)
+            self.last_seen = max(self.last_seen or seen_at, seen_at)
+        if len(self.document_ids) < MONITORING_ALERT_COALESCE_MAX_DOCUMENT_IDS:
+            self.document_ids.append(document_id)
+        self.dirty = True
+
+    def note(self) -> str:
+        listed = f" (first {len(self.document_ids)} listed)" if len(self.document_ids) < self.occurrences else ""
+        return (
+            f"{COALESCED_NOTE_START}\n"
+            f"Occurrences: {self.occurrences}\n"
+            f"First seen: {self.first_seen}\n"
+            f"Last seen: {self.last_seen}\n"
+            f"Source documents{listed}: {', '.join(self.document_ids)}\n"
+            f"{COALESCED_NOTE_END}"
+        )
+
+
+def merge_coalesced_note(current_note: Optional[str], section: str) -> str:
+    """
+    Replaces the coalesced occurrences section of an IRIS alert note with `section`, or appends it to the note
+    if it has none yet. The rest of the note is kept as it is.
+    """
+    current_note = current_note or ""
+    start = current_note.find(COALESCED_NOTE_START)
+    end = current_note.find(COALESCED_NOTE_END, start)
+    if start != -1 and end != -1:
+        return current_note[:start] + section + current_note[end + len(COALESCED_NOTE_END) :]
+    if not current_note.strip():
+        return section
+    return f"{current_note.rstrip()}\n\n{section}"
+
+
+class AlertCoalescer:
+    """
+    Folds repeats of an alert into the IRIS alert created for its first occurrence within
+    `MONITORING_ALERT_COALESCE_WINDOW_SECONDS`. The occurrence count, first and last seen times and source
+    document IDs are written to a section of the note of the IRIS alert when the coalescer is flushed.
+    """
+
+    def __init__(self):
+        self.entries: Dict[CoalescingKey, CoalescedAlert] = {}
+        self.locks: Dict[CoalescingKey, asyncio.Lock] = {}
+        self.escalation_locks: Dict[EscalationKey, asyncio.Lock] = {}
+        # Entries whose window ended before their last occurrences were written to IRIS
+        self.retired: List[CoalescedAlert] = []
+
+    def lock(self, key: CoalescingKey) -> asyncio.Lock:
+        return self.locks.setdefault(key, asyncio.Lock())
+
+    def escalation_lock(self, key: EscalationKey) -> asyncio.Lock:
+        return self.escalation_locks.setdefault(key, asyncio.Lock())
+
+    def active(self, key: CoalescingKey) -> Optional[CoalescedAlert]:
+        entry = self.entries.get(key)
+        if entry is not None and time.monotonic() - entry.started < MONITORING_ALERT_COALESCE_WINDOW_SECONDS:
+            return entry
+        return None
+
+    def start(self, key: CoalescingKey, iris_alert_id: int, document_id: str, seen_at: Optional[str]) -> None:
+        if MONITORING_ALERT_COALESCE_WINDOW_SECONDS <= 0:
+            return
+        previous = self.entries.get(key)
+        if previous is not None and previous.dirty:
+            self.retired.append(previous)
+        self.entries[key] = CoalescedAlert(iris_alert_id, document_id, seen_at)
+
+    async def flush(self) -> None:
+        """
+        Writes the occurrences folded in since the last flush to the IRIS alerts and forgets the entries
+        whose window ended.
+        """
+        retired, self.retired = self.retired, []
+        pending = [*retired, *(entry for entry in self.entries.values() if entry.dirty)]
+        if pending:
+            client, alert_client = await initialize_client_and_alert("DFIR-IRIS")
+            for entry in pending:
+                try:
+                    result = await fetch_and_validate_data(client, alert_client.get_alert, entry.iris_alert_id)
+                    note = merge_coalesced_note(result["data"].get("alert_note"), entry.note())
+                    await fetch_and_validate_data(client, alert_client.update_alert, entry.iris_alert_id, {"alert_note": note})
+                    entry.dirty = False
+                    logger.info(f"Recorded {entry.occurrences} occurrences on IRIS alert {entry.iris_alert_id}")
+                except Exception as e:
+                    logger.error(f"Failed to record the occurrences of IRIS alert {entry.iris_alert_id}: {e}")
+        # Retry the retired entries that could not be written on the next flush
+        self.retired.extend(entry for entry in retired if entry.dirty)
+
+        for key, entry in list(self.entries.items()):
+            if self.active(key) is None and not entry.dirty:
+                del self.entries[key]
+        for key, lock in list(self.locks.items()):
+            if key not in self.entries and not lock.locked():
+                del self.locks[key]
+        for key, lock in list(self.escalation_locks.items()):
+            if not lock.locked():
+                del self.escalation_locks[key]
+
+
+alert_coalescer = AlertCoalescer()
+
+
+async def coalesce_alert(
+    key: CoalescingKey,
+    alert: AddAlertRequest,
+    seen_at: Optional[str],
+    escalate: Callable[[], Awaitable[int]],
+    session: AsyncSession,
+) -> int:
+    """
+    Folds the alert into the IRIS alert of an earlier occurrence within the window, or escalates it to IRIS.
+    A folded alert skips IRIS and is only linked to the IRIS alert in the Wazuh-Indexer.
+
+    Args:
+        key (CoalescingKey): The alert source, customer code, rule ID and asset of the alert.
+        alert (AddAlertRequest): The ID and index of the alert document.
+        seen_at (Optional[str]): The timestamp of the alert.
+        escalate (Callable[[], Awaitable[int]]): Creates or updates the IRIS alert, returning its ID.
+        session (AsyncSession): The database session.
+
+    Returns:
+        int: The ID of the IRIS alert.
+    """
+    key = tuple(str(part) for part in key)
+    # Occurrences of the same key are handled one at a time, so only the first one reaches IRIS
+    async with alert_coalescer.lock(key):
+        entry = alert_coalescer.active(key)
+        if entry is None:
+            # The escalation looks up the open IRIS alert by customer and rule and creates it or adds the asset to
+            # it, so escalations of the same rule on other assets wait for each other
+            async with alert_coalescer.escalation_lock(key[:3]):
+                iris_alert_id = await escalate()
+            alert_coalescer.start(key, iris_alert_id, alert.alert_id, seen_at)
+            return iris_alert_id
+
+        entry.add(alert.alert_id, seen_at)
+        logger.info(f"Folded alert {alert.alert_id} into IRIS alert {entry.iris_alert_id}, {entry.occurrences} occurrences so far")
+        es_client = await create_wazuh_indexer_client("Wazuh-Indexer")
+        await add_alert_to_document(es_client=es_client, alert=alert, soc_alert_id=entry.iris_alert_id, session=session)
+        return entry.iris_alert_id
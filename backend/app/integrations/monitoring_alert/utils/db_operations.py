@@ -1,29 +1,140 @@
+import os
+from datetime import datetime
+from datetime import timedelta
+from typing import List
+from typing import Optional
+
 from loguru import logger
+from sqlalchemy import and_
+from sqlalchemy import delete
+from sqlalchemy import or_
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from app.integrations.monitoring_alert.models.monitoring_alert import MonitoringAlerts
+from app.integrations.monitoring_alert.models.monitoring_alert import (
+    MonitoringAlertStatus,
+)
+
+# Number of alerts an analysis run claims at once
+MONITORING_ALERT_CLAIM_BATCH_SIZE = int(os.getenv("MONITORING_ALERT_CLAIM_BATCH_SIZE", 50))
+# Seconds after which a claimed alert that was not acknowledged can be claimed again, e.g. after a crash
+MONITORING_ALERT_CLAIM_TIMEOUT_SECONDS = int(os.getenv("MONITORING_ALERT_CLAIM_TIMEOUT_SECONDS", 600))
+# How often an alert is claimed before it is marked as failed and no longer analyzed
+MONITORING_ALERT_MAX_ATTEMPTS = int(os.getenv("MONITORING_ALERT_MAX_ATTEMPTS", 3))
 
 
-async def remove_alert_id(alert_id: str, session: AsyncSession) -> None:
+async def claim_alerts(
+    customer_code: str,
+    alert_source: str,
+    session: AsyncSession,
+    limit: int = MONITORING_ALERT_CLAIM_BATCH_SIZE,
+    after_id: Optional[int] = None,
+) -> List[MonitoringAlerts]:
     """
-    Remove the alert with the given alert_id from the database.
+    Claim a batch of alerts of the customer and source for analysis.
+
+    The rows are selected with `FOR UPDATE SKIP LOCKED`, so concurrent analysis runs claim different alerts
+    instead of waiting for each other. Pending alerts are claimed, as well as alerts whose claim expired.
 
     Args:
-        alert_id (str): The alert_id.
+        customer_code (str): The customer code.
+        alert_source (str): The alert source, e.g. WAZUH.
         session (AsyncSession): The database session.
-    """
-    logger.info(f"Removing alert with alert_id: {alert_id}")
+        limit (int): The maximum number of alerts to claim.
+        after_id (Optional[int]): Only claim alerts with a higher ID, to not claim an alert twice in one run.
 
-    alert = await session.execute(
-        select(MonitoringAlerts).where(MonitoringAlerts.alert_id == alert_id),
+    Returns:
+        List[MonitoringAlerts]: The claimed alerts, ordered by ID.
+    """
+    expired_before = datetime.utcnow() - timedelta(seconds=MONITORING_ALERT_CLAIM_TIMEOUT_SECONDS)
+    claimable = or_(
+        MonitoringAlerts.status == MonitoringAlertStatus.PENDING.value,
+        and_(MonitoringAlerts.status == MonitoringAlertStatus.CLAIMED.value, MonitoringAlerts.claimed_at < expired_before),
+    )
+    query = (
+        select(MonitoringAlerts)
+        .where(
+            MonitoringAlerts.customer_code == customer_code,
+            MonitoringAlerts.alert_source == alert_source,
+            claimable,
+        )
+        .order_by(MonitoringAlerts.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
     )
-    alert = alert.scalars().first()
+    if after_id is not None:
+        query = query.where(MonitoringAlerts.id > after_id)
+    alerts = (await session.execute(query)).scalars().all()
+
+    claimed = []
+    now = datetime.utcnow()
+    for alert in alerts:
+        if alert.attempts >= MONITORING_ALERT_MAX_ATTEMPTS:
+            logger.error(f"Alert with alert_id: {alert.alert_id} was claimed {alert.attempts} times without success, marking it failed")
+            alert.status = MonitoringAlertStatus.FAILED.value
+            continue
+        alert.status = MonitoringAlertStatus.CLAIMED.value
+        alert.claimed_at = now
+        alert.attempts += 1
+        claimed.append(alert)
+    await session.commit()
+    logger.info(f"Claimed {len(claimed)} {alert_source} alerts for customer {customer_code}")
+    return claimed
 
-    if not alert:
-        logger.error(f"Alert with alert_id: {alert_id} not found")
 
-    await session.delete(alert)
+async def ack_alerts(ids: List[int], session: AsyncSession) -> None:
+    """
+    Remove the analyzed alerts from the queue in one statement.
+
+    Args:
+        ids (List[int]): The IDs of the analyzed alerts.
+        session (AsyncSession): The database session.
+    """
+    if not ids:
+        return None
+    await session.execute(delete(MonitoringAlerts).where(MonitoringAlerts.id.in_(ids)))
     await session.commit()
-    logger.info(f"Alert with alert_id: {alert_id} removed")
+    logger.info(f"Removed {len(ids)} analyzed alerts")
     return None
+
+
+async def release_alerts(ids: List[int], session: AsyncSession) -> None:
+    """
+    Return claimed alerts that could not be analyzed to the queue, so a later run retries them.
+    Alerts that used up their attempts are marked as failed instead.
+
+    Args:
+        ids (List[int]): The IDs of the alerts that were not analyzed.
+        session (AsyncSession): The database session.
+    """
+    if not ids:
+        return None
+    await session.execute(
+        update(MonitoringAlerts)
+        .where(MonitoringAlerts.id.in_(ids), MonitoringAlerts.attempts >= MONITORING_ALERT_MAX_ATTEMPTS)
+        .values(status=MonitoringAlertStatus.FAILED.value),
+    )
+    await session.execute(
+        update(MonitoringAlerts)
+        .where(MonitoringAlerts.id.in_(ids), MonitoringAlerts.attempts < MONITORING_ALERT_MAX_ATTEMPTS)
+        .values(status=MonitoringAlertStatus.PENDING.value, claimed_at=None),
+    )
+    await session.commit()
+    logger.info(f"Released {len(ids)} alerts that were not analyzed")
+    return None
+
+
+async def settle_alerts(claimed_ids: List[int], processed_ids: List[int], session: AsyncSession) -> None:
+    """
+    Acknowledge the processed alerts of a claimed batch and release the rest.
+
+    Args:
+        claimed_ids (List[int]): The IDs of the claimed alerts.
+        processed_ids (List[int]): The IDs of the alerts that were analyzed.
+        session (AsyncSession): The database session.
+    """
+    processed = set(processed_ids)
+    await ack_alerts(processed_ids, session)
+    await release_alerts([alert_id for alert_id in claimed_ids if alert_id not in processed], session)
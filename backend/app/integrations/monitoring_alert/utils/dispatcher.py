@@ -0,0 +1,132 @@
+import asyncio
+import os
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from loguru import logger
+
+from app.integrations.monitoring_alert.services.office365_exchange import (
+    INDEXER_SOURCE_FIELDS as OFFICE365_EXCHANGE_SOURCE_FIELDS,
+)
+from app.integrations.monitoring_alert.services.office365_exchange import (
+    analyze_office365_exchange_online_alert,
+)
+from app.integrations.monitoring_alert.services.office365_threatintel import (
+    INDEXER_SOURCE_FIELDS as OFFICE365_THREAT_INTEL_SOURCE_FIELDS,
+)
+from app.integrations.monitoring_alert.services.office365_threatintel import (
+    analyze_office365_threatintel_alert,
+)
+from app.integrations.monitoring_alert.services.suricata import (
+    INDEXER_SOURCE_FIELDS as SURICATA_SOURCE_FIELDS,
+)
+from app.integrations.monitoring_alert.services.suricata import analyze_suricata_alert
+from app.integrations.monitoring_alert.services.wazuh import (
+    INDEXER_SOURCE_FIELDS as WAZUH_SOURCE_FIELDS,
+)
+from app.integrations.monitoring_alert.services.wazuh import analyze_wazuh_alert
+from app.integrations.monitoring_alert.utils.pipeline import AlertAnalyzer
+from app.integrations.monitoring_alert.utils.pipeline import run_analysis_pipeline
+
+# Whether alerts posted to the webhook are analyzed right away. The scheduled jobs still sweep the queue.
+MONITORING_ALERT_DISPATCH_ENABLED = os.getenv("MONITORING_ALERT_DISPATCH_ENABLED", "true").lower() == "true"
+# Seconds to wait after a wake-up, so alerts that arrive together are analyzed in one run
+MONITORING_ALERT_DISPATCH_BATCH_DELAY = float(os.getenv("MONITORING_ALERT_DISPATCH_BATCH_DELAY", 0.05))
+
+# The analyzer and indexer fields of the alert sources analyzed on arrival
+DISPATCHED_ALERT_SOURCES: Dict[str, Tuple[AlertAnalyzer, List[str]]] = {
+    "WAZUH": (analyze_wazuh_alert, WAZUH_SOURCE_FIELDS),
+    "SURICATA": (analyze_suricata_alert, SURICATA_SOURCE_FIELDS),
+    "OFFICE365_EXCHANGE_ONLINE": (analyze_office365_exchange_online_alert, OFFICE365_EXCHANGE_SOURCE_FIELDS),
+    "OFFICE365_THREAT_INTEL": (analyze_office365_threatintel_alert, OFFICE365_THREAT_INTEL_SOURCE_FIELDS),
+}
+
+
+class MonitoringAlertDispatcher:
+    """
+    Starts the analysis of queued monitoring alerts as soon as the webhook stores them, instead of waiting
+    for the next scheduled run.
+
+    The webhook wakes the dispatcher with the source and customer of the alert. After a short delay to collect
+    the alerts arriving together, the dispatcher runs the analysis pipeline for every woken source and customer.
+    Alerts arriving during a run wake it again once the run finished.
+    """
+
+    def __init__(self):
+        self.pending: Set[Tuple[str, str]] = set()
+        self.wakeup: Optional[asyncio.Event] = None
+        self.task: Optional[asyncio.Task] = None
+        # The analysis run in progress
+        self.current: Optional[asyncio.Future] = None
+        self.stats = {"wakeups": 0, "runs": 0, "analyzed": 0, "failed": 0}
+
+    def start(self) -> None:
+        if self.task is not None and not self.task.done():
+            return
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self.run())
+
+    def notify(self, alert_source: str, customer_code: str) -> bool:
+        """
+        Wakes the dispatcher for a newly queued alert.
+
+        Returns:
+            bool: False if the alert is left to the scheduled jobs.
+        """
+        if not MONITORING_ALERT_DISPATCH_ENABLED or alert_source not in DISPATCHED_ALERT_SOURCES:
+            return False
+        self.start()
+        self.pending.add((alert_source, customer_code))
+        self.stats["wakeups"] += 1
+        self.wakeup.set()
+        return True
+
+    async def run(self) -> None:
+        while True:
+            await self.wakeup.wait()
+            await asyncio.sleep(MONITORING_ALERT_DISPATCH_BATCH_DELAY)
+            self.wakeup.clear()
+            pending, self.pending = self.pending, set()
+            self.current = asyncio.ensure_future(self.dispatch_pending(pending))
+            await self.current
+            self.stats["runs"] += 1
+
+    async def dispatch_pending(self, pending: Set[Tuple[str, str]]) -> None:
+        customers_by_source: Dict[str, List[str]] = {}
+        for alert_source, customer_code in sorted(pending):
+            customers_by_source.setdefault(alert_source, []).append(customer_code)
+        results = await asyncio.gather(
+            *(self.dispatch(alert_source, customer_codes) for alert_source, customer_codes in customers_by_source.items()),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Monitoring alert dispatch failed, the scheduled job will pick the alerts up: {result}")
+
+    async def dispatch(self, alert_source: str, customer_codes: List[str]) -> None:
+        analyze_alert, source_fields = DISPATCHED_ALERT_SOURCES[alert_source]
+        result = await run_analysis_pipeline(alert_source, customer_codes, analyze_alert, source_fields)
+        self.stats["analyzed"] += result.analyzed
+        self.stats["failed"] += result.failed + result.missing
+
+    async def stop(self, timeout: float = 10) -> None:
+        """
+        Gives a running analysis up to `timeout` seconds to finish, then stops the dispatcher. Alerts that
+        were not analyzed stay queued for the scheduled jobs.
+        """
+        if self.task is None:
+            return
+        if self.current is not None and not self.current.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(self.current), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Stopping the monitoring alert dispatcher while an analysis is still running")
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        self.task = None
+
+
+monitoring_alert_dispatcher = MonitoringAlertDispatcher()
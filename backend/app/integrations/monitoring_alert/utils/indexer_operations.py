@@ -0,0 +1,42 @@
+import asyncio
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+from loguru import logger
+
+from app.connectors.wazuh_indexer.utils.universal import create_wazuh_indexer_client
+from app.integrations.monitoring_alert.models.monitoring_alert import MonitoringAlerts
+
+
+async def fetch_alert_documents(
+    alerts: List[MonitoringAlerts],
+    source_fields: List[str],
+) -> Tuple[Dict[int, dict], Dict[int, str]]:
+    """
+    Fetch the Wazuh-Indexer documents of the queued alerts in one `_mget` request.
+
+    Args:
+        alerts (List[MonitoringAlerts]): The queued alerts.
+        source_fields (List[str]): The `_source` fields to return, i.e. the ones the analysis uses.
+
+    Returns:
+        Tuple[Dict[int, dict], Dict[int, str]]: The documents found and the errors of the others,
+            both by the ID of the queued alert.
+    """
+    es_client = await create_wazuh_indexer_client("Wazuh-Indexer")
+    docs = [{"_index": alert.alert_index, "_id": alert.alert_id, "_source": source_fields} for alert in alerts]
+    response = await asyncio.to_thread(es_client.mget, body={"docs": docs})
+
+    documents = {}
+    errors = {}
+    # The documents are returned in the order they were requested
+    for alert, document in zip(alerts, response["docs"]):
+        if document.get("error"):
+            errors[alert.id] = f"Error fetching alert from wazuh-indexer: {document['error']}"
+        elif not document.get("found"):
+            errors[alert.id] = f"Alert not found in Wazuh-Indexer index: {alert.alert_index} with ID: {alert.alert_id}"
+        else:
+            documents[alert.id] = document
+    logger.info(f"Fetched {len(documents)} of {len(alerts)} alerts from wazuh-indexer")
+    return documents, errors
@@ -0,0 +1,188 @@
+import asyncio
+import os
+from collections import deque
+from typing import Awaitable
+from typing import Callable
+from typing import Deque
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from fastapi import HTTPException
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.db_session import get_db_session
+from app.integrations.monitoring_alert.models.monitoring_alert import MonitoringAlerts
+from app.integrations.monitoring_alert.schema.monitoring_alert import (
+    AlertPipelineResult,
+)
+from app.integrations.monitoring_alert.utils.coalescing import alert_coalescer
+from app.integrations.monitoring_alert.utils.db_operations import claim_alerts
+from app.integrations.monitoring_alert.utils.db_operations import settle_alerts
+from app.integrations.monitoring_alert.utils.indexer_operations import (
+    fetch_alert_documents,
+)
+
+# Number of alerts of each source analyzed at the same time
+MONITORING_ALERT_ANALYSIS_WORKERS = {
+    "WAZUH": int(os.getenv("MONITORING_ALERT_WAZUH_WORKERS", 4)),
+    "SURICATA": int(os.getenv("MONITORING_ALERT_SURICATA_WORKERS", 4)),
+    "OFFICE365_EXCHANGE_ONLINE": int(os.getenv("MONITORING_ALERT_OFFICE365_EXCHANGE_ONLINE_WORKERS", 2)),
+    "OFFICE365_THREAT_INTEL": int(os.getenv("MONITORING_ALERT_OFFICE365_THREAT_INTEL_WORKERS", 2)),
+}
+
+
+class AlertExcluded(HTTPException):
+    """
+    The alert matches an exclusion and is not escalated. The invoke routes answer it with a 400, the pipeline
+    acknowledges the alert as processed.
+    """
+
+    def __init__(self, detail: str):
+        super().__init__(status_code=400, detail=detail)
+
+
+AlertAnalyzer = Callable[[MonitoringAlerts, AsyncSession, Optional[dict]], Awaitable[None]]
+
+
+class ClaimedBatch:
+    """
+    A batch of alerts claimed together, with their Wazuh-Indexer documents once fetched. It is settled
+    once all of its alerts were analyzed or failed.
+    """
+
+    def __init__(self, alerts: List[MonitoringAlerts]):
+        self.ids = [alert.id for alert in alerts]
+        self.remaining: Set[int] = set(self.ids)
+        self.processed: List[int] = []
+        self.documents: Dict[int, dict] = {}
+        self.errors: Dict[int, str] = {}
+
+    async def fetch_documents(self, alerts: List[MonitoringAlerts], source_fields: List[str]) -> None:
+        """
+        Fetch the documents of the batch in one request. If that fails, each alert fetches its own document.
+        """
+        try:
+            self.documents, self.errors = await fetch_alert_documents(alerts, source_fields)
+        except Exception as e:
+            logger.error(f"Failed to fetch {len(alerts)} alerts from wazuh-indexer at once, fetching them one by one: {e}")
+
+
+class CustomerAlertFeed:
+    """
+    Hands out the queued alerts of one customer and source, claiming them batch by batch.
+    """
+
+    def __init__(self, customer_code: str, alert_source: str, source_fields: Optional[List[str]] = None):
+        self.customer_code = customer_code
+        self.alert_source = alert_source
+        self.source_fields = source_fields
+        self.queued: Deque[Tuple[MonitoringAlerts, ClaimedBatch]] = deque()
+        self.after_id: Optional[int] = None
+        self.claimed = 0
+
+    async def next_alert(self) -> Optional[Tuple[MonitoringAlerts, ClaimedBatch]]:
+        if not self.queued:
+            async with get_db_session() as session:
+                alerts = await claim_alerts(self.customer_code, self.alert_source, session, after_id=self.after_id)
+            if not alerts:
+                return None
+            self.after_id = alerts[-1].id
+            self.claimed += len(alerts)
+            batch = ClaimedBatch(alerts)
+            if self.source_fields:
+                await batch.fetch_documents(alerts, self.source_fields)
+            self.queued.extend((alert, batch) for alert in alerts)
+        return self.queued.popleft()
+
+    async def done(self, alert: MonitoringAlerts, batch: ClaimedBatch, success: bool) -> None:
+        batch.remaining.discard(alert.id)
+        if success:
+            batch.processed.append(alert.id)
+        if not batch.remaining:
+            async with get_db_session() as session:
+                await settle_alerts(batch.ids, batch.processed, session)
+
+
+async def run_analysis_pipeline(
+    alert_source: str,
+    customer_codes: List[str],
+    analyze_alert: AlertAnalyzer,
+    source_fields: Optional[List[str]] = None,
+    workers: Optional[int] = None,
+) -> AlertPipelineResult:
+    """
+    Analyze the queued alerts of the customers with a pool of workers.
+
+    The workers take alerts from the customers in turn, so a burst of alerts for one customer does not delay
+    the alerts of the others. Each worker analyzes one alert at a time over its own database session. An alert
+    that fails is released back to the queue without stopping the other alerts, an alert that matches an exclusion
+    is acknowledged. If `source_fields` is given, the Wazuh-Indexer documents of each claimed batch are fetched in
+    one request and passed to `analyze_alert`.
+
+    Args:
+        alert_source (str): The alert source, e.g. WAZUH.
+        customer_codes (List[str]): The customers whose alerts to analyze.
+        analyze_alert (AlertAnalyzer): Analyzes a single alert, raising if it could not be analyzed.
+        source_fields (Optional[List[str]]): The `_source` fields of the documents the analysis uses.
+        workers (Optional[int]): The number of workers. Defaults to the configured number for the source.
+
+    Returns:
+        AlertPipelineResult: The number of alerts claimed, analyzed, excluded, failed and missing from the indexer.
+    """
+    workers = workers or MONITORING_ALERT_ANALYSIS_WORKERS.get(alert_source, 1)
+    all_feeds = [CustomerAlertFeed(customer_code, alert_source, source_fields) for customer_code in customer_codes]
+    feeds: Deque[CustomerAlertFeed] = deque(all_feeds)
+    dispatch_lock = asyncio.Lock()
+    result = AlertPipelineResult(alert_source=alert_source)
+
+    async def next_item() -> Optional[Tuple[CustomerAlertFeed, MonitoringAlerts, ClaimedBatch]]:
+        async with dispatch_lock:
+            while feeds:
+                feed = feeds.popleft()
+                item = await feed.next_alert()
+                if item is None:
+                    continue
+                feeds.append(feed)
+                return (feed, *item)
+            return None
+
+    async def work() -> None:
+        async with get_db_session() as session:
+            while (item := await next_item()) is not None:
+                feed, alert, batch = item
+                if alert.id in batch.errors:
+                    logger.error(
+                        f"Skipping {alert_source} alert {alert.alert_id} of customer {feed.customer_code}: {batch.errors[alert.id]}",
+                    )
+                    result.missing += 1
+                    await feed.done(alert, batch, False)
+                    continue
+                try:
+                    await analyze_alert(alert, session, batch.documents.get(alert.id))
+                    result.analyzed += 1
+                    success = True
+                except AlertExcluded as e:
+                    logger.info(f"Not escalating {alert_source} alert {alert.alert_id} of customer {feed.customer_code}: {e.detail}")
+                    result.excluded += 1
+                    success = True
+                except Exception as e:
+                    await session.rollback()
+                    logger.error(f"Failed to analyze {alert_source} alert {alert.alert_id} of customer {feed.customer_code}: {e}")
+                    result.failed += 1
+                    success = False
+                await feed.done(alert, batch, success)
+
+    logger.info(f"Analyzing {alert_source} alerts of {len(customer_codes)} customers with {workers} workers")
+    await asyncio.gather(*(work() for _ in range(workers)))
+    # Record the occurrences folded into existing IRIS alerts during the run
+    await alert_coalescer.flush()
+    result.claimed = sum(feed.claimed for feed in all_feeds)
+    logger.info(
+        f"Analyzed {result.analyzed} of {result.claimed} {alert_source} alerts, {result.excluded} excluded, {result.failed} failed, "
+        f"{result.missing} missing",
+    )
+    return result
@@ -44,6 +44,7 @@ from app.integrations.schema import CustomerIntegrationsResponse
 from app.integrations.schema import DeleteCustomerIntegration
 from app.integrations.schema import IntegrationWithAuthKeys
 from app.integrations.schema import UpdateCustomerIntegration
+from app.utils import invalidate_customer_alert_settings
 
 integration_settings_router = APIRouter()
 
@@ -437,6 +438,8 @@ async def update_office365_organization_id(
     )
     await session.execute(stmt)
     await session.commit()
+    invalidate_customer_alert_settings(customer_code)
+    invalidate_customer_alert_settings(tenant_id)
 
 
 async def get_integration_service_id(
@@ -1,6 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
+from sqlalchemy import UniqueConstraint
 from sqlmodel import Field
 from sqlmodel import SQLModel
 
@@ -21,3 +22,37 @@ class SapSiemMultipleLogins(SQLModel, table=True):
     associated_loginIDs: str = Field(
         description="Comma-separated loginIDs associated with this IP.",
     )
+
+
+class SapSiemCheckpoint(SQLModel, table=True):
+    """
+    Represents the SAP SIEM checkpoints table.
+    Table is used to store the high-water mark of the last event collected or analyzed per customer,
+    so each run of the SAP SIEM integration only processes the events that came in since the previous run.
+    """
+
+    __tablename__ = "sap_siem_checkpoints"
+    __table_args__ = (UniqueConstraint("customer_code", "checkpoint_name", "scope", name="uq_sap_siem_checkpoint"),)
+    id: Optional[int] = Field(primary_key=True)
+    customer_code: str = Field(max_length=50, index=True, description="The customer code.")
+    checkpoint_name: str = Field(max_length=255, description="What the checkpoint tracks, e.g. collection or a detector name.")
+    scope: str = Field(default="", max_length=255, description="Narrows the checkpoint down, e.g. to the API key collected from.")
+    last_event_timestamp: str = Field(max_length=64, description="The timestamp of the last event processed.")
+    last_event_id: str = Field(max_length=255, description="The ID of the last event processed, used as a tie-breaker.")
+    updated_at: datetime = Field(default_factory=datetime.utcnow, description="When the checkpoint was last moved.")
+
+
+class SapSiemDedupEntry(SQLModel, table=True):
+    """
+    Represents the SAP SIEM dedup table.
+    Table is used to remember which IPs or users a detector already opened a case for, per customer,
+    so the same finding does not open a new case on every run until the entry expires.
+    """
+
+    __tablename__ = "sap_siem_dedup"
+    __table_args__ = (UniqueConstraint("customer_code", "detector", "dedup_key", name="uq_sap_siem_dedup_entry"),)
+    id: Optional[int] = Field(primary_key=True)
+    customer_code: str = Field(max_length=50, description="The customer code.")
+    detector: str = Field(max_length=255, description="The name of the detector that opened the case.")
+    dedup_key: str = Field(max_length=255, description="The IP or user the case was opened for.")
+    expires_at: datetime = Field(index=True, description="When the entry expires and a new case may be opened.")
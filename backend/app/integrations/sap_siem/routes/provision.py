@@ -8,6 +8,7 @@ from app.integrations.sap_siem.schema.provision import ProvisionSapSiemResponse
 from app.integrations.sap_siem.services.provision import provision_sap_siem
 from app.integrations.utils.utils import get_customer_integration_response
 from app.schedulers.models.scheduler import CreateSchedulerRequest
+from app.schedulers.scheduler import SAP_SIEM_SHARED_ANALYSIS_JOB_ID
 from app.schedulers.scheduler import add_scheduler_jobs
 
 integration_sap_siem_provision_scheduler_router = APIRouter()
@@ -45,18 +46,12 @@ async def provision_sap_siem_route(
             job_id="invoke_sap_siem_integration_collection",
         ),
     )
+    # One job runs every detector over a single scan of the new events
     await add_scheduler_jobs(
         CreateSchedulerRequest(
-            function_name="invoke_sap_siem_integration_suspicious_logins_analysis",
+            function_name=SAP_SIEM_SHARED_ANALYSIS_JOB_ID,
             time_interval=provision_sap_siem_request.time_interval,
-            job_id="invoke_sap_siem_integration_suspicious_logins_analysis",
-        ),
-    )
-    await add_scheduler_jobs(
-        CreateSchedulerRequest(
-            function_name="invoke_sap_siem_integration_multiple_logins_same_ip_analysis",
-            time_interval=provision_sap_siem_request.time_interval,
-            job_id="invoke_sap_siem_integration_multiple_logins_same_ip_analysis",
+            job_id=SAP_SIEM_SHARED_ANALYSIS_JOB_ID,
         ),
     )
     return ProvisionSapSiemResponse(
@@ -11,27 +11,14 @@ from app.integrations.sap_siem.schema.sap_siem import CollectSapSiemRequest
 from app.integrations.sap_siem.schema.sap_siem import InvokeSapSiemRequest
 from app.integrations.sap_siem.schema.sap_siem import InvokeSAPSiemResponse
 from app.integrations.sap_siem.schema.sap_siem import SapSiemAuthKeys
+from app.integrations.sap_siem.schema.sap_siem import SapSiemSharedAnalysisRequest
+from app.integrations.sap_siem.schema.sap_siem import SapSiemSharedAnalysisResponse
 from app.integrations.sap_siem.services.collect import collect_sap_siem
-from app.integrations.sap_siem.services.sap_siem_brute_force_same_ip import (
-    sap_siem_brute_force_failed_same_ip,
+from app.integrations.sap_siem.services.sap_siem_shared_scan import (
+    sap_siem_run_detector,
 )
-from app.integrations.sap_siem.services.sap_siem_brute_forced_failed_logins import (
-    sap_siem_brute_force_failed_multiple_ips,
-)
-from app.integrations.sap_siem.services.sap_siem_failed_same_user_different_geo_location import (
-    sap_siem_failed_same_user_diff_geo,
-)
-from app.integrations.sap_siem.services.sap_siem_failed_same_user_from_different_ip import (
-    sap_siem_failed_same_user_diff_ip,
-)
-from app.integrations.sap_siem.services.sap_siem_successful_login_same_ip_after_multiple_failures import (
-    sap_siem_successful_login_after_failures,
-)
-from app.integrations.sap_siem.services.sap_siem_successful_same_user_different_geo_location import (
-    sap_siem_successful_same_user_diff_geo,
-)
-from app.integrations.sap_siem.services.sap_siem_successful_user_login_after_using_different_ip import (
-    sap_siem_successful_user_login_with_different_ip,
+from app.integrations.sap_siem.services.sap_siem_shared_scan import (
+    sap_siem_shared_analysis,
 )
 from app.integrations.utils.utils import extract_auth_keys
 from app.integrations.utils.utils import get_customer_integration_response
@@ -76,8 +63,9 @@ async def collect_sap_siem_route(sap_siem_request: InvokeSapSiemRequest, session
                 lower_bound=sap_siem_request.lower_bound,
                 upper_bound=sap_siem_request.upper_bound,
                 customer_code=sap_siem_request.customer_code,
+                event_shipper_settings=auth_keys.event_shipper_settings(),
             )
-            await collect_sap_siem(sap_siem_request=collect_sap_siem_request)
+            await collect_sap_siem(sap_siem_request=collect_sap_siem_request, session=session)
     else:
         collect_sap_siem_request = CollectSapSiemRequest(
             apiKey=auth_keys.API_KEY,
@@ -88,8 +76,9 @@ async def collect_sap_siem_route(sap_siem_request: InvokeSapSiemRequest, session
             lower_bound=sap_siem_request.lower_bound,
             upper_bound=sap_siem_request.upper_bound,
             customer_code=sap_siem_request.customer_code,
+            event_shipper_settings=auth_keys.event_shipper_settings(),
         )
-        await collect_sap_siem(sap_siem_request=collect_sap_siem_request)
+        await collect_sap_siem(sap_siem_request=collect_sap_siem_request, session=session)
 
     return InvokeSAPSiemResponse(success=True, message="SAP SIEM Events collected successfully.")
 
@@ -110,7 +99,7 @@ async def invoke_sap_siem_successful_user_login_with_different_ip_route(
     session: AsyncSession = Depends(get_db),
 ):
     logger.info("Invoking SAP SIEM integration for successful user login with different IP.")
-    await sap_siem_successful_user_login_with_different_ip(threshold=threshold, time_range=time_range, session=session)
+    await sap_siem_run_detector("successful_user_login_with_different_ip", threshold=threshold, time_range=time_range, session=session)
 
     return InvokeSAPSiemResponse(success=True, message="SAP SIEM Events collected successfully.")
 
@@ -130,7 +119,7 @@ async def invoke_sap_siem_same_user_failed_login_from_different_ip_route(
     session: AsyncSession = Depends(get_db),
 ):
     logger.info("Invoking SAP SIEM integration for same user failed login from different IP.")
-    await sap_siem_failed_same_user_diff_ip(threshold=threshold, time_range=time_range, session=session)
+    await sap_siem_run_detector("same_user_failed_login_from_different_ip", threshold=threshold, time_range=time_range, session=session)
 
     return InvokeSAPSiemResponse(success=True, message="SAP SIEM Events collected successfully.")
 
@@ -150,7 +139,12 @@ async def invoke_sap_siem_same_user_failed_login_from_different_geo_location_rou
     session: AsyncSession = Depends(get_db),
 ):
     logger.info("Invoking SAP SIEM integration for same user failed login from different geo location.")
-    await sap_siem_failed_same_user_diff_geo(threshold=threshold, time_range=time_range, session=session)
+    await sap_siem_run_detector(
+        "same_user_failed_login_from_different_geo_location",
+        threshold=threshold,
+        time_range=time_range,
+        session=session,
+    )
 
     return InvokeSAPSiemResponse(success=True, message="SAP SIEM Events collected successfully.")
 
@@ -186,7 +180,12 @@ async def invoke_sap_siem_same_user_successful_login_from_different_geo_location
     session: AsyncSession = Depends(get_db),
 ):
     logger.info("Invoking SAP SIEM integration for same user successful login from different geo location.")
-    await sap_siem_successful_same_user_diff_geo(threshold=threshold, time_range=time_range, session=session)
+    await sap_siem_run_detector(
+        "same_user_successful_login_from_different_geo_location",
+        threshold=threshold,
+        time_range=time_range,
+        session=session,
+    )
 
     return InvokeSAPSiemResponse(success=True, message="SAP SIEM Events collected successfully.")
 
@@ -206,7 +205,7 @@ async def invoke_sap_siem_brute_force_failed_logins_route(
     session: AsyncSession = Depends(get_db),
 ):
     logger.info("Invoking SAP SIEM integration for brute force failed logins.")
-    await sap_siem_brute_force_failed_multiple_ips(threshold=threshold, time_range=time_range, session=session)
+    await sap_siem_run_detector("brute_force_failed_logins_multiple_ips", threshold=threshold, time_range=time_range, session=session)
 
     return InvokeSAPSiemResponse(success=True, message="SAP SIEM Events collected successfully.")
 
@@ -226,7 +225,7 @@ async def invoke_sap_siem_brute_force_failed_logins_same_ip_route(
     session: AsyncSession = Depends(get_db),
 ):
     logger.info("Invoking SAP SIEM integration for brute force failed logins from the same IP.")
-    await sap_siem_brute_force_failed_same_ip(threshold=threshold, time_range=time_range, session=session)
+    await sap_siem_run_detector("brute_force_failed_logins_same_ip", threshold=threshold, time_range=time_range, session=session)
 
     return InvokeSAPSiemResponse(success=True, message="SAP SIEM Events collected successfully.")
 
@@ -247,6 +246,26 @@ async def invoke_sap_siem_successful_login_after_multiple_failed_logins_route(
     session: AsyncSession = Depends(get_db),
 ):
     logger.info("Invoking SAP SIEM integration for successful login after multiple failed logins.")
-    await sap_siem_successful_login_after_failures(threshold=threshold, time_range=time_range, session=session)
+    await sap_siem_run_detector(
+        "successful_login_after_multiple_failed_logins",
+        threshold=threshold,
+        time_range=time_range,
+        session=session,
+    )
 
     return InvokeSAPSiemResponse(success=True, message="SAP SIEM Events collected successfully.")
+
+
+@integration_sap_siem_router.post(
+    "/shared_analysis",
+    response_model=SapSiemSharedAnalysisResponse,
+    description="Run the SAP SIEM detectors over a single scan of the events since their last checkpoints.\n\n"
+    "Every detector keeps its own state and creates its own cases. "
+    "The response reports the number of events and the processing and case handling time per detector.",
+)
+async def invoke_sap_siem_shared_analysis_route(
+    request: Optional[SapSiemSharedAnalysisRequest] = None,
+    session: AsyncSession = Depends(get_db),
+):
+    logger.info("Invoking SAP SIEM shared analysis.")
+    return await sap_siem_shared_analysis(session=session, settings=request.detectors if request else None)
@@ -9,6 +9,10 @@ from pydantic import BaseModel
 from pydantic import Field
 from pydantic import root_validator
 
+from app.integrations.utils.schema import EventShipperSettings
+from app.integrations.utils.schema import GelfCompression
+from app.integrations.utils.schema import GelfTransport
+
 
 class InvokeSapSiemRequest(BaseModel):
     customer_code: str = Field(
@@ -62,6 +66,42 @@ class InvokeSAPSiemResponse(BaseModel):
     message: str
 
 
+class SapSiemDetectorSettings(BaseModel):
+    threshold: Optional[int] = Field(
+        0,
+        description="The threshold of the detector.",
+    )
+    time_range: Optional[int] = Field(
+        None,
+        description="The time window of the detector in minutes. Defaults to the time range of the detector's own route.",
+    )
+
+
+class SapSiemSharedAnalysisRequest(BaseModel):
+    detectors: Optional[Dict[str, SapSiemDetectorSettings]] = Field(
+        None,
+        description="Threshold and time range per detector name. Defaults to running every detector with its default settings.",
+        examples=[{"brute_force_failed_logins_same_ip": {"threshold": 0, "time_range": 5}, "suspicious_logins": {"threshold": 3}}],
+    )
+
+
+class SapSiemDetectorResult(BaseModel):
+    detector: str = Field(..., description="The name of the detector.")
+    customer_code: str = Field(..., description="The customer whose events were analyzed.")
+    events_processed: int = Field(..., description="The number of events fed to the detector.")
+    suspicious_logins: int = Field(..., description="The number of suspicious logins found by the detector.")
+    processing_seconds: float = Field(..., description="Time spent analyzing the events.")
+    handling_seconds: float = Field(..., description="Time spent creating cases for the suspicious logins.")
+
+
+class SapSiemSharedAnalysisResponse(BaseModel):
+    success: bool
+    message: str
+    events_scanned: int = Field(..., description="The number of events read from the indexer.")
+    scroll_seconds: float = Field(..., description="Time spent reading the events from the indexer.")
+    detectors: List[SapSiemDetectorResult] = Field(..., description="The results and timings per detector and customer.")
+
+
 class SapSiemAuthKeys(BaseModel):
     API_KEY: str = Field(
         ...,
@@ -83,6 +123,19 @@ class SapSiemAuthKeys(BaseModel):
         description="YOUR API DOMAIN",
         examples=["audit.eu1.gigya.com"],
     )
+    GELF_TRANSPORT: Optional[GelfTransport] = Field(
+        GelfTransport.TCP,
+        description="GELF TRANSPORT USED TO SHIP EVENTS TO GRAYLOG (tcp OR udp)",
+        examples=["udp"],
+    )
+    GELF_COMPRESSION: Optional[GelfCompression] = Field(
+        None,
+        description="COMPRESSION FOR GELF UDP MESSAGES (zlib OR gzip)",
+        examples=["zlib"],
+    )
+
+    def event_shipper_settings(self) -> EventShipperSettings:
+        return EventShipperSettings(transport=self.GELF_TRANSPORT or GelfTransport.TCP, compression=self.GELF_COMPRESSION)
 
 
 class CollectSapSiemRequest(BaseModel):
@@ -101,6 +154,20 @@ class CollectSapSiemRequest(BaseModel):
     )
     lower_bound: str = None
     upper_bound: str = None
+    event_shipper_settings: Optional[EventShipperSettings] = Field(
+        None,
+        description="The GELF transport and compression used to ship the events.",
+    )
+    page_size: int = Field(
+        1000,
+        gt=0,
+        description="Number of audit records SAP returns per cursor page.",
+    )
+    max_pages_in_flight: int = Field(
+        2,
+        gt=0,
+        description="Number of pages fetched ahead of the event shipper. Bounds the memory used by a collection.",
+    )
 
 
 ######### ! SAP API RESPONSE ! #########
@@ -196,42 +263,6 @@ class Result(BaseModel):
         "False",
         description="Whether a case has been created for the event",
     )
-    event_analyzed: Optional[str] = Field(
-        "False",
-        description="Whether the event has been analyzed",
-    )
-    event_analyzed_multiple_logins: Optional[str] = Field(
-        "False",
-        description="Whether the event has been analyzed for multiple logins",
-    )
-    event_analyzed_success_login_diff_ip: Optional[str] = Field(
-        "False",
-        description="Whether the event has been analyzed for successful login from different IP",
-    )
-    event_analyzed_same_user_failed_diff_ip: Optional[str] = Field(
-        "False",
-        description="Whether the event has been analyzed for same user failed login from different IP",
-    )
-    event_analyzed_same_user_failed_diff_geo: Optional[str] = Field(
-        "False",
-        description="Whether the event has been analyzed for same user failed login from different geo",
-    )
-    event_analyzed_same_user_successful_diff_geo: Optional[str] = Field(
-        "False",
-        description="Whether the event has been analyzed for same user successful login from different geo",
-    )
-    event_analyzed_brute_force_ip: Optional[str] = Field(
-        "False",
-        description="Whether the event has been analyzed for brute force IP",
-    )
-    event_analyzed_brute_force_same_ip: Optional[str] = Field(
-        "False",
-        description="Whether the event has been analyzed for brute force same IP",
-    )
-    event_analyzed_successful_login_after_failures_diff_loginID: Optional[str] = Field(
-        "False",
-        description="Whether the event has been analyzed for successful login after failures",
-    )
 
 
 class SapSiemResponseBody(BaseModel):
@@ -243,6 +274,7 @@ class SapSiemResponseBody(BaseModel):
     callId: str = Field(..., description="Unique identifier for the overall call")
     time: str = Field(..., description="Time of the response")
     objectsCount: int = Field(..., description="Count of objects in results")
+    nextCursorId: Optional[str] = Field(None, description="Cursor of the next page, absent on the last page")
 
 
 #### ! WAZUH INDEXER RESULTS ! ####
@@ -0,0 +1,107 @@
+from datetime import datetime
+from typing import Optional
+from typing import Tuple
+
+from loguru import logger
+from sqlalchemy import and_
+from sqlalchemy import or_
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.integrations.sap_siem.models.sap_siem import SapSiemCheckpoint
+
+# A position in the event stream: (event timestamp, event ID). Timestamps are fixed width ISO 8601
+# strings, so comparing the tuples orders events by time and then by ID.
+EventPosition = Tuple[str, str]
+
+
+async def get_checkpoint(
+    session: AsyncSession,
+    customer_code: str,
+    checkpoint_name: str,
+    scope: str = "",
+) -> Optional[SapSiemCheckpoint]:
+    """
+    Retrieves the checkpoint for the customer.
+
+    Args:
+        session (AsyncSession): The database session.
+        customer_code (str): The customer code.
+        checkpoint_name (str): What the checkpoint tracks, e.g. collection or a detector name.
+        scope (str): Narrows the checkpoint down, e.g. to the API key collected from.
+
+    Returns:
+        Optional[SapSiemCheckpoint]: The checkpoint, or None if nothing was processed yet.
+    """
+    result = await session.execute(
+        select(SapSiemCheckpoint).where(
+            SapSiemCheckpoint.customer_code == customer_code,
+            SapSiemCheckpoint.checkpoint_name == checkpoint_name,
+            SapSiemCheckpoint.scope == scope,
+        ),
+    )
+    return result.scalars().first()
+
+
+def get_checkpoint_position(checkpoint: Optional[SapSiemCheckpoint]) -> Optional[EventPosition]:
+    if checkpoint is None:
+        return None
+    return checkpoint.last_event_timestamp, checkpoint.last_event_id
+
+
+async def save_checkpoint(
+    session: AsyncSession,
+    customer_code: str,
+    checkpoint_name: str,
+    position: EventPosition,
+    scope: str = "",
+) -> None:
+    """
+    Moves the checkpoint forward to `position`, creating it on the first run. The checkpoint never moves
+    backwards, also when two runs save it at the same time.
+
+    Args:
+        session (AsyncSession): The database session.
+        customer_code (str): The customer code.
+        checkpoint_name (str): What the checkpoint tracks, e.g. collection or a detector name.
+        position (EventPosition): The timestamp and ID of the last event processed.
+        scope (str): Narrows the checkpoint down, e.g. to the API key collected from.
+    """
+    checkpoint = await get_checkpoint(session, customer_code, checkpoint_name, scope)
+    if checkpoint is None:
+        session.add(
+            SapSiemCheckpoint(
+                customer_code=customer_code,
+                checkpoint_name=checkpoint_name,
+                scope=scope,
+                last_event_timestamp=position[0],
+                last_event_id=position[1],
+            ),
+        )
+        try:
+            await session.commit()
+            logger.info(f"Moved SAP SIEM {checkpoint_name} checkpoint for customer {customer_code} to {position}")
+            return
+        except IntegrityError:
+            # Another run created the checkpoint first, move that one forward instead
+            await session.rollback()
+            checkpoint = await get_checkpoint(session, customer_code, checkpoint_name, scope)
+
+    # Only moves the checkpoint if it is still behind `position`, even if another run moved it meanwhile
+    result = await session.execute(
+        update(SapSiemCheckpoint)
+        .where(
+            SapSiemCheckpoint.id == checkpoint.id,
+            or_(
+                SapSiemCheckpoint.last_event_timestamp < position[0],
+                and_(SapSiemCheckpoint.last_event_timestamp == position[0], SapSiemCheckpoint.last_event_id < position[1]),
+            ),
+        )
+        .values(last_event_timestamp=position[0], last_event_id=position[1], updated_at=datetime.utcnow())
+        .execution_options(synchronize_session="fetch"),
+    )
+    await session.commit()
+    if result.rowcount:
+        logger.info(f"Moved SAP SIEM {checkpoint_name} checkpoint for customer {customer_code} to {position}")
@@ -1,61 +1,123 @@
-import requests
+import asyncio
+from typing import Optional
+
+import httpx
 from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.integrations.sap_siem.schema.sap_siem import CollectSapSiemRequest
 from app.integrations.sap_siem.schema.sap_siem import InvokeSAPSiemResponse
 from app.integrations.sap_siem.schema.sap_siem import SapSiemResponseBody
+from app.integrations.sap_siem.services.checkpoint import get_checkpoint
+from app.integrations.sap_siem.services.checkpoint import get_checkpoint_position
+from app.integrations.sap_siem.services.checkpoint import save_checkpoint
 from app.integrations.utils.event_shipper import event_shipper
 from app.integrations.utils.schema import EventShipperPayload
+from app.integrations.utils.schema import EventShipperSettings
+
+SAP_SIEM_REQUEST_TIMEOUT = 120
 
 
-def build_request_payload(sap_siem_request: CollectSapSiemRequest) -> dict:
-    return {
+def build_request_payload(sap_siem_request: CollectSapSiemRequest, cursor_id: Optional[str] = None) -> dict:
+    """
+    Builds the form data of an audit.search call. The first call opens a cursor, the following calls
+    only pass the cursor of the next page.
+    """
+    payload = {
         "apiKey": sap_siem_request.apiKey,
         "secret": sap_siem_request.secretKey,
         "userKey": sap_siem_request.userKey,
-        "query": f"SELECT * FROM auditLog WHERE endpoint = 'accounts.login' and @timestamp >= '{sap_siem_request.lower_bound}' "
-        f"and @timestamp < '{sap_siem_request.upper_bound}'",
     }
+    if cursor_id is not None:
+        payload["cursorId"] = cursor_id
+        return payload
+    payload["openCursor"] = "true"
+    # With an open cursor the LIMIT sets the page size
+    payload["query"] = (
+        f"SELECT * FROM auditLog WHERE endpoint = 'accounts.login' and @timestamp >= '{sap_siem_request.lower_bound}' "
+        f"and @timestamp < '{sap_siem_request.upper_bound}' LIMIT {sap_siem_request.page_size}"
+    )
+    return payload
 
 
-async def make_request(sap_siem_request: CollectSapSiemRequest) -> SapSiemResponseBody:
+async def make_request(
+    sap_siem_request: CollectSapSiemRequest,
+    client: httpx.AsyncClient,
+    cursor_id: Optional[str] = None,
+) -> SapSiemResponseBody:
     """
     Makes a request to the SAP SIEM integration.
 
     Args:
         sap_siem_request (CollectSapSiemRequest): The request payload containing the necessary information for the SAP SIEM integration.
+        client (httpx.AsyncClient): The HTTP client shared by the pages of a collection.
+        cursor_id (Optional[str]): The cursor of the page to fetch. Opens a new cursor if None.
 
     Returns:
-        SapSiemResponseBody: The response model containing the result of the SAP SIEM integration invocation.
+        SapSiemResponseBody: The response model containing one page of the SAP SIEM audit log.
 
     Raises:
-        HTTPException: If the SAP SIEM integration fails.
+        httpx.HTTPStatusError: If the SAP SIEM integration fails.
     """
-    logger.info("Making request to SAP SIEM")
-    form_data = build_request_payload(sap_siem_request)
-    response = requests.post(
+    logger.info(f"Making request to SAP SIEM{f' for cursor {cursor_id}' if cursor_id else ''}")
+    form_data = build_request_payload(sap_siem_request, cursor_id)
+    response = await client.post(
         f"https://{sap_siem_request.apiDomain}/audit.search",
         data=form_data,
     )
+    response.raise_for_status()
     return SapSiemResponseBody(**response.json())
 
 
-async def send_to_event_shipper(message: EventShipperPayload) -> None:
+async def fetch_pages(sap_siem_request: CollectSapSiemRequest, pages: asyncio.Queue) -> None:
+    """
+    Follows the SAP cursor and puts every page of results on the queue. The queue is bounded, so fetching
+    waits for the event shipper once `max_pages_in_flight` pages are waiting. A None marks the end of the pages.
+
+    Args:
+        sap_siem_request (CollectSapSiemRequest): The request payload containing the necessary information for the SAP SIEM integration.
+        pages (asyncio.Queue): The queue the pages are put on.
+    """
+    try:
+        async with httpx.AsyncClient(timeout=SAP_SIEM_REQUEST_TIMEOUT) as client:
+            cursor_id = None
+            while True:
+                response = await make_request(sap_siem_request, client, cursor_id)
+                if response.results:
+                    await pages.put(response.results)
+                cursor_id = response.nextCursorId
+                if not cursor_id or not response.results:
+                    break
+    except Exception:
+        await pages.put(None)
+        raise
+    await pages.put(None)
+
+
+async def send_to_event_shipper(message: EventShipperPayload, settings: Optional[EventShipperSettings] = None) -> None:
     """
     Sends the message to the event shipper.
 
     Args:
         message (EventShipperPayload): The message to send to the event shipper.
+        settings (Optional[EventShipperSettings]): The GELF transport and compression to use.
     """
-    await event_shipper(message)
+    await event_shipper(message, settings=settings)
 
 
-async def collect_sap_siem(sap_siem_request: CollectSapSiemRequest) -> InvokeSAPSiemResponse:
+async def collect_sap_siem(sap_siem_request: CollectSapSiemRequest, session: AsyncSession) -> InvokeSAPSiemResponse:
     """
     Collects SAP SIEM events.
 
+    Pages through the audit log with a SAP cursor and ships every page as it arrives, while the next pages
+    are fetched in the background. At most `max_pages_in_flight` pages are held in memory.
+
+    Collection resumes from the checkpoint of the last event shipped for the customer and API key, so
+    overlapping lookback windows are not shipped twice. Without a checkpoint the request's lower bound is used.
+
     Args:
         sap_siem_request (CollectSapSiemRequest): The request payload containing the necessary information for the SAP SIEM integration.
+        session (AsyncSession): The database session.
 
     Returns:
         InvokeSAPSiemResponse: The response model containing the result of the SAP SIEM integration invocation.
@@ -65,19 +127,47 @@ async def collect_sap_siem(sap_siem_request: CollectSapSiemRequest) -> InvokeSAP
     """
     logger.info(f"Collecting SAP SIEM Events for customer_code: {sap_siem_request.customer_code}")
 
-    results = await make_request(sap_siem_request)
-
-    for result in results.results:
-        # write the `timestamp` field as `event_timestamp`
-        result.event_timestamp = result.timestamp
-        await send_to_event_shipper(
-            EventShipperPayload(
-                customer_code=sap_siem_request.customer_code,
-                integration="sap_siem",
-                version="1.0",
-                **result.dict(),
-            ),
-        )
+    checkpoint_position = get_checkpoint_position(
+        await get_checkpoint(session, sap_siem_request.customer_code, "collection", scope=sap_siem_request.apiKey),
+    )
+    if checkpoint_position is not None:
+        sap_siem_request.lower_bound = checkpoint_position[0]
+
+    pages = asyncio.Queue(maxsize=sap_siem_request.max_pages_in_flight)
+    fetcher = asyncio.create_task(fetch_pages(sap_siem_request, pages))
+
+    last_position = checkpoint_position
+    events_shipped = 0
+    try:
+        while (results := await pages.get()) is not None:
+            for result in results:
+                position = (result.timestamp, result.callID)
+                # The lower bound is inclusive, skip the events up to and including the checkpoint
+                if checkpoint_position is not None and position <= checkpoint_position:
+                    continue
+                # write the `timestamp` field as `event_timestamp`
+                result.event_timestamp = result.timestamp
+                await send_to_event_shipper(
+                    EventShipperPayload(
+                        customer_code=sap_siem_request.customer_code,
+                        integration="sap_siem",
+                        version="1.0",
+                        **result.dict(),
+                    ),
+                    settings=sap_siem_request.event_shipper_settings,
+                )
+                events_shipped += 1
+                if last_position is None or position > last_position:
+                    last_position = position
+    finally:
+        if not fetcher.done():
+            fetcher.cancel()
+    # Raises if fetching a page failed, the checkpoint is then left where it was
+    await fetcher
+    logger.info(f"Shipped {events_shipped} SAP SIEM events for customer_code: {sap_siem_request.customer_code}")
+
+    if last_position is not None and last_position != checkpoint_position:
+        await save_checkpoint(session, sap_siem_request.customer_code, "collection", last_position, scope=sap_siem_request.apiKey)
 
     return InvokeSAPSiemResponse(
         success=True,
@@ -0,0 +1,176 @@
+import os
+from collections import OrderedDict
+from datetime import datetime
+from datetime import timedelta
+from typing import Iterable
+from typing import Set
+from typing import Tuple
+
+from loguru import logger
+from sqlalchemy import delete
+from sqlalchemy import insert
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.integrations.sap_siem.models.sap_siem import SapSiemDedupEntry
+
+# How long a detector does not open a new case for the same IP or user
+SAP_SIEM_DEDUP_TTL_MINUTES = int(os.getenv("SAP_SIEM_DEDUP_TTL_MINUTES", 1440))
+# How many entries each worker keeps in memory in front of the database
+SAP_SIEM_DEDUP_CACHE_SIZE = int(os.getenv("SAP_SIEM_DEDUP_CACHE_SIZE", 10000))
+
+DedupKey = Tuple[str, str, str]
+
+
+class SapSiemDedupStore:
+    """
+    Remembers the (customer, detector, IP or user) combinations a case was opened for until they expire.
+
+    The entries live in the `sap_siem_dedup` table, so they survive restarts and are shared between workers.
+    A bounded LRU cache of the entries seen recently saves a database round trip for the keys that keep
+    coming back. Only entries that exist are cached: a key missing from the cache is always looked up,
+    because another worker may have added it.
+
+    A detector claims its keys with `claim` before it opens the cases, so two concurrent runs cannot open a
+    case for the same key.
+    """
+
+    def __init__(self, ttl_minutes: int = SAP_SIEM_DEDUP_TTL_MINUTES, max_cached: int = SAP_SIEM_DEDUP_CACHE_SIZE):
+        self.ttl = timedelta(minutes=ttl_minutes)
+        self.max_cached = max_cached
+        self.cache: "OrderedDict[DedupKey, datetime]" = OrderedDict()
+
+    def _cache_get(self, key: DedupKey, now: datetime) -> bool:
+        expires_at = self.cache.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= now:
+            del self.cache[key]
+            return False
+        self.cache.move_to_end(key)
+        return True
+
+    def _cache_put(self, key: DedupKey, expires_at: datetime) -> None:
+        self.cache[key] = expires_at
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.max_cached:
+            self.cache.popitem(last=False)
+
+    async def filter_new(self, session: AsyncSession, customer_code: str, detector: str, keys: Iterable[str]) -> Set[str]:
+        """
+        Returns the keys the detector has not opened a case for within the expiry, looking up the keys
+        missing from the cache in a single query.
+
+        Args:
+            session (AsyncSession): The database session.
+            customer_code (str): The customer code.
+            detector (str): The name of the detector.
+            keys (Iterable[str]): The IPs or users found suspicious.
+
+        Returns:
+            Set[str]: The keys to open a case for.
+        """
+        now = datetime.utcnow()
+        uncached = {key for key in keys if not self._cache_get((customer_code, detector, key), now)}
+        if not uncached:
+            return set()
+
+        result = await session.execute(
+            select(SapSiemDedupEntry).where(
+                SapSiemDedupEntry.customer_code == customer_code,
+                SapSiemDedupEntry.detector == detector,
+                SapSiemDedupEntry.dedup_key.in_(uncached),
+                SapSiemDedupEntry.expires_at > now,
+            ),
+        )
+        for entry in result.scalars():
+            self._cache_put((customer_code, detector, entry.dedup_key), entry.expires_at)
+            uncached.discard(entry.dedup_key)
+        return uncached
+
+    async def claim(self, session: AsyncSession, customer_code: str, detector: str, keys: Iterable[str]) -> Set[str]:
+        """
+        Claims the keys the detector has not opened a case for within the expiry, starting their expiry.
+
+        A new key is claimed by inserting its entry, which the unique constraint lets only one run do. An
+        expired key is claimed by an update that only matches while the entry is still expired. A key another
+        run claimed first is left out.
+
+        Args:
+            session (AsyncSession): The database session.
+            customer_code (str): The customer code.
+            detector (str): The name of the detector.
+            keys (Iterable[str]): The IPs or users found suspicious.
+
+        Returns:
+            Set[str]: The keys claimed, to open a case for.
+        """
+        candidates = await self.filter_new(session, customer_code, detector, keys)
+        if not candidates:
+            return set()
+        now = datetime.utcnow()
+        expires_at = now + self.ttl
+        claimed = set()
+        for key in candidates:
+            result = await session.execute(
+                update(SapSiemDedupEntry)
+                .where(
+                    SapSiemDedupEntry.customer_code == customer_code,
+                    SapSiemDedupEntry.detector == detector,
+                    SapSiemDedupEntry.dedup_key == key,
+                    SapSiemDedupEntry.expires_at <= now,
+                )
+                .values(expires_at=expires_at),
+            )
+            if not result.rowcount:
+                try:
+                    async with session.begin_nested():
+                        await session.execute(
+                            insert(SapSiemDedupEntry).values(
+                                customer_code=customer_code,
+                                detector=detector,
+                                dedup_key=key,
+                                expires_at=expires_at,
+                            ),
+                        )
+                except IntegrityError:
+                    logger.info(f"SAP SIEM detector {detector} skips {key}, another run claimed it")
+                    continue
+            claimed.add(key)
+            self._cache_put((customer_code, detector, key), expires_at)
+        await session.commit()
+        return claimed
+
+    async def release(self, session: AsyncSession, customer_code: str, detector: str, keys: Iterable[str]) -> None:
+        """
+        Gives up claimed keys whose cases could not be opened, so the next run reports them again.
+        """
+        keys = set(keys)
+        if not keys:
+            return
+        # The failed case creation may have left the transaction unusable
+        await session.rollback()
+        await session.execute(
+            delete(SapSiemDedupEntry).where(
+                SapSiemDedupEntry.customer_code == customer_code,
+                SapSiemDedupEntry.detector == detector,
+                SapSiemDedupEntry.dedup_key.in_(keys),
+            ),
+        )
+        await session.commit()
+        for key in keys:
+            self.cache.pop((customer_code, detector, key), None)
+
+    async def purge_expired(self, session: AsyncSession) -> None:
+        """
+        Deletes the expired entries so the table only holds the keys still within their expiry.
+        """
+        result = await session.execute(delete(SapSiemDedupEntry).where(SapSiemDedupEntry.expires_at <= datetime.utcnow()))
+        await session.commit()
+        if result.rowcount:
+            logger.info(f"Purged {result.rowcount} expired SAP SIEM dedup entries")
+
+
+dedup_store = SapSiemDedupStore()
@@ -0,0 +1,77 @@
+import asyncio
+import os
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from dfir_iris_client.case import Case
+from dfir_iris_client.helper.utils import assert_api_resp
+from fastapi import HTTPException
+from loguru import logger
+
+from app.connectors.dfir_iris.utils.universal import fetch_and_validate_data
+from app.connectors.dfir_iris.utils.universal import initialize_client_and_case
+from app.integrations.sap_siem.schema.sap_siem import AddAssetModel
+
+# IRIS has no endpoint to add several assets at once, so this many assets are added in parallel
+SAP_SIEM_IRIS_ASSET_CONCURRENCY = int(os.getenv("SAP_SIEM_IRIS_ASSET_CONCURRENCY", 5))
+
+
+def asset_key(name: str, ip: Optional[str]) -> Tuple[str, Optional[str]]:
+    return name.lower(), ip
+
+
+def add_asset(case_client: Case, case_id: int, asset: AddAssetModel) -> None:
+    """
+    Adds one asset to the case. The IRIS client is synchronous, so this runs in a worker thread.
+    """
+    status = case_client.add_asset(cid=case_id, **asset.to_dict())
+    assert_api_resp(status, soft_fail=False)
+
+
+async def add_assets_to_case(case_id: int, assets: List[AddAssetModel]) -> int:
+    """
+    Adds the assets to the IRIS case over a single client. The assets already in the case are listed
+    once and skipped, as are duplicates within `assets`, where the asset of a successful login wins
+    since it marks the user compromised.
+
+    Args:
+        case_id (int): The ID of the IRIS case.
+        assets (List[AddAssetModel]): The assets to add.
+
+    Returns:
+        int: The number of assets added.
+
+    Raises:
+        HTTPException: If adding any of the assets fails.
+    """
+    if not assets:
+        return 0
+    client, case_client = await initialize_client_and_case("DFIR-IRIS")
+    existing_assets = (await fetch_and_validate_data(client, case_client.list_assets, case_id))["data"]["assets"]
+    existing_keys = {asset_key(asset["asset_name"], asset.get("asset_ip")) for asset in existing_assets}
+
+    pending = {}
+    for asset in assets:
+        key = asset_key(asset.name, asset.ip)
+        if key in existing_keys:
+            continue
+        if key not in pending or (asset.compromise_status and not pending[key].compromise_status):
+            pending[key] = asset
+
+    logger.info(f"Adding {len(pending)} assets to IRIS case {case_id}, skipped {len(assets) - len(pending)} already present")
+    semaphore = asyncio.Semaphore(SAP_SIEM_IRIS_ASSET_CONCURRENCY)
+
+    async def add(asset: AddAssetModel) -> None:
+        async with semaphore:
+            await asyncio.to_thread(add_asset, case_client, case_id, asset)
+
+    results = await asyncio.gather(*(add(asset) for asset in pending.values()), return_exceptions=True)
+    failures = [result for result in results if isinstance(result, Exception)]
+    if failures:
+        logger.error(f"Failed to add {len(failures)} of {len(pending)} assets to IRIS case {case_id}: {failures}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to add {len(failures)} of {len(pending)} assets to IRIS case {case_id}: {failures[0]}",
+        )
+    return len(pending)
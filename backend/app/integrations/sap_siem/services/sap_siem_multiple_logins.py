@@ -1,6 +1,5 @@
 from collections import defaultdict
 from datetime import datetime
-from datetime import timedelta
 from typing import List
 from typing import Set
 
@@ -15,17 +14,15 @@ from app.connectors.wazuh_indexer.utils.universal import create_wazuh_indexer_cl
 from app.integrations.sap_siem.models.sap_siem import SapSiemMultipleLogins
 from app.integrations.sap_siem.schema.sap_siem import AddAssetModel
 from app.integrations.sap_siem.schema.sap_siem import CaseResponse
-from app.integrations.sap_siem.schema.sap_siem import InvokeSAPSiemResponse
 from app.integrations.sap_siem.schema.sap_siem import IrisCasePayload
 from app.integrations.sap_siem.schema.sap_siem import SapSiemWazuhIndexerResponse
 from app.integrations.sap_siem.schema.sap_siem import SuspiciousLogin
+from app.integrations.sap_siem.services.iris_assets import add_assets_to_case
+from app.integrations.sap_siem.utils.sliding_window import SlidingWindow
 from app.integrations.utils.alerts import send_to_shuffle
 from app.integrations.utils.schema import ShufflePayload
 from app.utils import get_customer_alert_settings
 
-# Global set to keep track of IPs that have already been checked
-checked_ips = set()
-
 
 async def handle_common_suspicious_login_tasks(
     suspicious_login,
@@ -51,7 +48,6 @@ async def handle_common_suspicious_login_tasks(
     case_ids.append(case.data.case_id)
     user_activity = await collect_user_activity(suspicious_login)
     await handle_user_activity(user_activity, unique_instances, case.data.case_id)
-    await mark_as_checked(suspicious_login)
     alert_source_link = (await get_customer_alert_settings(suspicious_login.customer_code, session=session)).shuffle_endpoint
     await send_to_shuffle(
         ShufflePayload(
@@ -86,76 +82,6 @@ async def handle_suspicious_login_multiple(suspicious_login, unique_instances, c
         create_iris_case_multiple,
         session,
     )
-    await update_event_analyzed_multiple_logins_flag(suspicious_login.id, suspicious_login.index)
-
-
-async def update_event_analyzed_multiple_logins_flag(id: str, index: str):
-    """
-    Update the event_analyzed_multiple_logins flag in the Elasticsearch document to True.
-
-    :param suspicious_login: The suspicious login to update
-
-    :return: None
-    """
-    es_client = await create_wazuh_indexer_client("Wazuh-Indexer")
-    try:
-        es_client.update(
-            index=index,
-            id=id,
-            body={
-                "doc": {
-                    "event_analyzed_multiple_logins": "True",
-                },
-            },
-        )
-        logger.info(f"Updated event_analyzed_multiple_logins flag for suspicious login: {id}")
-    except Exception as e:
-        logger.error(
-            f"Failed to update case created flag {e}",
-        )
-        # Attempt to remove read-only block
-        try:
-            es_client.indices.put_settings(
-                index=index,
-                body={"index.blocks.write": None},
-            )
-            logger.info(
-                f"Removed read-only block from index {index}. Retrying update.",
-            )
-
-            # Retry the update operation
-            es_client.update(
-                index=index,
-                id=id,
-                body={"doc": {"event_analyzed_multiple_logins": "True"}},
-            )
-            logger.info(
-                f"Added event_analyzed_multiple_logins flag to index {index} for suspicious login: {id}",
-            )
-
-            # Reenable the write block
-            es_client.indices.put_settings(
-                index=index,
-                body={"index.blocks.write": True},
-            )
-        except Exception as e2:
-            logger.error(
-                f"Failed to remove read-only block from index {index}: {e2}",
-            )
-            return False
-
-
-async def mark_as_checked(suspicious_login):
-    """
-    Marks a suspicious login as checked by adding it to the set of checked IPs.
-
-    Args:
-        suspicious_login (Login): The suspicious login object to mark as checked.
-
-    Returns:
-        None
-    """
-    checked_ips.add((suspicious_login.loginID, suspicious_login.ip))
 
 
 async def handle_user_activity(user_activity: SapSiemWazuhIndexerResponse, unique_instances, case_id):
@@ -163,11 +89,9 @@ async def handle_user_activity(user_activity: SapSiemWazuhIndexerResponse, uniqu
     Handles user activity by processing each hit in the user_activity and performing the following steps:
     1. Extracts relevant information from the hit.
     2. Checks if the current activity is already present in the unique_instances set.
-    3. If not present, adds the user activity to the IRIS case.
-    4. Creates an asset payload using the current activity.
-    5. Updates the case with the asset payload.
-    6. Updates the event analyzed multiple logins flag for the hit.
-    7. Adds the current activity to the unique_instances set.
+    3. If not present, creates an asset payload using the current activity.
+    4. Adds the current activity to the unique_instances set.
+    5. Adds the asset payloads to the case in one batch, skipping the assets already in the case.
 
     Parameters:
     - user_activity (SapSiemWazuhIndexerResponse): The user activity to be processed.
@@ -177,6 +101,7 @@ async def handle_user_activity(user_activity: SapSiemWazuhIndexerResponse, uniqu
     Returns:
     None
     """
+    assets = []
     for hit in user_activity.hits.hits:
         current_activity = {
             "loginID": hit.source.params_loginID,
@@ -189,13 +114,9 @@ async def handle_user_activity(user_activity: SapSiemWazuhIndexerResponse, uniqu
         }
         current_activity_frozenset = frozenset(current_activity.items())
         if current_activity_frozenset not in unique_instances:
-            logger.info(f"Adding user activity to IRIS case: {current_activity}")
-            current_asset = SuspiciousLogin(**current_activity)
-            asset_payload = create_asset_payload(asset=current_asset)
-            logger.info(f"Asset Payload: {asset_payload}")
-            await update_case_with_asset(case_id, asset_payload)
-            await update_event_analyzed_multiple_logins_flag(hit.id, hit.index)
+            assets.append(create_asset_payload(asset=SuspiciousLogin(**current_activity)))
             unique_instances.add(current_activity_frozenset)
+    await add_assets_to_case(case_id, assets)
 
 
 def create_asset_payload(asset: SuspiciousLogin):
@@ -227,25 +148,6 @@ def create_asset_payload(asset: SuspiciousLogin):
     )
 
 
-async def update_case_with_asset(case_id: str, asset_payload):
-    """
-    Update the case with the asset information.
-
-    :param case_id: The ID of the case to update
-    :param asset_payload: The payload to update the case with
-
-    :return: None
-    """
-    logger.info(f"Updating IRIS case {case_id} with asset: {asset_payload}")
-    client, case_client = await initialize_client_and_case("DFIR-IRIS")
-    return await fetch_and_validate_data(
-        client,
-        case_client.add_asset,
-        cid=case_id,
-        **asset_payload.to_dict(),
-    )
-
-
 async def create_iris_case_multiple(suspicious_login: SuspiciousLogin, session: AsyncSession) -> CaseResponse:
     """
     Creates an IRIS case for multiple logins with the same IP address.
@@ -285,7 +187,6 @@ async def create_iris_case_multiple(suspicious_login: SuspiciousLogin, session:
         case_client.add_case,
         **payload.to_dict(),
     )
-    await update_event_analyzed_multiple_logins_flag(suspicious_login.id, suspicious_login.index)
 
     return CaseResponse(**result)
 
@@ -311,40 +212,14 @@ async def collect_user_activity(suspicious_logins: SuspiciousLogin) -> SapSiemWa
     return SapSiemWazuhIndexerResponse(**results)
 
 
-async def get_initial_search_results(es_client):
-    """
-    Retrieves the initial search results from Elasticsearch.
-
-    Args:
-        es_client (Elasticsearch): The Elasticsearch client.
-
-    Returns:
-        dict: The search results.
-    """
-    return es_client.search(
-        index="sap_siem_*",
-        # index="new-integrations*",
-        body={
-            "size": 1000,
-            "query": {"bool": {"must": [{"term": {"errMessage": "OK"}}, {"term": {"event_analyzed_multiple_logins": "False"}}]}},
-            "sort": [{"event_timestamp": {"order": "asc"}}],
-        },
-        scroll="1m",
-    )
-
-
-async def get_next_batch_of_results(es_client, scroll_id):
+def build_events_query() -> dict:
     """
-    Retrieves the next batch of results using the provided Elasticsearch client and scroll ID.
-
-    Args:
-        es_client (Elasticsearch): The Elasticsearch client.
-        scroll_id (str): The scroll ID to retrieve the next batch of results.
+    Builds the query matching the events this detector analyzes.
 
     Returns:
-        dict: The next batch of results.
+        dict: The query.
     """
-    return es_client.scroll(scroll_id=scroll_id, scroll="1m")
+    return {"bool": {"must": [{"term": {"errMessage": "OK"}}]}}
 
 
 async def process_hits(hits, ip_to_login_ids, suspicious_activity, time_range):
@@ -353,38 +228,14 @@ async def process_hits(hits, ip_to_login_ids, suspicious_activity, time_range):
 
     Args:
         hits (list): List of hits received from SAP SIEM.
-        ip_to_login_ids (dict): Dictionary mapping IP addresses to login IDs.
+        ip_to_login_ids (dict): Dictionary mapping IP addresses to the sliding window of their successful logins.
         suspicious_activity (dict): Dictionary mapping IP addresses to a list of suspicious login objects.
 
     Returns:
         None
     """
-    # for hit in hits:
-    #     if hit.source.errMessage == "OK":
-    #         # Convert loginID to lowercase before comparing
-    #         login_id = hit.source.params_loginID.lower()
-    #         ip_to_login_ids[hit.source.ip].add(login_id)
-
-    #         suspicious_login = SuspiciousLogin(
-    #             _index=hit.index,
-    #             _id=hit.id,
-    #             customer_code=hit.source.customer_code,
-    #             logSource=hit.source.logSource,
-    #             loginID=hit.source.params_loginID,
-    #             country=hit.source.httpReq_country,
-    #             ip=hit.source.ip,
-    #             event_timestamp=hit.source.event_timestamp,
-    #             errMessage=hit.source.errMessage,
-    #             errDetails=hit.source.errDetails,
-    #         )
-
-    #         suspicious_activity[hit.source.ip].append(suspicious_login)
-    # Keep track of the timestamps for each loginID for each IP
-    ip_to_login_timestamps = defaultdict(lambda: defaultdict(list))
-
     for hit in hits:
         if hit.source.errMessage == "OK":
-            # logger.info(f"Processing hit: {hit}")
             # Convert loginID to lowercase before comparing
             login_id = hit.source.params_loginID.lower()
             ip = hit.source.ip
@@ -397,92 +248,52 @@ async def process_hits(hits, ip_to_login_ids, suspicious_activity, time_range):
             # Parse the event timestamp
             event_timestamp = datetime.strptime(hit.source.event_timestamp, "%Y-%m-%dT%H:%M:%S.%fZ")
 
-            # Add the timestamp to the list for this loginID for this IP
-            ip_to_login_timestamps[ip][login_id].append(event_timestamp)
-
-            logger.info(f"Added timestamp {event_timestamp} for IP {ip} and loginID {login_id}")
-
-            # Check if there's another loginID for the same IP within the last 10 minutes
-            for other_login_id, timestamps in ip_to_login_timestamps[ip].items():
-                if other_login_id != login_id:
-                    if any(
-                        event_timestamp - timedelta(minutes=time_range) <= other_timestamp <= event_timestamp
-                        for other_timestamp in timestamps
-                    ):
-                        # Add the loginID to the set for this IP
-                        ip_to_login_ids[ip].add(login_id)
-
-                        logger.info(f"Detected multiple logins within 10 minutes for IP {ip}: {login_id} and {other_login_id}")
-
-                        suspicious_login = SuspiciousLogin(
-                            _index=hit.index,
-                            _id=hit.id,
-                            customer_code=hit.source.customer_code,
-                            logSource=hit.source.logSource,
-                            loginID=hit.source.params_loginID,
-                            country=hit.source.httpReq_country,
-                            ip=hit.source.ip,
-                            event_timestamp=hit.source.event_timestamp,
-                            errMessage=hit.source.errMessage,
-                            errDetails=hit.source.errDetails,
-                        )
-
-                        suspicious_activity[ip].append(suspicious_login)
-                        logger.info(f"Added suspicious login: {suspicious_login}")
-                        break
-
-
-async def check_multiple_successful_logins_by_ip(threshold: int, time_range: int) -> List[SuspiciousLogin]:
-    """
-    Checks for multiple successful logins by IP address.
+            # Add the loginID to the window for this IP, evicting the logins older than the time range
+            window = ip_to_login_ids.get(ip)
+            if window is None:
+                window = ip_to_login_ids[ip] = SlidingWindow(time_range)
+            window.add(event_timestamp, login_id, "0")
 
-    Args:
-        threshold (int): The minimum number of logins required to be considered suspicious.
+            logger.debug(f"Added timestamp {event_timestamp} for IP {ip} and loginID {login_id}")
 
-    Returns:
-        List[SuspiciousLogin]: A list of suspicious login objects.
-    """
-    ip_to_login_ids = defaultdict(set)
-    suspicious_activity = defaultdict(list)
+            # Check if there's another loginID for the same IP within the time range
+            if window.key_count > 1:
+                logger.info(f"Detected multiple logins within {time_range} minutes for IP {ip}: {login_id}")
 
-    es_client = await create_wazuh_indexer_client("Wazuh-Indexer")
-    scroll_id = None
-
-    while True:
-        if scroll_id is None:
-            results = await get_initial_search_results(es_client)
-            logger.info(f"Initial search results: {results}")
-        else:
-            results = await get_next_batch_of_results(es_client, scroll_id)
-
-        if not results["hits"]["hits"]:
-            break
-
-        results = SapSiemWazuhIndexerResponse(**results)
-        await process_hits(results.hits.hits, ip_to_login_ids, suspicious_activity, time_range)
+                suspicious_login = SuspiciousLogin(
+                    _index=hit.index,
+                    _id=hit.id,
+                    customer_code=hit.source.customer_code,
+                    logSource=hit.source.logSource,
+                    loginID=hit.source.params_loginID,
+                    country=hit.source.httpReq_country,
+                    ip=hit.source.ip,
+                    event_timestamp=hit.source.event_timestamp,
+                    errMessage=hit.source.errMessage,
+                    errDetails=hit.source.errDetails,
+                )
 
-        scroll_id = results.scroll_id
+                suspicious_activity[ip].append(suspicious_login)
+                logger.info(f"Added suspicious login: {suspicious_login}")
 
-    # Clear the scroll when you're done to free up resources
-    if scroll_id is not None:
-        es_client.clear_scroll(scroll_id=scroll_id)
 
-    suspicious_activity = {ip: results for ip, results in suspicious_activity.items() if len(ip_to_login_ids[ip]) > threshold}
-
-    return [login for sublist in suspicious_activity.values() for login in sublist]
-
-
-async def get_suspicious_ips(threshold: int, time_range: int) -> List[SuspiciousLogin]:
+def collect_suspicious_logins(suspicious_activity, threshold: int) -> List[SuspiciousLogin]:
     """
-    Retrieves a list of suspicious login attempts based on the specified threshold.
+    Flattens the suspicious activity gathered by `process_hits` into a list of suspicious logins, keeping the
+    IPs used by more than `threshold` login IDs.
 
     Args:
-        threshold (int): The number of successful logins from the same IP address that is considered suspicious.
+        suspicious_activity (dict): Dictionary mapping IPs to a list of suspicious login objects.
+        threshold (int): The minimum number of logins required to be considered suspicious.
 
     Returns:
-        List[SuspiciousLogin]: A list of SuspiciousLogin objects representing the suspicious login attempts.
+        List[SuspiciousLogin]: A list of suspicious login objects.
     """
-    return await check_multiple_successful_logins_by_ip(threshold=threshold, time_range=time_range)
+    suspicious_activity = {
+        ip: logins for ip, logins in suspicious_activity.items() if len({login.loginID.lower() for login in logins}) > threshold
+    }
+
+    return [login for sublist in suspicious_activity.values() for login in sublist]
 
 
 async def get_existing_database_record(session: AsyncSession, ip: str) -> SapSiemMultipleLogins:
@@ -536,22 +347,17 @@ def create_new_database_record(ip: str, new_login_ids: Set[str]) -> SapSiemMulti
     )
 
 
-async def sap_siem_multiple_logins_same_ip(threshold: int, time_range: int, session: AsyncSession) -> InvokeSAPSiemResponse:
+async def handle_suspicious_ips(suspicious_ips: List[SuspiciousLogin], session: AsyncSession) -> None:
     """
-    Finds same IP with multiple users and handles suspicious logins.
+    Records the suspicious logins per IP in the database and creates an IRIS case for each IP.
 
     Args:
-        threshold (int): The threshold value for determining suspicious logins.
+        suspicious_ips (List[SuspiciousLogin]): The suspicious logins found by the detector.
         session (AsyncSession): The database session.
 
     Returns:
-        InvokeSAPSiemResponse: The response indicating the success of the operation.
+        None
     """
-    logger.info("Finding same IP with multiple users")
-
-    suspicious_ips = await get_suspicious_ips(threshold, time_range)
-    logger.info(f"Suspicious IPs: {suspicious_ips}")
-
     unique_instances = set()
     case_ids = []
     # Dictionary to aggregate suspicious logins by IP
@@ -588,11 +394,3 @@ async def sap_siem_multiple_logins_same_ip(threshold: int, time_range: int, sess
                 detail="Failed to create IRIS case",
             )
     await session.commit()
-
-    # Clear the global set
-    checked_ips.clear()
-
-    return InvokeSAPSiemResponse(
-        success=True,
-        message="SAP SIEM multiple logins invoked.",
-    )
@@ -0,0 +1,445 @@
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from datetime import timedelta
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.connectors.wazuh_indexer.utils.universal import create_wazuh_indexer_client
+from app.integrations.models.customer_integration_settings import CustomerIntegrations
+from app.integrations.sap_siem.schema.sap_siem import SapSiemDetectorResult
+from app.integrations.sap_siem.schema.sap_siem import SapSiemDetectorSettings
+from app.integrations.sap_siem.schema.sap_siem import SapSiemSharedAnalysisResponse
+from app.integrations.sap_siem.schema.sap_siem import SapSiemWazuhIndexerResponse
+from app.integrations.sap_siem.schema.sap_siem import SuspiciousLogin
+from app.integrations.sap_siem.services import sap_siem_brute_force_same_ip
+from app.integrations.sap_siem.services import sap_siem_brute_forced_failed_logins
+from app.integrations.sap_siem.services import (
+    sap_siem_failed_same_user_different_geo_location,
+)
+from app.integrations.sap_siem.services import (
+    sap_siem_failed_same_user_from_different_ip,
+)
+from app.integrations.sap_siem.services import sap_siem_multiple_logins
+from app.integrations.sap_siem.services import (
+    sap_siem_successful_login_same_ip_after_multiple_failures,
+)
+from app.integrations.sap_siem.services import (
+    sap_siem_successful_same_user_different_geo_location,
+)
+from app.integrations.sap_siem.services import (
+    sap_siem_successful_user_login_after_using_different_ip,
+)
+from app.integrations.sap_siem.services import sap_siem_suspicious_logins
+from app.integrations.sap_siem.services.checkpoint import EventPosition
+from app.integrations.sap_siem.services.checkpoint import get_checkpoint
+from app.integrations.sap_siem.services.checkpoint import get_checkpoint_position
+from app.integrations.sap_siem.services.checkpoint import save_checkpoint
+from app.integrations.sap_siem.services.dedup import dedup_store
+
+EVENT_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+# How far back the first analysis of a customer reaches, before there is a checkpoint
+SAP_SIEM_ANALYSIS_INITIAL_LOOKBACK_MINUTES = int(os.getenv("SAP_SIEM_ANALYSIS_INITIAL_LOOKBACK_MINUTES", 1440))
+# Events younger than this may still be on their way to the indexer and are left for the next run
+SAP_SIEM_ANALYSIS_SETTLE_SECONDS = int(os.getenv("SAP_SIEM_ANALYSIS_SETTLE_SECONDS", 60))
+
+# Detector name -> (module, default settings). The defaults match the per-detector routes.
+DETECTORS = {
+    "successful_user_login_with_different_ip": (
+        sap_siem_successful_user_login_after_using_different_ip,
+        SapSiemDetectorSettings(threshold=0, time_range=15),
+    ),
+    "same_user_failed_login_from_different_ip": (
+        sap_siem_failed_same_user_from_different_ip,
+        SapSiemDetectorSettings(threshold=0, time_range=10),
+    ),
+    "same_user_failed_login_from_different_geo_location": (
+        sap_siem_failed_same_user_different_geo_location,
+        SapSiemDetectorSettings(threshold=0, time_range=20),
+    ),
+    "same_user_successful_login_from_different_geo_location": (
+        sap_siem_successful_same_user_different_geo_location,
+        SapSiemDetectorSettings(threshold=0, time_range=20),
+    ),
+    "brute_force_failed_logins_multiple_ips": (
+        sap_siem_brute_forced_failed_logins,
+        SapSiemDetectorSettings(threshold=0, time_range=3),
+    ),
+    "brute_force_failed_logins_same_ip": (
+        sap_siem_brute_force_same_ip,
+        SapSiemDetectorSettings(threshold=0, time_range=5),
+    ),
+    "successful_login_after_multiple_failed_logins": (
+        sap_siem_successful_login_same_ip_after_multiple_failures,
+        SapSiemDetectorSettings(threshold=0, time_range=2),
+    ),
+    "multiple_logins_same_ip": (
+        sap_siem_multiple_logins,
+        SapSiemDetectorSettings(threshold=0, time_range=10),
+    ),
+    "suspicious_logins": (
+        sap_siem_suspicious_logins,
+        SapSiemDetectorSettings(threshold=3),
+    ),
+}
+
+
+def source_matches_query(source: dict, query: dict) -> bool:
+    """
+    Evaluates a detector's `bool.must` of `term` clauses against the `_source` of a hit, so each detector
+    only sees the events its own query matches.
+
+    Args:
+        source (dict): The `_source` of the hit.
+        query (dict): The query built by the detector.
+
+    Returns:
+        bool: True if every term matches.
+    """
+    return all(str(source.get(field)) == str(value) for clause in query["bool"]["must"] for field, value in clause["term"].items())
+
+
+class SapSiemDetector:
+    """
+    A detector fed by the shared scan. Keeps its own state, suspicious activity and timings so the
+    detectors do not interfere with each other while they consume the same events.
+    """
+
+    def __init__(self, name: str, module, settings: SapSiemDetectorSettings):
+        self.name = name
+        self.module = module
+        self.threshold = settings.threshold
+        self.time_range = settings.time_range
+        self.query = module.build_events_query()
+        # The position of the last event analyzed in a previous run. Events up to it are only fed to the
+        # detector to fill its windows, suspicious logins among them were handled already.
+        self.checkpoint: Optional[EventPosition] = None
+        self.ip_to_login_ids = {}
+        self.suspicious_activity = defaultdict(list)
+        self.events_processed = 0
+        self.suspicious_logins_found = 0
+        self.processing_seconds = 0.0
+        self.handling_seconds = 0.0
+
+    def matches(self, source: dict) -> bool:
+        return source_matches_query(source, self.query)
+
+    async def process_hits(self, hits) -> None:
+        start = time.perf_counter()
+        await self.module.process_hits(hits, self.ip_to_login_ids, self.suspicious_activity, self.time_range)
+        self.processing_seconds += time.perf_counter() - start
+        self.events_processed += len(hits)
+
+    def collect_suspicious_logins(self) -> List[SuspiciousLogin]:
+        return self.module.collect_suspicious_logins(self.suspicious_activity)
+
+    async def handle_suspicious_logins(self, suspicious_logins: List[SuspiciousLogin], session: AsyncSession) -> None:
+        await self.module.handle_suspicious_ips(suspicious_logins, session)
+
+    def dedup_key(self, suspicious_login: SuspiciousLogin) -> str:
+        """
+        The detectors open one case per IP, so an IP that already has a case is not reported again until its entry expires.
+        """
+        return suspicious_login.ip
+
+    def keys_by_customer(self, suspicious_logins: List[SuspiciousLogin]) -> Dict[str, Set[str]]:
+        keys_by_customer = defaultdict(set)
+        for login in suspicious_logins:
+            keys_by_customer[login.customer_code].add(self.dedup_key(login))
+        return keys_by_customer
+
+    async def claim_new(self, suspicious_logins: List[SuspiciousLogin], session: AsyncSession) -> List[SuspiciousLogin]:
+        """
+        Claims the IPs or users of the suspicious logins in the dedup store and returns the logins whose key was
+        claimed, leaving out the ones the detector opened a case for recently or another run is handling.
+        """
+        claimed = set()
+        for customer_code, keys in self.keys_by_customer(suspicious_logins).items():
+            claimed.update((customer_code, key) for key in await dedup_store.claim(session, customer_code, self.name, keys))
+        return [login for login in suspicious_logins if (login.customer_code, self.dedup_key(login)) in claimed]
+
+    async def release_claims(self, suspicious_logins: List[SuspiciousLogin], session: AsyncSession) -> None:
+        for customer_code, keys in self.keys_by_customer(suspicious_logins).items():
+            await dedup_store.release(session, customer_code, self.name, keys)
+
+    async def finish(self, session: AsyncSession) -> None:
+        """
+        Collects the suspicious logins found during the scan and creates the IRIS cases for them, skipping
+        the IPs or users the detector opened a case for recently.
+        """
+        start = time.perf_counter()
+        suspicious_logins = self.collect_suspicious_logins()
+        if self.checkpoint is not None:
+            suspicious_logins = [login for login in suspicious_logins if (login.event_timestamp, login.id) > self.checkpoint]
+        self.processing_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        suspicious_logins = await self.claim_new(suspicious_logins, session)
+        self.suspicious_logins_found = len(suspicious_logins)
+        logger.info(f"Detector {self.name} found {self.suspicious_logins_found} suspicious logins")
+        try:
+            await self.handle_suspicious_logins(suspicious_logins, session)
+        except Exception:
+            await self.release_claims(suspicious_logins, session)
+            raise
+        self.handling_seconds += time.perf_counter() - start
+
+    def result(self, customer_code: str) -> SapSiemDetectorResult:
+        return SapSiemDetectorResult(
+            detector=self.name,
+            customer_code=customer_code,
+            events_processed=self.events_processed,
+            suspicious_logins=self.suspicious_logins_found,
+            processing_seconds=round(self.processing_seconds, 3),
+            handling_seconds=round(self.handling_seconds, 3),
+        )
+
+
+class SapSiemMultipleLoginsDetector(SapSiemDetector):
+    """
+    The multiple logins detector reports the IPs used by more login IDs than its threshold.
+    """
+
+    def collect_suspicious_logins(self) -> List[SuspiciousLogin]:
+        return self.module.collect_suspicious_logins(self.suspicious_activity, self.threshold)
+
+
+class SapSiemSuspiciousLoginsDetector(SapSiemDetector):
+    """
+    The suspicious logins detector counts invalid logins per IP instead of keeping a time window.
+    """
+
+    def __init__(self, name: str, module, settings: SapSiemDetectorSettings):
+        super().__init__(name, module, settings)
+        self.last_invalid_login = {}
+        self.suspicious_logins = []
+
+    async def process_hits(self, hits) -> None:
+        start = time.perf_counter()
+        await self.module.process_hits(hits, self.last_invalid_login, self.suspicious_logins, self.threshold)
+        self.processing_seconds += time.perf_counter() - start
+        self.events_processed += len(hits)
+
+    def collect_suspicious_logins(self) -> List[SuspiciousLogin]:
+        return self.suspicious_logins
+
+    async def handle_suspicious_logins(self, suspicious_logins: List[SuspiciousLogin], session: AsyncSession) -> None:
+        await self.module.handle_suspicious_logins(suspicious_logins, session)
+
+    def dedup_key(self, suspicious_login: SuspiciousLogin) -> str:
+        """
+        The suspicious logins detector opens one case per user and IP.
+        """
+        return f"{suspicious_login.loginID.lower()}|{suspicious_login.ip}"
+
+
+# The detectors whose module does not fit the interface of `SapSiemDetector`
+DETECTOR_CLASSES = {
+    sap_siem_multiple_logins: SapSiemMultipleLoginsDetector,
+    sap_siem_suspicious_logins: SapSiemSuspiciousLoginsDetector,
+}
+
+
+def build_detectors(settings: Optional[Dict[str, SapSiemDetectorSettings]] = None) -> List[SapSiemDetector]:
+    """
+    Builds the detectors to run. When `settings` is given, only the detectors named in it are run.
+
+    Args:
+        settings (Optional[Dict[str, SapSiemDetectorSettings]]): Threshold and time range per detector name.
+
+    Returns:
+        List[SapSiemDetector]: The detectors.
+    """
+    detectors = []
+    for name, (module, default_settings) in DETECTORS.items():
+        if settings is not None and name not in settings:
+            continue
+        detector_settings = settings[name] if settings is not None else default_settings
+        if detector_settings.time_range is None:
+            detector_settings = SapSiemDetectorSettings(threshold=detector_settings.threshold, time_range=default_settings.time_range)
+        detector_class = DETECTOR_CLASSES.get(module, SapSiemDetector)
+        detectors.append(detector_class(name, module, detector_settings))
+    return detectors
+
+
+def build_shared_scan_query(detectors: List[SapSiemDetector], customer_code: str, start: str, cutoff: str) -> dict:
+    """
+    Builds a query matching the events of the customer between `start` and `cutoff` that at least one of the detectors analyzes.
+    """
+    return {
+        "bool": {
+            "must": [
+                {"term": {"customer_code": customer_code}},
+                {"range": {"event_timestamp": {"gte": start, "lte": cutoff}}},
+            ],
+            "should": [detector.query for detector in detectors],
+            "minimum_should_match": 1,
+        },
+    }
+
+
+def get_scan_start(detectors: List[SapSiemDetector], now: datetime) -> str:
+    """
+    Returns where the scan starts: one detector time range before the oldest checkpoint, so the windows of
+    the detectors hold the events that preceded the new ones. Without a checkpoint, the initial lookback is used.
+    """
+    if any(detector.checkpoint is None for detector in detectors):
+        return (now - timedelta(minutes=SAP_SIEM_ANALYSIS_INITIAL_LOOKBACK_MINUTES)).strftime(EVENT_TIMESTAMP_FORMAT)
+    oldest_checkpoint = datetime.strptime(min(detector.checkpoint for detector in detectors)[0], EVENT_TIMESTAMP_FORMAT)
+    longest_time_range = max(detector.time_range or 0 for detector in detectors)
+    return (oldest_checkpoint - timedelta(minutes=longest_time_range)).strftime(EVENT_TIMESTAMP_FORMAT)
+
+
+async def get_sap_siem_customer_codes(session: AsyncSession) -> List[str]:
+    result = await session.execute(
+        select(CustomerIntegrations).where(
+            CustomerIntegrations.integration_service_name == "SAP SIEM",
+        ),
+    )
+    return [row.customer_code for row in result.scalars()]
+
+
+async def run_shared_scan(detectors: List[SapSiemDetector], customer_code: str, start: str, cutoff: str, es_client=None) -> dict:
+    """
+    Scrolls the customer's SAP SIEM events between `start` and `cutoff` once and feeds every batch to each
+    detector, filtered to the events that detector analyzes.
+
+    Args:
+        detectors (List[SapSiemDetector]): The detectors to feed.
+        customer_code (str): The customer code.
+        start (str): The timestamp of the first event to read.
+        cutoff (str): The timestamp of the last event to read.
+        es_client: The indexer client to scroll with. Defaults to the Wazuh-Indexer connector.
+
+    Returns:
+        dict: The number of events scanned, the time spent reading them from the indexer and the position of the last event.
+    """
+    if es_client is None:
+        es_client = await create_wazuh_indexer_client("Wazuh-Indexer")
+    scroll_id = None
+    events_scanned = 0
+    scroll_seconds = 0.0
+    last_position: Optional[EventPosition] = None
+
+    while True:
+        start_time = time.perf_counter()
+        if scroll_id is None:
+            results = es_client.search(
+                index="sap_siem_*",
+                body={
+                    "size": 1000,
+                    "query": build_shared_scan_query(detectors, customer_code, start, cutoff),
+                    "sort": [{"event_timestamp": {"order": "asc"}}],
+                },
+                scroll="1m",
+            )
+        else:
+            results = es_client.scroll(scroll_id=scroll_id, scroll="1m")
+        scroll_seconds += time.perf_counter() - start_time
+
+        if not results["hits"]["hits"]:
+            break
+
+        raw_hits = results["hits"]["hits"]
+        results = SapSiemWazuhIndexerResponse(**results)
+        events_scanned += len(raw_hits)
+        for detector in detectors:
+            hits = [hit for raw_hit, hit in zip(raw_hits, results.hits.hits) if detector.matches(raw_hit["_source"])]
+            if hits:
+                await detector.process_hits(hits)
+        for hit in results.hits.hits:
+            position = (hit.source.event_timestamp, hit.id)
+            if last_position is None or position > last_position:
+                last_position = position
+
+        scroll_id = results.scroll_id
+
+    # Clear the scroll when you're done to free up resources
+    if scroll_id is not None:
+        es_client.clear_scroll(scroll_id=scroll_id)
+
+    return {"events_scanned": events_scanned, "scroll_seconds": scroll_seconds, "last_position": last_position}
+
+
+async def sap_siem_shared_analysis(
+    session: AsyncSession,
+    settings: Optional[Dict[str, SapSiemDetectorSettings]] = None,
+) -> SapSiemSharedAnalysisResponse:
+    """
+    Runs the SAP SIEM detectors over a single scan of each customer's new events instead of one scan per detector,
+    then creates the IRIS cases for each detector in turn.
+
+    Every detector keeps a checkpoint per customer: the timestamp and ID of the last event it analyzed. Each run
+    only reports suspicious logins past the checkpoints and then moves them to the last event scanned, so events
+    no longer need to be flagged as analyzed one document at a time.
+
+    Args:
+        session (AsyncSession): The database session.
+        settings (Optional[Dict[str, SapSiemDetectorSettings]]): Threshold and time range per detector name.
+            Defaults to running every detector with the defaults of its own route.
+
+    Returns:
+        SapSiemSharedAnalysisResponse: The number of events scanned and the results and timings per detector and customer.
+    """
+    now = datetime.utcnow()
+    cutoff = (now - timedelta(seconds=SAP_SIEM_ANALYSIS_SETTLE_SECONDS)).strftime(EVENT_TIMESTAMP_FORMAT)
+    events_scanned = 0
+    scroll_seconds = 0.0
+    results = []
+    await dedup_store.purge_expired(session)
+
+    for customer_code in await get_sap_siem_customer_codes(session):
+        detectors = build_detectors(settings)
+        for detector in detectors:
+            detector.checkpoint = get_checkpoint_position(await get_checkpoint(session, customer_code, detector.name))
+        start = get_scan_start(detectors, now)
+        logger.info(
+            f"Running SAP SIEM shared analysis for customer {customer_code} from {start} to {cutoff} "
+            f"with detectors: {[detector.name for detector in detectors]}",
+        )
+
+        scan = await run_shared_scan(detectors, customer_code, start, cutoff)
+        events_scanned += scan["events_scanned"]
+        scroll_seconds += scan["scroll_seconds"]
+        for detector in detectors:
+            await detector.finish(session)
+            if scan["last_position"] is not None:
+                await save_checkpoint(session, customer_code, detector.name, scan["last_position"])
+
+        for detector in detectors:
+            result = detector.result(customer_code)
+            logger.info(
+                f"SAP SIEM detector {result.detector} for customer {customer_code}: {result.events_processed} events, "
+                f"{result.suspicious_logins} suspicious logins, {result.processing_seconds}s processing, {result.handling_seconds}s handling",
+            )
+            results.append(result)
+
+    return SapSiemSharedAnalysisResponse(
+        success=True,
+        message="SAP SIEM shared analysis completed successfully.",
+        events_scanned=events_scanned,
+        scroll_seconds=round(scroll_seconds, 3),
+        detectors=results,
+    )
+
+
+async def sap_siem_run_detector(
+    detector: str,
+    threshold: Optional[int],
+    time_range: Optional[int],
+    session: AsyncSession,
+) -> SapSiemSharedAnalysisResponse:
+    """
+    Runs a single detector through the shared analysis, for the routes and jobs that invoke one rule at a time.
+    """
+    return await sap_siem_shared_analysis(
+        session=session,
+        settings={detector: SapSiemDetectorSettings(threshold=threshold, time_range=time_range)},
+    )
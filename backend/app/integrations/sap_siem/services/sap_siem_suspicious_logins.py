@@ -9,17 +9,14 @@ from app.connectors.wazuh_indexer.utils.universal import create_wazuh_indexer_cl
 from app.integrations.sap_siem.schema.sap_siem import AddAssetModel
 from app.integrations.sap_siem.schema.sap_siem import CaseResponse
 from app.integrations.sap_siem.schema.sap_siem import ErrCode
-from app.integrations.sap_siem.schema.sap_siem import InvokeSAPSiemResponse
 from app.integrations.sap_siem.schema.sap_siem import IrisCasePayload
 from app.integrations.sap_siem.schema.sap_siem import SapSiemWazuhIndexerResponse
 from app.integrations.sap_siem.schema.sap_siem import SuspiciousLogin
+from app.integrations.sap_siem.services.iris_assets import add_assets_to_case
 from app.integrations.utils.alerts import send_to_shuffle
 from app.integrations.utils.schema import ShufflePayload
 from app.utils import get_customer_alert_settings
 
-# global set to keep track of checked IPs
-checked_ips = set()
-
 
 async def check_for_suspicious_login(hit, last_invalid_login, suspicious_logins, threshold):
     logSource = hit.source.logSource
@@ -61,50 +58,32 @@ async def check_for_suspicious_login(hit, last_invalid_login, suspicious_logins,
         last_invalid_login[ip] = {"count": 0, "event_timestamp": None}
 
 
-async def find_suscpicious_logins(threshold: int) -> List[SuspiciousLogin]:
-    es_client = await create_wazuh_indexer_client("Wazuh-Indexer")
-    scroll_id = None
-    suspicious_logins = []
-    last_invalid_login = {}
-
-    while True:
-        if scroll_id is None:
-            # Initial search
-            results = es_client.search(
-                index="sap_siem_*",
-                body={
-                    "size": 10,
-                    "query": {"bool": {"must": [{"term": {"case_created": "False"}}, {"term": {"event_analyzed": "False"}}]}},
-                    "_source": ["logSource", "params_loginID", "errCode", "httpReq_country", "ip", "event_timestamp", "customer_code"],
-                    "sort": [{"event_timestamp": {"order": "asc"}}],
-                },
-                scroll="1m",  # Keep the search context open for 1 minute
-            )
-        else:
-            # Get the next batch of results
-            results = es_client.scroll(scroll_id=scroll_id, scroll="1m")
+def build_events_query() -> dict:
+    """
+    Builds the query matching the events that are checked for suspicious logins.
 
-        # If there are no more results, break the loop
-        if not results["hits"]["hits"]:
-            logger.info("No more results")
-            break
-        else:
-            logger.info(f"Results: {results}")
+    Returns:
+        dict: The query.
+    """
+    return {"bool": {"must": [{"term": {"case_created": "False"}}]}}
 
-        results = SapSiemWazuhIndexerResponse(**results)
-        for hit in results.hits.hits:
-            logger.info(f"Hit: {hit}")
-            await check_for_suspicious_login(hit, last_invalid_login, suspicious_logins, threshold=threshold)
-            await update_event_analyzed_flag(hit.id, hit.index)
 
-        # Update the scroll ID
-        scroll_id = results.scroll_id
+async def process_hits(hits, last_invalid_login, suspicious_logins, threshold):
+    """
+    Checks each hit for a suspicious login.
 
-    # Clear the scroll when you're done to free up resources
-    if scroll_id is not None:
-        es_client.clear_scroll(scroll_id=scroll_id)
+    Args:
+        hits (list): List of hits received from SAP SIEM.
+        last_invalid_login (dict): Dictionary mapping IP addresses to their count of invalid logins.
+        suspicious_logins (list): The suspicious logins found so far.
+        threshold (int): The number of invalid logins before a successful login that is considered suspicious.
 
-    return suspicious_logins
+    Returns:
+        None
+    """
+    for hit in hits:
+        logger.info(f"Hit: {hit}")
+        await check_for_suspicious_login(hit, last_invalid_login, suspicious_logins, threshold=threshold)
 
 
 async def collect_user_activity(suspicious_logins: SuspiciousLogin) -> SapSiemWazuhIndexerResponse:
@@ -146,26 +125,8 @@ def create_asset_payload(asset: SuspiciousLogin):
     )
 
 
-async def update_case_with_asset(case_id: str, asset_payload):
-    """
-    Update the case with the asset information.
-
-    :param case_id: The ID of the case to update
-    :param asset_payload: The payload to update the case with
-
-    :return: None
-    """
-    logger.info(f"Updating IRIS case {case_id} with asset: {asset_payload}")
-    client, case_client = await initialize_client_and_case("DFIR-IRIS")
-    return await fetch_and_validate_data(
-        client,
-        case_client.add_asset,
-        cid=case_id,
-        **asset_payload.to_dict(),
-    )
-
-
 async def handle_user_activity(user_activity: SapSiemWazuhIndexerResponse, unique_instances, case_id):
+    assets = []
     for hit in user_activity.hits.hits:
         current_activity = {
             "loginID": hit.source.params_loginID,
@@ -178,16 +139,9 @@ async def handle_user_activity(user_activity: SapSiemWazuhIndexerResponse, uniqu
         }
         current_activity_frozenset = frozenset(current_activity.items())
         if current_activity_frozenset not in unique_instances:
-            logger.info(f"Adding user activity to IRIS case: {current_activity}")
-            current_asset = SuspiciousLogin(**current_activity)
-            asset_payload = create_asset_payload(asset=current_asset)
-            logger.info(f"Asset Payload: {asset_payload}")
-            await update_case_with_asset(case_id, asset_payload)
+            assets.append(create_asset_payload(asset=SuspiciousLogin(**current_activity)))
             unique_instances.add(current_activity_frozenset)
-
-
-async def mark_as_checked(suspicious_login):
-    checked_ips.add((suspicious_login.loginID, suspicious_login.ip))
+    await add_assets_to_case(case_id, assets)
 
 
 async def handle_common_suspicious_login_tasks(
@@ -204,7 +158,6 @@ async def handle_common_suspicious_login_tasks(
     user_activity = await collect_user_activity(suspicious_login)
     logger.info(f"User Activity: {user_activity}")
     await handle_user_activity(user_activity, unique_instances, case.data.case_id)
-    await mark_as_checked(suspicious_login)
     alert_source_link = (await get_customer_alert_settings(suspicious_login.customer_code, session=session)).shuffle_endpoint
     await send_to_shuffle(
         ShufflePayload(
@@ -285,62 +238,6 @@ async def update_case_created_flag(id: str, index: str):
             return False
 
 
-async def update_event_analyzed_flag(id: str, index: str):
-    """
-    Update the event_analyzed flag in the Elasticsearch document to True.
-
-    :param suspicious_login: The suspicious login to update
-
-    :return: None
-    """
-    es_client = await create_wazuh_indexer_client("Wazuh-Indexer")
-    try:
-        es_client.update(
-            index=index,
-            id=id,
-            body={
-                "doc": {
-                    "event_analyzed": "True",
-                },
-            },
-        )
-        logger.info(f"Updated event_analyzed flag for suspicious login: {id}")
-    except Exception as e:
-        logger.error(
-            f"Failed to update event analyzed flag {e}",
-        )
-        # Attempt to remove read-only block
-        try:
-            es_client.indices.put_settings(
-                index=index,
-                body={"index.blocks.write": None},
-            )
-            logger.info(
-                f"Removed read-only block from index {index}. Retrying update.",
-            )
-
-            # Retry the update operation
-            es_client.update(
-                index=index,
-                id=id,
-                body={"doc": {"event_analyzed": "True"}},
-            )
-            logger.info(
-                f"Added event_analyzed flag to index {index} for suspicious login: {id}",
-            )
-
-            # Reenable the write block
-            es_client.indices.put_settings(
-                index=index,
-                body={"index.blocks.write": True},
-            )
-        except Exception as e2:
-            logger.error(
-                f"Failed to remove read-only block from index {index}: {e2}",
-            )
-            return False
-
-
 async def create_iris_case(suspicious_login: SuspiciousLogin, session: AsyncSession) -> CaseResponse:
     """
     Create a case in IRIS for the suspicious activity.
@@ -383,32 +280,18 @@ async def create_iris_case(suspicious_login: SuspiciousLogin, session: AsyncSess
     return CaseResponse(**result)
 
 
-async def sap_siem_suspicious_logins(threshold: int, session: AsyncSession) -> InvokeSAPSiemResponse:
+async def handle_suspicious_logins(suspicious_logins: List[SuspiciousLogin], session: AsyncSession) -> None:
     """
-    Collects SAP SIEM events.
+    Creates an IRIS case for each suspicious login.
 
     Args:
-        sap_siem_request (CollectSapSiemRequest): The request payload containing the necessary information for the SAP SIEM integration.
+        suspicious_logins (List[SuspiciousLogin]): The suspicious logins found.
+        session (AsyncSession): The database session.
 
     Returns:
-        InvokeSAPSiemResponse: The response model containing the result of the SAP SIEM integration invocation.
-
-    Raises:
-        HTTPException: If the SAP SIEM integration fails.
+        None
     """
-    logger.info("Checking for suspicious logins")
-
-    suspicious_logins = await find_suscpicious_logins(threshold=threshold)
-    logger.info(f"Suspicious Logins: {suspicious_logins}")
-
     unique_instaces = set()
     case_ids = []
     for suspicious_login in suspicious_logins:
         await handle_suspicious_login(suspicious_login, unique_instaces, case_ids, session=session)
-
-    # Clear the global set
-    checked_ips.clear()
-    return InvokeSAPSiemResponse(
-        success=True,
-        message="SAP SIEM Events collected successfully",
-    )
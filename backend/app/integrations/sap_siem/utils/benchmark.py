@@ -0,0 +1,378 @@
+"""
+Benchmark and offline replay harness for the SAP SIEM detectors.
+
+`micro` feeds synthetic login events, in timestamp order and in batches of 1000 like the indexer scroll, to the
+`process_hits` of every detector and reports the time each detector needs per event count.
+
+`generate` writes a synthetic dataset as NDJSON, one indexed event per line.
+
+`replay` loads recorded or synthetic events from an NDJSON file and runs every detector over them through the
+shared scan, against an in-memory stand-in for the indexer. It reports the detections, the runtime of each
+detector and the peak memory allocated during the replay. No SAP tenant, indexer, database or IRIS is needed: suspicious logins are only
+counted, never handled. Each line may hold an indexed event, a hit with the event in `_source`, or a raw
+record of the SAP `audit.search` API.
+
+Usage (from the backend directory):
+
+    python -m app.integrations.sap_siem.utils.benchmark micro --sizes 10000 100000 1000000
+    python -m app.integrations.sap_siem.utils.benchmark generate --count 100000 --output events.ndjson
+    python -m app.integrations.sap_siem.utils.benchmark replay --input events.ndjson
+
+`replay_events` and `generate_events` can be called from a test to check detections and timings of a dataset.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from collections import deque
+from datetime import datetime
+from datetime import timedelta
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+from loguru import logger
+
+from app.integrations.sap_siem.schema.sap_siem import SapSiemDetectorSettings
+from app.integrations.sap_siem.schema.sap_siem import SapSiemHit
+
+BATCH_SIZE = 1000
+COUNTRIES = ["US", "CA", "GB", "DE", "FR", "NL", "BR", "IN", "CN", "RU"]
+FAILED_ERR_CODES = ["403042", "403051", "403120"]
+EVENT_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+
+# Every TAKEOVER_EVERY events an account takeover is generated, every STUFFING_EVERY events a credential stuffing run
+TAKEOVER_EVERY = 250
+STUFFING_EVERY = 1000
+
+
+def takeover_events(run: int) -> List[tuple]:
+    """
+    The (ip, loginID, failed, country) of an account takeover: an attacker IP fails to log in to ten accounts,
+    the victim fails to log in from three IPs in three countries, then the attacker logs in as the victim.
+    """
+    attacker_ip = f"198.51.100.{run % 250}"
+    victim = f"victim{run}@example.com"
+    events = [(attacker_ip, f"sprayed{run}_{attempt}@example.com", True, "US") for attempt in range(10)]
+    events += [(f"203.0.113.{(3 * run + attempt) % 250}", victim, True, COUNTRIES[attempt]) for attempt in range(3)]
+    events.append((attacker_ip, victim, False, COUNTRIES[5]))
+    return events
+
+
+def stuffing_events(run: int) -> List[tuple]:
+    """
+    The (ip, loginID, failed, country) of a credential stuffing run: one account fails to log in from 26 IPs.
+    """
+    return [
+        (f"198.18.{run % 250}.{attempt}", f"stuffed{run}@example.com", True, COUNTRIES[attempt % len(COUNTRIES)]) for attempt in range(26)
+    ]
+
+
+def generate_events(count: int, seed: int = 42, users: int = 20000, ips: int = 5000, customer_code: str = "benchmark") -> Iterator[dict]:
+    """
+    Generates `count` synthetic login events as indexed documents, one event every 50 milliseconds.
+
+    Regular users log in from one of two addresses and fail one login in ten. One in twenty events belongs
+    to a brute force run, where a small pool of IPs tries random loginIDs. Account takeovers and credential
+    stuffing runs are mixed in at fixed intervals, so every detector finds suspicious logins. The same seed
+    always generates the same events.
+    """
+    rng = random.Random(seed)
+    timestamp = datetime(2024, 1, 1)
+    scenario = deque()
+    for number in range(count):
+        timestamp += timedelta(milliseconds=50)
+        if number % TAKEOVER_EVERY == TAKEOVER_EVERY // 2:
+            scenario.extend(takeover_events(number // TAKEOVER_EVERY))
+        if number % STUFFING_EVERY == STUFFING_EVERY // 10:
+            scenario.extend(stuffing_events(number // STUFFING_EVERY))
+        if scenario:
+            ip, login_id, failed, country = scenario.popleft()
+        elif number % 20 == 0:
+            ip = f"192.0.2.{rng.randrange(8)}"
+            login_id = f"user{rng.randrange(users)}@example.com"
+            failed = True
+            country = rng.choice(COUNTRIES)
+        else:
+            user = rng.randrange(users)
+            # Most users log in from one of two addresses
+            ip = f"10.{user % ips // 256}.{user % ips % 256}.{rng.randrange(2)}"
+            login_id = f"user{user}@example.com"
+            failed = rng.random() < 0.1
+            country = rng.choice(COUNTRIES)
+        yield {
+            "_id": str(number),
+            "_source": {
+                "logSource": "benchmark",
+                "params_loginID": login_id,
+                "errCode": rng.choice(FAILED_ERR_CODES) if failed else "0",
+                "ip": ip,
+                "httpReq_country": country,
+                "event_timestamp": timestamp.strftime(EVENT_TIMESTAMP_FORMAT),
+                "errMessage": "Invalid LoginID" if failed else "OK",
+                "customer_code": customer_code,
+                "errDetails": None,
+                "case_created": "False",
+            },
+        }
+
+
+def generate_hits(count: int, seed: int = 42, users: int = 20000, ips: int = 5000) -> Iterator[List[SapSiemHit]]:
+    """
+    Generates `count` synthetic login events in batches of `BATCH_SIZE`.
+    """
+    batch = []
+    for event in generate_events(count, seed, users, ips):
+        batch.append(SapSiemHit(_index="sap_siem_benchmark", **event))
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def flatten_audit_record(record: dict, customer_code: str) -> dict:
+    """
+    Flattens a record of the SAP `audit.search` API into the fields the collection indexes.
+    """
+    return {
+        "logSource": record.get("logSource"),
+        "params_loginID": record.get("params", {}).get("loginID"),
+        "errCode": str(record.get("errCode")),
+        "ip": record.get("ip"),
+        "httpReq_country": record.get("httpReq", {}).get("country"),
+        "event_timestamp": record.get("@timestamp"),
+        "errMessage": record.get("errMessage"),
+        "customer_code": record.get("customer_code", customer_code),
+        "errDetails": record.get("errDetails"),
+        "case_created": "False",
+    }
+
+
+def load_events(lines: Iterable[str], customer_code: str = "replay") -> Iterator[dict]:
+    """
+    Parses NDJSON lines into hits. A line may hold a hit with `_source`, an indexed event or a raw SAP audit record.
+    """
+    for number, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if "_source" in record:
+            yield {"_id": str(record.get("_id", number)), "_source": record["_source"]}
+        elif "@timestamp" in record:
+            yield {"_id": str(record.get("callID", number)), "_source": flatten_audit_record(record, customer_code)}
+        else:
+            record.setdefault("customer_code", customer_code)
+            record.setdefault("case_created", "False")
+            yield {"_id": str(number), "_source": record}
+
+
+class InMemoryIndexer:
+    """
+    Stands in for the indexer client of the shared scan. Evaluates the `term`, `range` and `should` clauses
+    the shared scan queries with and scrolls through the matching events in timestamp order.
+    """
+
+    def __init__(self, events: Iterable[dict], page_size: int = BATCH_SIZE):
+        self.events = sorted(events, key=lambda event: (event["_source"]["event_timestamp"], event["_id"]))
+        self.page_size = page_size
+        self.scrolls = {}
+
+    @staticmethod
+    def _matches_clause(source: dict, clause: dict) -> bool:
+        if "term" in clause:
+            return all(str(source.get(field)) == str(value) for field, value in clause["term"].items())
+        if "range" in clause:
+            for field, bounds in clause["range"].items():
+                value = source.get(field)
+                if value is None:
+                    return False
+                if "gte" in bounds and value < bounds["gte"]:
+                    return False
+                if "lte" in bounds and value > bounds["lte"]:
+                    return False
+            return True
+        if "bool" in clause:
+            return InMemoryIndexer._matches_query(source, clause)
+        raise ValueError(f"Unsupported query clause: {clause}")
+
+    @staticmethod
+    def _matches_query(source: dict, query: dict) -> bool:
+        query = query["bool"]
+        if not all(InMemoryIndexer._matches_clause(source, clause) for clause in query.get("must", [])):
+            return False
+        should = query.get("should", [])
+        minimum_should_match = query.get("minimum_should_match", 0)
+        return sum(InMemoryIndexer._matches_clause(source, clause) for clause in should) >= minimum_should_match
+
+    def _page(self, scroll_id: str) -> dict:
+        events = self.scrolls[scroll_id]
+        page = []
+        for event in events:
+            page.append({"_index": "sap_siem_replay", **event})
+            if len(page) == self.page_size:
+                break
+        return {
+            "_scroll_id": scroll_id,
+            "took": 0,
+            "timed_out": False,
+            "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+            "hits": {"total": {"value": len(page), "relation": "eq"}, "hits": page},
+        }
+
+    def search(self, index: str, body: dict, scroll: Optional[str] = None, **kwargs) -> dict:
+        scroll_id = str(len(self.scrolls))
+        self.scrolls[scroll_id] = (event for event in self.events if self._matches_query(event["_source"], body["query"]))
+        return self._page(scroll_id)
+
+    def scroll(self, scroll_id: str, scroll: Optional[str] = None, **kwargs) -> dict:
+        return self._page(scroll_id)
+
+    def clear_scroll(self, scroll_id: str, **kwargs) -> None:
+        self.scrolls.pop(scroll_id, None)
+
+
+async def replay_events(events: Iterable[dict], settings: Optional[Dict[str, SapSiemDetectorSettings]] = None) -> dict:
+    """
+    Runs the detectors over the events through the shared scan, one scan per customer, and counts the
+    suspicious logins each detector finds.
+
+    Args:
+        events (Iterable[dict]): The hits to replay, as yielded by `load_events` or `generate_events`.
+        settings (Optional[Dict[str, SapSiemDetectorSettings]]): Threshold and time range per detector name.
+            Defaults to every detector with its default settings.
+
+    Returns:
+        dict: The events scanned, the total runtime, the peak memory allocated during the replay in bytes, and
+            the events processed, detections and processing time per detector.
+    """
+    # Imported here so the benchmark module does not pull the detectors in on import
+    from app.integrations.sap_siem.services.sap_siem_shared_scan import build_detectors
+    from app.integrations.sap_siem.services.sap_siem_shared_scan import run_shared_scan
+
+    # Measure the peak of this replay only. The peak resident size of the process never goes down, so it would
+    # hide a regression at a smaller size behind an earlier, larger replay.
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    start_time = time.perf_counter()
+
+    indexer = InMemoryIndexer(events)
+    events_by_customer = defaultdict(list)
+    for event in indexer.events:
+        events_by_customer[event["_source"]["customer_code"]].append(event["_source"]["event_timestamp"])
+
+    events_scanned = 0
+    detectors_report = defaultdict(lambda: {"events_processed": 0, "detections": 0, "seconds": 0.0})
+    for customer_code, timestamps in events_by_customer.items():
+        detectors = build_detectors(settings)
+        scan = await run_shared_scan(detectors, customer_code, timestamps[0], timestamps[-1], es_client=indexer)
+        events_scanned += scan["events_scanned"]
+        for detector in detectors:
+            start = time.perf_counter()
+            detections = len(detector.collect_suspicious_logins())
+            detector.processing_seconds += time.perf_counter() - start
+            report = detectors_report[detector.name]
+            report["events_processed"] += detector.events_processed
+            report["detections"] += detections
+            report["seconds"] += detector.processing_seconds
+
+    seconds = time.perf_counter() - start_time
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    if started_tracing:
+        tracemalloc.stop()
+    return {
+        "events_scanned": events_scanned,
+        "seconds": seconds,
+        "peak_memory": peak_memory,
+        "detectors": dict(detectors_report),
+    }
+
+
+async def benchmark_detector(detector, count: int) -> dict:
+    """
+    Runs one detector over `count` synthetic events and returns the processing time and detections.
+    """
+    for hits in generate_hits(count):
+        await detector.process_hits(hits)
+    start = time.perf_counter()
+    detections = len(detector.collect_suspicious_logins())
+    detector.processing_seconds += time.perf_counter() - start
+    return {"seconds": detector.processing_seconds, "detections": detections}
+
+
+async def run_benchmark(sizes: List[int]) -> None:
+    # Imported here so the benchmark module does not pull the detectors in on import
+    from app.integrations.sap_siem.services.sap_siem_shared_scan import DETECTORS
+    from app.integrations.sap_siem.services.sap_siem_shared_scan import build_detectors
+
+    print(f"{'detector':<56}{'events':>10}{'seconds':>10}{'us/event':>10}{'detections':>12}")
+    for name, (_, settings) in DETECTORS.items():
+        for size in sizes:
+            result = await benchmark_detector(build_detectors({name: settings})[0], size)
+            print(
+                f"{name:<56}{size:>10}{result['seconds']:>10.2f}{result['seconds'] / size * 1_000_000:>10.1f}{result['detections']:>12}",
+            )
+
+
+def write_events(path: str, count: int, seed: int) -> None:
+    with open(path, "w") as file:
+        for event in generate_events(count, seed):
+            file.write(json.dumps(event) + "\n")
+    print(f"Wrote {count} events to {path}")
+
+
+async def run_replay(path: str) -> None:
+    with open(path) as file:
+        result = await replay_events(load_events(file))
+
+    print(f"{'detector':<56}{'events':>10}{'seconds':>10}{'us/event':>10}{'detections':>12}")
+    for name, report in result["detectors"].items():
+        per_event = report["seconds"] / report["events_processed"] * 1_000_000 if report["events_processed"] else 0.0
+        print(f"{name:<56}{report['events_processed']:>10}{report['seconds']:>10.2f}{per_event:>10.1f}{report['detections']:>12}")
+    print(
+        f"Replayed {result['events_scanned']} events in {result['seconds']:.2f}s, "
+        f"peak memory {result['peak_memory'] / 1024 / 1024:.1f} MiB",
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark and replay the SAP SIEM detectors offline.")
+    subparsers = parser.add_subparsers(dest="command")
+    micro = subparsers.add_parser("micro", help="Time the process_hits of each detector on synthetic events.")
+    micro.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="Event counts to benchmark.")
+    generate = subparsers.add_parser("generate", help="Write a synthetic dataset as NDJSON.")
+    generate.add_argument("--count", type=int, default=100000, help="Number of events to generate.")
+    generate.add_argument("--seed", type=int, default=42, help="Seed of the generator.")
+    generate.add_argument("--output", required=True, help="The NDJSON file to write.")
+    replay = subparsers.add_parser("replay", help="Run every detector over the events of an NDJSON file.")
+    replay.add_argument("--input", required=True, help="The NDJSON file to replay.")
+    args = parser.parse_args()
+
+    # The detectors import the database session, which reads its credentials on import. Nothing connects to
+    # the database offline, so placeholders are enough.
+    os.environ.setdefault("MYSQL_PASSWORD", "benchmark")
+    os.environ.setdefault("MYSQL_ROOT_PASSWORD", "benchmark")
+    # The detectors log every suspicious login, which would dominate the measurement
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    if args.command == "generate":
+        write_events(args.output, args.count, args.seed)
+    elif args.command == "replay":
+        asyncio.run(run_replay(args.input))
+    else:
+        asyncio.run(run_benchmark(getattr(args, "sizes", [10000, 100000, 1000000])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+from collections import Counter
+from collections import deque
+from datetime import datetime
+from datetime import timedelta
+from typing import Optional
+
+
+class SlidingWindow:
+    """
+    The logins seen for one IP or loginID within the last `time_range` minutes.
+
+    Events must be added in timestamp order. Every event is appended once and evicted once, and the
+    counts the detectors need are updated as entries enter and leave the window, so checking the
+    window after each event does not rescan it.
+
+    An entry is a distinct (key, errCode, country) combination, where the key is the IP or the loginID
+    the detector counts. The same entry seen several times within the window only counts once.
+    """
+
+    def __init__(self, time_range: int):
+        self.time_range = timedelta(minutes=time_range)
+        self.events = deque()
+        self.entries = Counter()
+        self.keys = Counter()
+        self.failed_countries = Counter()
+        self.failed = 0
+        self.successful = 0
+
+    def add(self, event_timestamp: datetime, key: str, errCode: str, country: Optional[str] = None) -> None:
+        """
+        Adds an event to the window and evicts the events that are older than `time_range`.
+        """
+        self.evict(event_timestamp)
+        entry = (key, errCode, country)
+        self.events.append((event_timestamp, entry))
+        self.entries[entry] += 1
+        if self.entries[entry] == 1:
+            self._enter(entry)
+
+    def evict(self, event_timestamp: datetime) -> None:
+        cutoff = event_timestamp - self.time_range
+        while self.events and self.events[0][0] < cutoff:
+            _, entry = self.events.popleft()
+            self.entries[entry] -= 1
+            if self.entries[entry] == 0:
+                del self.entries[entry]
+                self._leave(entry)
+
+    def _enter(self, entry: tuple) -> None:
+        key, errCode, country = entry
+        self.keys[key] += 1
+        if errCode != "0":
+            self.failed += 1
+            self.failed_countries[country] += 1
+        else:
+            self.successful += 1
+
+    def _leave(self, entry: tuple) -> None:
+        key, errCode, country = entry
+        self.keys[key] -= 1
+        if self.keys[key] == 0:
+            del self.keys[key]
+        if errCode != "0":
+            self.failed -= 1
+            self.failed_countries[country] -= 1
+            if self.failed_countries[country] == 0:
+                del self.failed_countries[country]
+        else:
+            self.successful -= 1
+
+    @property
+    def failed_country_count(self) -> int:
+        return len(self.failed_countries)
+
+    @property
+    def key_count(self) -> int:
+        return len(self.keys)
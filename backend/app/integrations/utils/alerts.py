@@ -5,13 +5,13 @@ from typing import Dict
 from typing import Optional
 from typing import Union
 
-import httpx
 import regex
-from fastapi import HTTPException
 from loguru import logger
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.integrations.utils.schema import ShufflePayload
+from app.integrations.utils.shuffle_dispatch import ShuffleDelivery
+from app.integrations.utils.shuffle_dispatch import shuffle_dispatcher
 from app.utils import get_customer_alert_settings
 
 
@@ -328,29 +328,21 @@ async def validate_ioc_type(ioc_value: str) -> str:
 
 async def send_to_shuffle(payload: ShufflePayload, session: AsyncSession) -> bool:
     """
-    Sends payload to Shuffle listening Webhook asynchronously using httpx.
+    Queues the payload for the customer's Shuffle webhook and returns without waiting for the delivery,
+    which is retried in the background if it fails.
+
+    Returns:
+        bool: Whether the payload was queued.
     """
-    logger.info(f"Sending {payload} to Shuffle Webhook.")
-    try:
-        async with httpx.AsyncClient(verify=False) as client:
-            response = await client.post(
-                (
-                    await get_customer_alert_settings(
-                        customer_code=payload.customer_code,
-                        session=session,
-                    )
-                ).shuffle_endpoint,
-                json=payload.to_dict(),
-            )
-
-        return response.status_code == 200
-
-    except Exception as e:
-        logger.error(f"Error: {e}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error: {e}",
-        )
+    alert_settings = await get_customer_alert_settings(
+        customer_code=payload.customer_code,
+        session=session,
+    )
+    if alert_settings is None or not alert_settings.shuffle_endpoint:
+        logger.error(f"No Shuffle endpoint set for customer {payload.customer_code}, not sending alert {payload.alert_id}")
+        return False
+    logger.info(f"Queueing {payload} for the Shuffle Webhook.")
+    return shuffle_dispatcher.enqueue(ShuffleDelivery(payload, alert_settings.shuffle_endpoint))
 
 
 # def send_to_wazuh(msg) -> None:
@@ -1,20 +1,41 @@
 import asyncio
+import os
+import time
 from typing import Any
 from typing import Dict
+from typing import List
+from typing import Optional
 
 from fastapi import HTTPException
 from loguru import logger
 
+from app.connectors.event_shipper.utils.spool import get_event_spool
 from app.connectors.event_shipper.utils.universal import create_gelf_logger
 from app.connectors.utils import get_connector_info_from_db
 from app.db.db_session import get_db_session
 from app.integrations.utils.schema import EventShipperPayload
 from app.integrations.utils.schema import EventShipperPayloadResponse
+from app.integrations.utils.schema import EventShipperSettings
 
+# How long to keep spooling without contacting Graylog after a failed delivery
+EVENT_SHIPPER_RETRY_INTERVAL = int(os.getenv("EVENT_SHIPPER_RETRY_INTERVAL", 30))
 
-async def get_gelf_logger():
+# Errors that mean the GELF input could not be reached, as opposed to a message that could not be sent
+GELF_CONNECTION_ERRORS = (OSError, asyncio.TimeoutError)
+
+# Monotonic time before which the GELF input is considered unavailable
+gelf_input_unavailable_until = 0.0
+# Background task replaying the spool, so callers are not held up by the backlog
+replay_task = None
+
+
+async def get_gelf_logger(settings: Optional[EventShipperSettings] = None):
+    settings = settings or EventShipperSettings()
     try:
-        gelf_logger = await create_gelf_logger()
+        gelf_logger = await create_gelf_logger(
+            transport=settings.transport.value,
+            compression=settings.compression.value if settings.compression else None,
+        )
         return gelf_logger
     except Exception as e:
         logger.error(f"Failed to initialize GelfLogger: {e}")
@@ -24,15 +45,102 @@ async def get_gelf_logger():
         )
 
 
-async def event_shipper(message: EventShipperPayload) -> EventShipperPayloadResponse:
+async def replay_spooled_events() -> int:
     """
-    Test the log shipper.
+    Replays events spooled while the Graylog GELF input was unavailable.
+
+    Spooled events are always replayed over GELF TCP, regardless of the transport they were shipped with.
+
+    Returns:
+        int: The number of events replayed.
     """
+    global gelf_input_unavailable_until
+    spool = get_event_spool()
+    if spool.is_empty():
+        return 0
     gelf_logger = await get_gelf_logger()
 
+    async def send(message: dict) -> None:
+        try:
+            await gelf_logger.tcp_handler(message=message)
+        except GELF_CONNECTION_ERRORS:
+            raise
+        except Exception as e:
+            # Only an unreachable input stops the replay, an event that cannot be sent is dropped
+            logger.error(f"Dropping spooled event that could not be sent to log shipper: {e}")
+
+    try:
+        return await spool.replay(send)
+    except Exception:
+        gelf_input_unavailable_until = time.monotonic() + EVENT_SHIPPER_RETRY_INTERVAL
+        return 0
+
+
+async def spool_event(message: EventShipperPayload) -> EventShipperPayloadResponse:
+    """
+    Writes the message to the on-disk spool so it is replayed once the GELF input recovers.
+    """
+    await get_event_spool().append(message.to_dict())
+    return EventShipperPayloadResponse(
+        success=True,
+        message="Graylog input unavailable, event spooled for replay.",
+    )
+
+
+async def spool_events(messages: List[EventShipperPayload]) -> EventShipperPayloadResponse:
+    """
+    Writes the messages to the on-disk spool in one go so they are replayed once the GELF input recovers.
+    """
+    await get_event_spool().extend([message.to_dict() for message in messages])
+    return EventShipperPayloadResponse(
+        success=True,
+        message=f"Graylog input unavailable, {len(messages)} events spooled for replay.",
+    )
+
+
+async def event_shipper(
+    message: EventShipperPayload,
+    spool_on_failure: bool = True,
+    settings: Optional[EventShipperSettings] = None,
+) -> EventShipperPayloadResponse:
+    """
+    Sends the message to the Graylog GELF input.
+
+    While the input is unavailable, or older events are still waiting in the spool, the message is
+    spooled to disk instead so that collections are not interrupted and event order is kept.
+
+    Args:
+        message (EventShipperPayload): The message to send.
+        spool_on_failure (bool): Spool the message instead of raising when delivery fails. Defaults to True.
+        settings (Optional[EventShipperSettings]): The GELF transport and compression to use. Defaults to uncompressed TCP.
+    """
+    global gelf_input_unavailable_until, replay_task
+    if spool_on_failure:
+        if time.monotonic() < gelf_input_unavailable_until:
+            return await spool_event(message)
+        if not get_event_spool().is_empty():
+            # Queue behind the pending events and let a single background task drain them in order
+            response = await spool_event(message)
+            if replay_task is None or replay_task.done():
+                replay_task = asyncio.create_task(replay_spooled_events())
+            return response
+
+    gelf_logger = await get_gelf_logger(settings)
+
     try:
-        await gelf_logger.tcp_handler(message=message)
+        await gelf_logger.send(message=message)
     except Exception as e:
+        if spool_on_failure and isinstance(e, GELF_CONNECTION_ERRORS):
+            logger.warning(f"Failed to send message to log shipper, spooling events for {EVENT_SHIPPER_RETRY_INTERVAL}s: {e}")
+            gelf_input_unavailable_until = time.monotonic() + EVENT_SHIPPER_RETRY_INTERVAL
+            return await spool_event(message)
+        if spool_on_failure:
+            # The input is fine, this message cannot be sent. Spooling it would only fail again on replay.
+            logger.error(f"Dropping message that could not be sent to log shipper: {e}")
+            return EventShipperPayloadResponse(
+                success=False,
+                message=f"Failed to send message to log shipper, message dropped: {e}",
+            )
         logger.error(f"Failed to send test message to log shipper: {e}")
         raise HTTPException(
             status_code=500,
@@ -45,6 +153,55 @@ async def event_shipper(message: EventShipperPayload) -> EventShipperPayloadResp
     )
 
 
+async def event_shipper_batch(
+    messages: List[EventShipperPayload],
+    settings: Optional[EventShipperSettings] = None,
+) -> EventShipperPayloadResponse:
+    """
+    Sends a batch of messages to the Graylog GELF input over a single connection, instead of looking the
+    Event Shipper connector up and connecting again for every message.
+
+    Like `event_shipper`, the messages are spooled to disk while the input is unavailable or older events
+    are still waiting in the spool, the whole batch in a single write. When the input cannot be reached,
+    the batch is spooled. A message that cannot be sent for another reason is dropped and the rest of the
+    batch is still sent.
+
+    Args:
+        messages (List[EventShipperPayload]): The messages to send, in order.
+        settings (Optional[EventShipperSettings]): The GELF transport and compression to use. Defaults to uncompressed TCP.
+    """
+    global gelf_input_unavailable_until, replay_task
+    if not messages:
+        return EventShipperPayloadResponse(success=True, message="No events to send to log shipper.")
+    if time.monotonic() < gelf_input_unavailable_until:
+        return await spool_events(messages)
+    if not get_event_spool().is_empty():
+        # Queue behind the pending events and let a single background task drain them in order
+        response = await spool_events(messages)
+        if replay_task is None or replay_task.done():
+            replay_task = asyncio.create_task(replay_spooled_events())
+        return response
+
+    gelf_logger = await get_gelf_logger(settings)
+    try:
+        sent = await gelf_logger.send_batch(messages)
+    except GELF_CONNECTION_ERRORS as e:
+        logger.warning(f"Failed to send messages to log shipper, spooling events for {EVENT_SHIPPER_RETRY_INTERVAL}s: {e}")
+        gelf_input_unavailable_until = time.monotonic() + EVENT_SHIPPER_RETRY_INTERVAL
+        return await spool_events(messages)
+
+    dropped = len(messages) - sent
+    if dropped:
+        return EventShipperPayloadResponse(
+            success=False,
+            message=f"Sent {sent} events to log shipper, {dropped} events could not be sent and were dropped.",
+        )
+    return EventShipperPayloadResponse(
+        success=True,
+        message=f"Successfully sent {len(messages)} events to log shipper.",
+    )
+
+
 async def verify_event_shipper_healtcheck(attributes: Dict[str, Any]) -> Dict[str, Any]:
     """
     Verifies the connection to Graylog Input via a telnet connection.
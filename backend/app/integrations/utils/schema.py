@@ -1,3 +1,4 @@
+from enum import Enum
 from typing import List
 from typing import Optional
 
@@ -201,6 +202,29 @@ class ShufflePayload(BaseModel):
 
 
 ######### ! SEND TO EVENT SHIPPER ! #########
+class GelfTransport(str, Enum):
+    TCP = "tcp"
+    UDP = "udp"
+
+
+class GelfCompression(str, Enum):
+    ZLIB = "zlib"
+    GZIP = "gzip"
+
+
+class EventShipperSettings(BaseModel):
+    transport: GelfTransport = Field(
+        GelfTransport.TCP,
+        description="The GELF transport used to reach the Graylog input.",
+        examples=["udp"],
+    )
+    compression: Optional[GelfCompression] = Field(
+        None,
+        description="Compression applied to GELF UDP messages.",
+        examples=["zlib"],
+    )
+
+
 class EventShipperPayload(BaseModel):
     integration: str = Field(
         ...,
@@ -0,0 +1,178 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Deque
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import httpx
+from loguru import logger
+
+from app.integrations.utils.schema import ShufflePayload
+
+# Number of notifications waiting to be sent before new ones are dropped
+SHUFFLE_DISPATCH_QUEUE_SIZE = int(os.getenv("SHUFFLE_DISPATCH_QUEUE_SIZE", 1000))
+# Number of notifications sent to Shuffle at the same time
+SHUFFLE_DISPATCH_WORKERS = int(os.getenv("SHUFFLE_DISPATCH_WORKERS", 2))
+# How often a notification is sent before it is given up on
+SHUFFLE_DISPATCH_MAX_ATTEMPTS = int(os.getenv("SHUFFLE_DISPATCH_MAX_ATTEMPTS", 5))
+# Seconds before the first retry, doubling for every retry up to the maximum
+SHUFFLE_DISPATCH_RETRY_DELAY = int(os.getenv("SHUFFLE_DISPATCH_RETRY_DELAY", 5))
+SHUFFLE_DISPATCH_MAX_RETRY_DELAY = int(os.getenv("SHUFFLE_DISPATCH_MAX_RETRY_DELAY", 300))
+# Timeout in seconds of a single delivery attempt
+SHUFFLE_DISPATCH_TIMEOUT = int(os.getenv("SHUFFLE_DISPATCH_TIMEOUT", 10))
+
+
+class ShuffleDelivery:
+    """
+    A notification on its way to a Shuffle webhook, with the attempts made to deliver it.
+    """
+
+    def __init__(self, payload: ShufflePayload, endpoint: str):
+        self.payload = payload
+        self.endpoint = endpoint
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+        self.queued_at = time.time()
+
+    def describe(self) -> Dict:
+        return {
+            "alert_id": self.payload.alert_id,
+            "customer_code": self.payload.customer_code,
+            "endpoint": self.endpoint,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "queued_at": self.queued_at,
+        }
+
+
+class ShuffleDispatcher:
+    """
+    Sends alert notifications to Shuffle in the background, so creating an alert does not wait for the webhook.
+
+    Notifications go on a bounded queue that a few workers drain over a shared client. A failed delivery is
+    retried with an exponential backoff until `SHUFFLE_DISPATCH_MAX_ATTEMPTS` attempts were made. The workers
+    start with the first notification. Notifications still waiting at shutdown get one final attempt.
+    """
+
+    def __init__(self):
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        # Retries backing off before the notification is queued again
+        self.retries: Dict[asyncio.Task, ShuffleDelivery] = {}
+        self.client: Optional[httpx.AsyncClient] = None
+        self.stats = {"queued": 0, "delivered": 0, "retried": 0, "failed": 0, "dropped": 0, "final_attempts": 0}
+        # The last notifications given up on, kept for troubleshooting
+        self.failed: Deque[Dict] = deque(maxlen=100)
+
+    def start(self) -> None:
+        if self.workers:
+            return
+        self.queue = asyncio.Queue(maxsize=SHUFFLE_DISPATCH_QUEUE_SIZE)
+        self.client = httpx.AsyncClient(verify=False, timeout=SHUFFLE_DISPATCH_TIMEOUT)
+        self.workers = [asyncio.create_task(self.work()) for _ in range(SHUFFLE_DISPATCH_WORKERS)]
+
+    def enqueue(self, delivery: ShuffleDelivery) -> bool:
+        """
+        Queues the notification without waiting.
+
+        Returns:
+            bool: False if the queue is full and the notification was dropped.
+        """
+        self.start()
+        try:
+            self.queue.put_nowait(delivery)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            logger.error(f"Shuffle dispatch queue is full, dropping notification for alert {delivery.payload.alert_id}")
+            return False
+        self.stats["queued"] += 1
+        return True
+
+    async def work(self) -> None:
+        while True:
+            delivery = await self.queue.get()
+            try:
+                await self.deliver(delivery)
+            except Exception as e:
+                logger.error(f"Unexpected error while sending notification for alert {delivery.payload.alert_id} to Shuffle: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def deliver(self, delivery: ShuffleDelivery, final: bool = False) -> None:
+        delivery.attempts += 1
+        try:
+            response = await self.client.post(delivery.endpoint, json=delivery.payload.to_dict())
+            if response.status_code == 200:
+                self.stats["delivered"] += 1
+                logger.info(f"Sent notification for alert {delivery.payload.alert_id} to Shuffle after {delivery.attempts} attempts")
+                return
+            delivery.last_error = f"HTTP {response.status_code}"
+        except Exception as e:
+            delivery.last_error = str(e) or type(e).__name__
+
+        if final or delivery.attempts >= SHUFFLE_DISPATCH_MAX_ATTEMPTS:
+            self.give_up(delivery)
+            return
+        delay = min(SHUFFLE_DISPATCH_RETRY_DELAY * 2 ** (delivery.attempts - 1), SHUFFLE_DISPATCH_MAX_RETRY_DELAY)
+        self.stats["retried"] += 1
+        logger.warning(
+            f"Sending notification for alert {delivery.payload.alert_id} to Shuffle failed ({delivery.last_error}), retrying in {delay}s",
+        )
+        retry = asyncio.create_task(self.retry_later(delivery, delay))
+        self.retries[retry] = delivery
+        retry.add_done_callback(lambda task: self.retries.pop(task, None))
+
+    def give_up(self, delivery: ShuffleDelivery) -> None:
+        self.stats["failed"] += 1
+        self.failed.append(delivery.describe())
+        logger.error(
+            f"Giving up on notification for alert {delivery.payload.alert_id} after {delivery.attempts} attempts: {delivery.last_error}",
+        )
+
+    async def retry_later(self, delivery: ShuffleDelivery, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self.queue.put(delivery)
+
+    async def stop(self, timeout: float = 10) -> None:
+        """
+        Gives the queued notifications up to `timeout` seconds to be sent, then stops the workers.
+
+        Notifications still queued or backing off before a retry get one final attempt, again within `timeout`
+        seconds, and are given up on when it fails.
+        """
+        if not self.workers:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping the Shuffle dispatcher with {self.queue.qsize()} notifications still queued")
+        pending = [delivery for task, delivery in self.retries.items() if not task.done()]
+        for task in [*self.workers, *self.retries]:
+            task.cancel()
+        await asyncio.gather(*self.workers, *self.retries, return_exceptions=True)
+        while not self.queue.empty():
+            pending.append(self.queue.get_nowait())
+        if pending:
+            await self.deliver_final(pending, timeout)
+        await self.client.aclose()
+        self.workers = []
+        logger.info(f"Shuffle dispatcher stopped: {self.stats}")
+
+    async def deliver_final(self, pending: List[ShuffleDelivery], timeout: float) -> None:
+        logger.info(f"Making a final attempt to send {len(pending)} notifications to Shuffle")
+        self.stats["final_attempts"] += len(pending)
+        attempts = {asyncio.create_task(self.deliver(delivery, final=True)): delivery for delivery in pending}
+        _, unfinished = await asyncio.wait(attempts, timeout=timeout)
+        for task in unfinished:
+            task.cancel()
+        await asyncio.gather(*unfinished, return_exceptions=True)
+        for task in unfinished:
+            delivery = attempts[task]
+            delivery.last_error = "Shutdown before the final attempt completed"
+            self.give_up(delivery)
+
+
+shuffle_dispatcher = ShuffleDispatcher()
@@ -1,9 +1,13 @@
+import asyncio
+import json
 import os
 from datetime import datetime as dt
+from datetime import timedelta
 from typing import Any
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Set
 
 import requests
 from fastapi import APIRouter
@@ -18,6 +22,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.connectors.schema import UpdateConnector
 from app.connectors.services import ConnectorServices
 from app.db.db_session import get_db
+from app.db.db_session import get_db_session
 from app.db.universal_models import License
 
 
@@ -322,6 +327,13 @@ class RetrieveDockerCompose(BaseModel):
 
 license_router = APIRouter()
 
+# Seconds a license verification is trusted before it is refreshed in the background
+LICENSE_VERIFICATION_TTL_SECONDS = int(os.getenv("LICENSE_VERIFICATION_TTL_SECONDS", 3600))
+# Hours licensed features keep working on the last successful verification while the license server is unreachable
+LICENSE_OFFLINE_GRACE_HOURS = int(os.getenv("LICENSE_OFFLINE_GRACE_HOURS", 72))
+# Seconds to wait for the license server to connect and to answer
+LICENSE_SERVER_TIMEOUT_SECONDS = float(os.getenv("LICENSE_SERVER_TIMEOUT_SECONDS", 30))
+
 
 async def check_if_license_exists(session: AsyncSession):
     # Get the first row and raise HTTPException stating license already exists
@@ -392,23 +404,154 @@ def is_license_expired(license: dict) -> bool:
     return dt.now() > expires
 
 
+class LicenseVerification:
+    """
+    The features enabled by a successful verification of a license key.
+    """
+
+    def __init__(self, license_key: str, features: Set[str], verified_at: dt):
+        self.license_key = license_key
+        self.features = features
+        self.verified_at = verified_at
+
+    @classmethod
+    def from_license(cls, license: License) -> Optional["LicenseVerification"]:
+        if license.verified_at is None or license.verified_features is None:
+            return None
+        return cls(license.license_key, set(json.loads(license.verified_features)), license.verified_at)
+
+    def is_fresh(self) -> bool:
+        return dt.utcnow() < self.verified_at + timedelta(seconds=LICENSE_VERIFICATION_TTL_SECONDS)
+
+    def is_within_grace(self) -> bool:
+        return dt.utcnow() < self.verified_at + timedelta(seconds=LICENSE_VERIFICATION_TTL_SECONDS, hours=LICENSE_OFFLINE_GRACE_HOURS)
+
+
+# The last successful verification, keyed by license key
+license_verification_cache: Dict[str, LicenseVerification] = {}
+# The background refresh in progress, so concurrent checks start only one
+license_refresh_task: Optional[asyncio.Task] = None
+
+
+async def verify_license(license: License, session: AsyncSession) -> LicenseVerification:
+    """
+    Verifies the license key with the license server and records the enabled features in memory and on the
+    license row.
+
+    If the license server answers that the key is rejected or the license is expired, the recorded verification
+    is dropped, so the features are disabled right away instead of after the offline grace period. Any other
+    answer, such as a 5xx or the error page of a proxy, is handled like an unreachable license server.
+
+    Args:
+        license (License): The license to verify.
+        session (AsyncSession): The database session the license was loaded with.
+
+    Returns:
+        LicenseVerification: The features enabled by the license.
+
+    Raises:
+        HTTPException: 403 if the license was rejected, 500 if the license server could not be reached and 503 if
+            it did not answer with a 200.
+    """
+    result = await send_post_request("verify-license", data={"license_key": license.license_key})
+    if not result["success"]:
+        raise HTTPException(status_code=503, detail="License server did not answer the verification request")
+    if result["data"].get("success") is False or is_license_expired(result):
+        await revoke_license_verification(license, session)
+        raise HTTPException(status_code=403, detail="License was rejected by the license server")
+    features = {data_object["name"] for data_object in result["data"]["license"]["dataObjects"] if data_object["intValue"] == 1}
+    verification = LicenseVerification(license.license_key, features, dt.utcnow())
+    license.verified_features = json.dumps(sorted(features))
+    license.verified_at = verification.verified_at
+    session.add(license)
+    await session.commit()
+    license_verification_cache[license.license_key] = verification
+    logger.info(f"License verified, enabled features: {sorted(features)}")
+    return verification
+
+
+async def revoke_license_verification(license: License, session: AsyncSession) -> None:
+    """
+    Drops the verification of the license from memory and from the license row.
+    """
+    license_verification_cache.pop(license.license_key, None)
+    license.verified_features = None
+    license.verified_at = None
+    session.add(license)
+    await session.commit()
+    logger.warning("License was rejected by the license server, licensed features are disabled")
+
+
+async def refresh_license_verification() -> None:
+    try:
+        async with get_db_session() as session:
+            await verify_license(await get_license(session), session)
+    except Exception as e:
+        logger.error(f"Failed to refresh the license verification: {e}")
+
+
+async def get_license_verification(session: AsyncSession) -> LicenseVerification:
+    """
+    Returns the features enabled by the license without waiting for the license server when possible.
+
+    A verification is served from memory, or from the license row after a restart. Once it is older than
+    `LICENSE_VERIFICATION_TTL_SECONDS` it is still served while a background task refreshes it. If the license
+    server stays unreachable, it is served until `LICENSE_OFFLINE_GRACE_HOURS` after it expired. Only then, or
+    if the license was never verified, is the license verified inline. A license the server rejected is not
+    served at all, see `verify_license`.
+
+    Args:
+        session (AsyncSession): The database session.
+
+    Returns:
+        LicenseVerification: The features enabled by the license.
+    """
+    global license_refresh_task
+    license = await get_license(session)
+    verification = license_verification_cache.get(license.license_key)
+    if verification is None:
+        verification = LicenseVerification.from_license(license)
+        if verification is not None:
+            license_verification_cache[license.license_key] = verification
+    if verification is not None and verification.is_fresh():
+        return verification
+    if verification is not None and verification.is_within_grace():
+        if license_refresh_task is None or license_refresh_task.done():
+            license_refresh_task = asyncio.create_task(refresh_license_verification())
+        return verification
+    try:
+        return await verify_license(license, session)
+    except Exception as e:
+        # A rejected license stays rejected, only an unreachable license server is reported as unavailable
+        if isinstance(e, HTTPException) and e.status_code == 403:
+            raise
+        logger.error(f"Failed to verify the license: {e}")
+        raise HTTPException(status_code=503, detail="License could not be verified")
+
+
+def invalidate_license_verification() -> None:
+    """
+    Drops the cached license verifications, e.g. after the license key was replaced.
+    """
+    license_verification_cache.clear()
+
+
 async def is_feature_enabled(feature_name: str, session: AsyncSession) -> bool:
     """
     Check if a feature is enabled in a license.
 
+    The enabled features come from the cached license verification, see `get_license_verification`.
+
     Args:
-        license (License): The license to check.
         feature_name (str): The feature name to check.
         session (AsyncSession): The database session.
 
     Returns:
         bool: True if the feature is enabled, False otherwise.
     """
-    license = await get_license(session)
-    result = await send_post_request("verify-license", data={"license_key": license.license_key})
-    for data_object in result["data"]["license"]["dataObjects"]:
-        if data_object["name"] == feature_name and data_object["intValue"] == 1:
-            return True
+    verification = await get_license_verification(session)
+    if feature_name in verification.features:
+        return True
 
     raise HTTPException(status_code=400, detail="Feature not enabled. You must purchase a license to use this feature.")
 
@@ -431,10 +574,12 @@ async def send_get_request(endpoint: str) -> Dict[str, Any]:
             "Content-Type": "application/json",
             "module-version": "1.0",
         }
-        response = requests.get(
+        response = await asyncio.to_thread(
+            requests.get,
             f"https://license.socfortress.co/{endpoint}",
             headers=HEADERS,
             verify=False,
+            timeout=LICENSE_SERVER_TIMEOUT_SECONDS,
         )
 
         if response.status_code == 204:
@@ -706,11 +851,13 @@ async def send_post_request(endpoint: str, data: Dict[str, Any] = None) -> Dict[
             "Content-Type": "application/json",
             "module-version": "1.0",
         }
-        response = requests.post(
+        response = await asyncio.to_thread(
+            requests.post,
             f"https://license.socfortress.co/{endpoint}",
             headers=HEADERS,
             json=data,
             verify=False,
+            timeout=LICENSE_SERVER_TIMEOUT_SECONDS,
         )
 
         if response.status_code == 200:
@@ -823,7 +970,11 @@ async def replace_license_in_db(request: ReplaceLicenseRequest, session: AsyncSe
             )
             session.add(license)
         license.license_key = request.license_key
+        # The features verified for the old key do not apply to the new one
+        license.verified_features = None
+        license.verified_at = None
         await session.commit()
+        invalidate_license_verification()
         return {"message": "License replaced successfully", "success": True}
     except Exception as e:
         logger.error(e)
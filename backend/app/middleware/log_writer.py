@@ -0,0 +1,142 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.db_session import async_engine
+from app.db.universal_models import LogEntry
+
+# Number of log entries waiting to be written before new ones are dropped
+REQUEST_LOG_QUEUE_SIZE = int(os.getenv("REQUEST_LOG_QUEUE_SIZE", 10000))
+# Maximum number of log entries written with one INSERT
+REQUEST_LOG_BATCH_SIZE = int(os.getenv("REQUEST_LOG_BATCH_SIZE", 500))
+# Seconds a log entry waits at most for its batch to fill up
+REQUEST_LOG_FLUSH_INTERVAL = float(os.getenv("REQUEST_LOG_FLUSH_INTERVAL", 2))
+
+# Maximum length of each text column of a log entry
+LOG_ENTRY_COLUMN_LENGTHS = {
+    column.name: column.type.length for column in LogEntry.__table__.columns if getattr(column.type, "length", None)
+}
+
+
+class RequestLogWriter:
+    """
+    Writes the request logs in the background, so handling a request does not wait for the database.
+
+    Log entries go on a bounded queue. A background task writes them with one multi-row INSERT once
+    `REQUEST_LOG_BATCH_SIZE` entries are queued or `REQUEST_LOG_FLUSH_INTERVAL` seconds passed. The task
+    starts with the first entry. If the INSERT fails, the entries of the batch are written one at a time, so
+    one bad entry does not lose the others.
+    """
+
+    def __init__(self):
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.stats = {"queued": 0, "written": 0, "dropped": 0, "failed": 0}
+
+    def start(self) -> None:
+        if self.task is not None and not self.task.done():
+            return
+        self.queue = asyncio.Queue(maxsize=REQUEST_LOG_QUEUE_SIZE)
+        self.task = asyncio.create_task(self.run())
+
+    def enqueue(self, log_entry: Dict) -> bool:
+        """
+        Queues the log entry without waiting. The time of the entry is the time it was queued, and text longer
+        than its column is cut to fit.
+
+        Returns:
+            bool: False if the queue is full and the entry was dropped.
+        """
+        self.start()
+        log_entry = {**log_entry, "timestamp": datetime.utcnow()}
+        for column, length in LOG_ENTRY_COLUMN_LENGTHS.items():
+            if isinstance(log_entry.get(column), str) and len(log_entry[column]) > length:
+                log_entry[column] = log_entry[column][:length]
+        try:
+            self.queue.put_nowait(log_entry)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            if self.stats["dropped"] % 1000 == 1:
+                logger.warning(f"Request log queue is full, {self.stats['dropped']} log entries dropped so far")
+            return False
+        self.stats["queued"] += 1
+        return True
+
+    async def next_batch(self) -> List[Dict]:
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + REQUEST_LOG_FLUSH_INTERVAL
+        while len(batch) < REQUEST_LOG_BATCH_SIZE:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self) -> None:
+        while True:
+            batch = await self.next_batch()
+            try:
+                await self.write(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def insert_entries(self, entries: List[Dict]) -> None:
+        async with AsyncSession(async_engine) as session:
+            await session.execute(insert(LogEntry).values(entries))
+            await session.commit()
+
+    async def write(self, batch: List[Dict]) -> None:
+        try:
+            await self.insert_entries(batch)
+            self.stats["written"] += len(batch)
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                self.stats["failed"] += 1
+                logger.error(f"Failed to write a request log entry: {e}")
+                return
+            logger.warning(f"Failed to write {len(batch)} request log entries at once, writing them one at a time: {e}")
+        failed = 0
+        for log_entry in batch:
+            try:
+                await self.insert_entries([log_entry])
+                self.stats["written"] += 1
+            except Exception as e:
+                failed += 1
+                logger.debug(f"Failed to write request log entry {log_entry}: {e}")
+        if failed:
+            self.stats["failed"] += failed
+            logger.error(f"Failed to write {failed} of {len(batch)} request log entries")
+
+    async def stop(self, timeout: float = 10) -> None:
+        """
+        Gives the queued log entries up to `timeout` seconds to be written, then stops the writer.
+        """
+        if self.task is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping the request log writer with {self.queue.qsize()} log entries still queued")
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        self.task = None
+        logger.info(f"Request log writer stopped: {self.stats}")
+
+
+request_log_writer = RequestLogWriter()
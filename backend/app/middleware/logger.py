@@ -1,10 +1,8 @@
 from fastapi import HTTPException
 from fastapi import Request
 from fastapi.responses import JSONResponse
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.utils import AuthHandler
-from app.db.db_session import async_engine
 from app.utils import Logger
 
 EXCLUDED_PATHS = ["/auth/token", "/auth/register"]
@@ -84,23 +82,23 @@ async def log_requests(request: Request, call_next):
     if request.method == "OPTIONS":
         return await call_next(request)
 
-    async with AsyncSession(async_engine) as session:
-        logger_instance = Logger(session, AuthHandler())
-        user_id = None
-
-        try:
-            if not is_excluded_path(request.url.path):
-                response, user_id = await process_request(
-                    request,
-                    call_next,
-                    session,
-                    logger_instance,
-                )
-            else:
-                response = await call_next(request)
-        except Exception as e:
-            return await handle_exception(e, user_id, request, logger_instance)
-
-        await logger_instance.log_route_access(user_id, request, response)
+    # Log entries are written by the request log writer, so no database session is needed here
+    logger_instance = Logger(None, AuthHandler())
+    user_id = None
+
+    try:
+        if not is_excluded_path(request.url.path):
+            response, user_id = await process_request(
+                request,
+                call_next,
+                None,
+                logger_instance,
+            )
+        else:
+            response = await call_next(request)
+    except Exception as e:
+        return await handle_exception(e, user_id, request, logger_instance)
+
+    await logger_instance.log_route_access(user_id, request, response)
 
     return response
@@ -44,6 +44,7 @@ from app.network_connectors.schema import CustomerNetworkConnectorsResponse
 from app.network_connectors.schema import DeleteCustomerNetworkConnectors
 from app.network_connectors.schema import NetworkConnectorsWithAuthKeys
 from app.network_connectors.schema import UpdateCustomerNetworkConnectors
+from app.utils import invalidate_customer_alert_settings
 
 network_connector_settings_router = APIRouter()
 
@@ -437,6 +438,8 @@ async def update_office365_organization_id(
     )
     await session.execute(stmt)
     await session.commit()
+    invalidate_customer_alert_settings(customer_code)
+    invalidate_customer_alert_settings(tenant_id)
 
 
 async def get_network_connector_service_id(
@@ -14,6 +14,7 @@ from app.db.db_session import sync_engine
 from app.schedulers.models.scheduler import CreateSchedulerRequest
 from app.schedulers.models.scheduler import JobMetadata
 from app.schedulers.services.agent_sync import agent_sync
+from app.schedulers.services.event_shipper_spool import replay_event_shipper_spool
 from app.schedulers.services.invoke_carbonblack import (
     invoke_carbonblack_integration_collect,
 )
@@ -39,6 +40,9 @@ from app.schedulers.services.invoke_sap_siem import (
 from app.schedulers.services.invoke_sap_siem import (
     invoke_sap_siem_integration_same_user_successful_login_from_different_geo_location,
 )
+from app.schedulers.services.invoke_sap_siem import (
+    invoke_sap_siem_integration_shared_analysis,
+)
 from app.schedulers.services.invoke_sap_siem import (
     invoke_sap_siem_integration_successful_login_after_multiple_failed_logins,
 )
@@ -48,6 +52,7 @@ from app.schedulers.services.invoke_sap_siem import (
 from app.schedulers.services.invoke_sap_siem import (
     invoke_sap_siem_integration_suspicious_logins_analysis,
 )
+from app.schedulers.services.log_retention import purge_expired_logs
 from app.schedulers.services.monitoring_alert import (
     invoke_office365_exchange_online_alert,
 )
@@ -68,6 +73,21 @@ def scheduler_listener(event):
 # Global variable to hold the scheduler instance
 scheduler_instance = None
 
+# The SAP SIEM job running every detector over a single scan of the new events
+SAP_SIEM_SHARED_ANALYSIS_JOB_ID = "invoke_sap_siem_integration_shared_analysis"
+# The per-detector SAP SIEM jobs replaced by the shared analysis. Each of them scans all new events again.
+SAP_SIEM_DETECTOR_JOB_IDS = [
+    "invoke_sap_siem_integration_suspicious_logins_analysis",
+    "invoke_sap_siem_integration_multiple_logins_same_ip_analysis",
+    "invoke_sap_siem_integration_successful_user_login_with_different_ip",
+    "invoke_sap_siem_integration_same_user_failed_login_from_different_ip",
+    "invoke_sap_siem_integration_same_user_failed_login_from_different_geo_location",
+    "invoke_sap_siem_integration_same_user_successful_login_from_different_geo_location",
+    "invoke_sap_siem_integration_brute_force_failed_logins",
+    "invoke_sap_siem_integration_brute_force_failed_logins_same_ip",
+    "invoke_sap_siem_integration_successful_login_after_multiple_failed_logins",
+]
+
 
 async def init_scheduler():
     global scheduler_instance
@@ -84,6 +104,7 @@ async def init_scheduler():
         scheduler_instance.add_listener(scheduler_listener, EVENT_JOB_MISSED | EVENT_JOB_ERROR)
         scheduler_instance.configure(jobstores=jobstores, executors=executors)
         await initialize_job_metadata()
+        await replace_sap_siem_detector_jobs()
         logger.info("Scheduling enabled jobs...")
         await schedule_enabled_jobs(scheduler_instance)
 
@@ -91,6 +112,8 @@ async def init_scheduler():
             logger.info("Starting scheduler...")
             scheduler_instance.start()
             logger.info("Scheduler started.")
+        # The job store is only readable once the scheduler started
+        remove_sap_siem_detector_jobs(scheduler_instance)
 
     except Exception as e:
         logger.error(f"Error initializing scheduler: {e}")
@@ -123,6 +146,18 @@ async def initialize_job_metadata():
                 "function": agent_sync,
                 "description": "Synchronizes agents with the Wazuh Manager and Velociraptor server.",
             },
+            {
+                "job_id": "replay_event_shipper_spool",
+                "time_interval": 1,
+                "function": replay_event_shipper_spool,
+                "description": "Replays events spooled while the Graylog GELF input was unavailable.",
+            },
+            {
+                "job_id": "purge_expired_logs",
+                "time_interval": 60,
+                "function": purge_expired_logs,
+                "description": "Deletes the request logs older than the configured retention period.",
+            },
             # {"job_id": "invoke_mimecast_integration", "time_interval": 5, "function": invoke_mimecast_integration}
         ]
         for job in known_jobs:
@@ -145,6 +180,44 @@ async def initialize_job_metadata():
         await session.commit()
 
 
+async def replace_sap_siem_detector_jobs():
+    """
+    Replaces the metadata of the per-detector SAP SIEM jobs provisioned by earlier versions with the shared
+    analysis job, which runs at the shortest interval of the enabled per-detector jobs.
+    """
+    async with AsyncSession(async_engine) as session:
+        result = await session.execute(select(JobMetadata).where(JobMetadata.job_id.in_(SAP_SIEM_DETECTOR_JOB_IDS)))
+        detector_jobs = result.scalars().all()
+        if not detector_jobs:
+            return
+        result = await session.execute(select(JobMetadata).where(JobMetadata.job_id == SAP_SIEM_SHARED_ANALYSIS_JOB_ID))
+        if result.scalars().one_or_none() is None:
+            enabled_jobs = [job for job in detector_jobs if job.enabled]
+            session.add(
+                JobMetadata(
+                    job_id=SAP_SIEM_SHARED_ANALYSIS_JOB_ID,
+                    last_success=None,
+                    time_interval=min(job.time_interval for job in enabled_jobs or detector_jobs),
+                    enabled=bool(enabled_jobs),
+                    job_description="Runs every SAP SIEM detector over a single scan of the new events.",
+                ),
+            )
+        for job in detector_jobs:
+            await session.delete(job)
+        await session.commit()
+    logger.info(f"Replaced the SAP SIEM jobs {[job.job_id for job in detector_jobs]} with {SAP_SIEM_SHARED_ANALYSIS_JOB_ID}")
+
+
+def remove_sap_siem_detector_jobs(scheduler):
+    """
+    Removes the per-detector SAP SIEM jobs from the job store, see `replace_sap_siem_detector_jobs`.
+    """
+    for job_id in SAP_SIEM_DETECTOR_JOB_IDS:
+        if scheduler.get_job(job_id) is not None:
+            scheduler.remove_job(job_id)
+            logger.info(f"Removed the SAP SIEM job {job_id}, replaced by {SAP_SIEM_SHARED_ANALYSIS_JOB_ID}")
+
+
 async def schedule_enabled_jobs(scheduler):
     """
     Schedules jobs that are enabled in the database.
@@ -190,6 +263,8 @@ def get_function_by_name(function_name: str):
     """
     function_map = {
         "agent_sync": agent_sync,
+        "replay_event_shipper_spool": replay_event_shipper_spool,
+        "purge_expired_logs": purge_expired_logs,
         "invoke_mimecast_integration": invoke_mimecast_integration,
         "invoke_mimecast_integration_ttp": invoke_mimecast_integration_ttp,
         "invoke_wazuh_monitoring_alert": invoke_wazuh_monitoring_alert,
@@ -206,6 +281,7 @@ def get_function_by_name(function_name: str):
         "invoke_sap_siem_integration_brute_force_failed_logins": invoke_sap_siem_integration_brute_force_failed_logins,
         "invoke_sap_siem_integration_brute_force_failed_logins_same_ip": invoke_sap_siem_integration_brute_force_failed_logins_same_ip,
         "invoke_sap_siem_integration_successful_login_after_multiple_failed_logins": invoke_sap_siem_integration_successful_login_after_multiple_failed_logins,
+        "invoke_sap_siem_integration_shared_analysis": invoke_sap_siem_integration_shared_analysis,
         "invoke_huntress_integration_collection": invoke_huntress_integration_collect,
         "invoke_carbonblack_integration_collection": invoke_carbonblack_integration_collect,
         # Add other function mappings here
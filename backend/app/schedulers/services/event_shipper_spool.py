@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from dotenv import load_dotenv
+from loguru import logger
+from sqlalchemy.future import select
+
+from app.db.db_session import get_db_session
+from app.integrations.utils.event_shipper import replay_spooled_events
+from app.schedulers.models.scheduler import JobMetadata
+
+load_dotenv()
+
+
+async def replay_event_shipper_spool():
+    """
+    Replays events spooled while the Graylog GELF input was unavailable.
+
+    Replay is also triggered by the next shipped event, this job covers the case where no
+    collection runs after the input has recovered.
+    """
+    logger.info("Replaying event shipper spool via scheduler...")
+    replayed = await replay_spooled_events()
+    logger.info(f"Replayed {replayed} spooled events.")
+
+    async with get_db_session() as session:
+        stmt = select(JobMetadata).where(JobMetadata.job_id == "replay_event_shipper_spool")
+        result = await session.execute(stmt)
+        job_metadata = result.scalars().first()
+
+        if job_metadata:
+            job_metadata.last_success = datetime.utcnow()
+            session.add(job_metadata)
+            await session.commit()
+        else:
+            logger.warning("JobMetadata for 'replay_event_shipper_spool' not found.")
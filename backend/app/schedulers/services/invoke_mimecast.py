@@ -1,3 +1,5 @@
+import asyncio
+import os
 from datetime import datetime
 
 from dotenv import load_dotenv
@@ -15,10 +17,39 @@ from app.schedulers.models.scheduler import JobMetadata
 
 load_dotenv()
 
+# Number of customers whose Mimecast SIEM logs are collected at the same time
+MIMECAST_COLLECTION_CONCURRENCY = int(os.getenv("MIMECAST_COLLECTION_CONCURRENCY", 5))
+
+
+async def invoke_mimecast_customer(customer_code: str, semaphore: asyncio.Semaphore) -> bool:
+    """
+    Collects the Mimecast SIEM logs of one customer over its own database session.
+
+    Returns:
+        bool: Whether the collection succeeded.
+    """
+    async with semaphore:
+        try:
+            async with get_db_session() as session:
+                await invoke_mimecast_route(
+                    MimecastRequest(
+                        customer_code=customer_code,
+                        integration_name="Mimecast",
+                    ),
+                    session,
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Mimecast collection failed for customer {customer_code}: {e}")
+            return False
+
 
 async def invoke_mimecast_integration() -> MimecastResponse:
     """
     Invokes the Mimecast integration.
+
+    Customers are collected concurrently, at most `MIMECAST_COLLECTION_CONCURRENCY` at a time, so a slow
+    or failing customer does not hold back the others.
     """
     logger.info("Invoking Mimecast integration scheduled job.")
     customer_codes = []
@@ -29,16 +60,13 @@ async def invoke_mimecast_integration() -> MimecastResponse:
         result = await session.execute(stmt)
         customer_codes = [row.customer_code for row in result.scalars()]
         logger.info(f"customer_codes: {customer_codes}")
-        for customer_code in customer_codes:
-            await invoke_mimecast_route(
-                MimecastRequest(
-                    customer_code=customer_code,
-                    integration_name="Mimecast",
-                ),
-                session,
-            )
-    # Close the session
-    await session.close()
+
+    semaphore = asyncio.Semaphore(MIMECAST_COLLECTION_CONCURRENCY)
+    results = await asyncio.gather(*(invoke_mimecast_customer(customer_code, semaphore) for customer_code in customer_codes))
+    failed_customers = [customer_code for customer_code, success in zip(customer_codes, results) if not success]
+    if failed_customers:
+        return MimecastResponse(success=False, message=f"Mimecast integration failed for customers: {failed_customers}")
+
     with get_sync_db_session() as session:
         # Synchronous ORM operations
         job_metadata = session.query(JobMetadata).filter_by(job_id="invoke_mimecast_integration").one_or_none()
@@ -29,6 +29,9 @@ from app.integrations.sap_siem.routes.sap_siem import (
 from app.integrations.sap_siem.routes.sap_siem import (
     invoke_sap_siem_same_user_successful_login_from_different_geo_location_route,
 )
+from app.integrations.sap_siem.routes.sap_siem import (
+    invoke_sap_siem_shared_analysis_route,
+)
 from app.integrations.sap_siem.routes.sap_siem import (
     invoke_sap_siem_successful_login_after_multiple_failed_logins_route,
 )
@@ -503,3 +506,34 @@ async def invoke_sap_siem_integration_successful_login_after_multiple_failed_log
             print("JobMetadata for 'invoke_sap_siem_integration_successful_login_after_multiple_failed_logins' not found.")
 
     return InvokeSAPSiemResponse(success=True, message="SAP SIEM integration invoked for successful login after multiple failed logins.")
+
+
+async def invoke_sap_siem_integration_shared_analysis() -> InvokeSAPSiemResponse:
+    """
+    Invokes the SAP SIEM detectors over a single scan of the unanalyzed events.
+    """
+    logger.info("Invoking SAP SIEM integration shared analysis scheduled job.")
+    async with get_db_session() as session:
+        stmt = select(CustomerIntegrations).where(
+            CustomerIntegrations.integration_service_name == "SAP SIEM",
+        )
+        result = await session.execute(stmt)
+        if result.scalars().first() is None:
+            logger.info("No SAP SIEM customer integrations found, skipping shared analysis.")
+            return InvokeSAPSiemResponse(success=True, message="No SAP SIEM customer integrations found.")
+        # The detectors analyze the events of all customers at once, so a single run covers every customer
+        await invoke_sap_siem_shared_analysis_route(session=session)
+    # Close the session
+    await session.close()
+    with get_sync_db_session() as session:
+        # Synchronous ORM operations
+        job_metadata = session.query(JobMetadata).filter_by(job_id="invoke_sap_siem_integration_shared_analysis").one_or_none()
+        if job_metadata:
+            job_metadata.last_success = datetime.utcnow()
+            session.add(job_metadata)
+            session.commit()
+        else:
+            # Handle the case where job_metadata does not exist
+            print("JobMetadata for 'invoke_sap_siem_integration_shared_analysis' not found.")
+
+    return InvokeSAPSiemResponse(success=True, message="SAP SIEM integration invoked for shared analysis.")
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from dotenv import load_dotenv
+from loguru import logger
+from sqlalchemy.future import select
+
+from app.db.db_session import get_db_session
+from app.schedulers.models.scheduler import JobMetadata
+from app.utils import LOG_ENTRIES_RETENTION_DAYS
+from app.utils import purge_expired_log_entries
+
+load_dotenv()
+
+
+async def purge_expired_logs():
+    """
+    Deletes the request logs older than `LOG_ENTRIES_RETENTION_DAYS`, in chunks.
+    """
+    logger.info("Purging expired logs via scheduler...")
+    async with get_db_session() as session:
+        purged = await purge_expired_log_entries(session)
+        logger.info(f"Purged {purged} logs older than {LOG_ENTRIES_RETENTION_DAYS} days.")
+
+        stmt = select(JobMetadata).where(JobMetadata.job_id == "purge_expired_logs")
+        result = await session.execute(stmt)
+        job_metadata = result.scalars().first()
+
+        if job_metadata:
+            job_metadata.last_success = datetime.utcnow()
+            session.add(job_metadata)
+            await session.commit()
+        else:
+            logger.warning("JobMetadata for 'purge_expired_logs' not found.")
@@ -7,19 +7,24 @@ from sqlalchemy import select
 from app.db.db_session import get_db_session
 from app.db.db_session import get_sync_db_session
 from app.db.universal_models import CustomersMeta
-from app.integrations.monitoring_alert.routes.monitoring_alert import (
-    run_office365_exchange_online_analysis,
-)
-from app.integrations.monitoring_alert.routes.monitoring_alert import (
-    run_suricata_analysis,
-)
-from app.integrations.monitoring_alert.routes.monitoring_alert import run_wazuh_analysis
 from app.integrations.monitoring_alert.schema.monitoring_alert import (
     AlertAnalysisResponse,
 )
-from app.integrations.monitoring_alert.schema.monitoring_alert import (
-    MonitoringWazuhAlertsRequestModel,
+from app.integrations.monitoring_alert.services.office365_exchange import (
+    INDEXER_SOURCE_FIELDS as OFFICE365_EXCHANGE_SOURCE_FIELDS,
+)
+from app.integrations.monitoring_alert.services.office365_exchange import (
+    analyze_office365_exchange_online_alert,
+)
+from app.integrations.monitoring_alert.services.suricata import (
+    INDEXER_SOURCE_FIELDS as SURICATA_SOURCE_FIELDS,
 )
+from app.integrations.monitoring_alert.services.suricata import analyze_suricata_alert
+from app.integrations.monitoring_alert.services.wazuh import (
+    INDEXER_SOURCE_FIELDS as WAZUH_SOURCE_FIELDS,
+)
+from app.integrations.monitoring_alert.services.wazuh import analyze_wazuh_alert
+from app.integrations.monitoring_alert.utils.pipeline import run_analysis_pipeline
 from app.schedulers.models.scheduler import JobMetadata
 
 load_dotenv()
@@ -28,6 +33,7 @@ load_dotenv()
 async def invoke_wazuh_monitoring_alert() -> AlertAnalysisResponse:
     """
     Invokes the Wazuh monitoring alerts scheduled job.
+    Alerts are analyzed as soon as the webhook receives them, so this job sweeps up the ones that were missed.
 
     Returns:
         AlertAnalysisResponse: The response indicating the success of invoking the monitoring alerts.
@@ -39,11 +45,8 @@ async def invoke_wazuh_monitoring_alert() -> AlertAnalysisResponse:
         result = await session.execute(stmt)
         customer_codes = [row.customer_code for row in result.scalars()]
         logger.info(f"customer_codes: {customer_codes}")
-        for customer_code in customer_codes:
-            await run_wazuh_analysis(
-                MonitoringWazuhAlertsRequestModel(customer_code=customer_code),
-                session,
-            )
+    # Analyze the alerts of all customers together, so they are handled in turn
+    await run_analysis_pipeline("WAZUH", customer_codes, analyze_wazuh_alert, WAZUH_SOURCE_FIELDS)
     # Close the session
     await session.close()
     with get_sync_db_session() as session:
@@ -66,6 +69,7 @@ async def invoke_wazuh_monitoring_alert() -> AlertAnalysisResponse:
 async def invoke_suricata_monitoring_alert() -> AlertAnalysisResponse:
     """
     Invokes the Suricata monitoring alerts scheduled job.
+    Alerts are analyzed as soon as the webhook receives them, so this job sweeps up the ones that were missed.
 
     Returns:
         WazuhAnalysisResponse: The response indicating the success of invoking the monitoring alerts.
@@ -77,11 +81,8 @@ async def invoke_suricata_monitoring_alert() -> AlertAnalysisResponse:
         result = await session.execute(stmt)
         customer_codes = [row.customer_code for row in result.scalars()]
         logger.info(f"customer_codes: {customer_codes}")
-        for customer_code in customer_codes:
-            await run_suricata_analysis(
-                MonitoringWazuhAlertsRequestModel(customer_code=customer_code),
-                session,
-            )
+    # Analyze the alerts of all customers together, so they are handled in turn
+    await run_analysis_pipeline("SURICATA", customer_codes, analyze_suricata_alert, SURICATA_SOURCE_FIELDS)
     # Close the session
     await session.close()
     with get_sync_db_session() as session:
@@ -106,6 +107,7 @@ async def invoke_suricata_monitoring_alert() -> AlertAnalysisResponse:
 async def invoke_office365_exchange_online_alert() -> AlertAnalysisResponse:
     """
     Invokes the Office365 Exchange Online monitoring alerts scheduled job.
+    Alerts are analyzed as soon as the webhook receives them, so this job sweeps up the ones that were missed.
 
     Returns:
         AlertAnalysisResponse: The response indicating the success of invoking the monitoring alerts.
@@ -116,11 +118,13 @@ async def invoke_office365_exchange_online_alert() -> AlertAnalysisResponse:
         result = await session.execute(stmt)
         customer_codes = [row.customer_meta_office365_organization_id for row in result.scalars()]
         logger.info(f"customer_codes: {customer_codes}")
-        for customer_code in customer_codes:
-            await run_office365_exchange_online_analysis(
-                MonitoringWazuhAlertsRequestModel(customer_code=customer_code),
-                session,
-            )
+    # Analyze the alerts of all customers together, so they are handled in turn
+    await run_analysis_pipeline(
+        "OFFICE365_EXCHANGE_ONLINE",
+        customer_codes,
+        analyze_office365_exchange_online_alert,
+        OFFICE365_EXCHANGE_SOURCE_FIELDS,
+    )
     return AlertAnalysisResponse(
         success=True,
         message="Office365 Exchange Online monitoring alerts invoked.",
@@ -1,3 +1,5 @@
+import os
+import time
 from datetime import datetime
 from datetime import timedelta
 from enum import Enum
@@ -5,12 +7,14 @@ from typing import Any
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Tuple
 from typing import Union
 
 import requests
 from fastapi import APIRouter
 from fastapi import Depends
 from fastapi import HTTPException
+from fastapi import Query
 from fastapi import Request
 from fastapi import Security
 from fastapi.exceptions import RequestValidationError
@@ -18,11 +22,14 @@ from loguru import logger
 from pydantic import BaseModel
 from pydantic import Field
 from pydantic import validator
+from sqlalchemy import and_
+from sqlalchemy import delete
+from sqlalchemy import or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import joinedload
 
-from app.auth.services.universal import find_user
+from app.auth.services.universal import find_cached_user
 from app.auth.utils import AuthHandler
 from app.connectors.utils import get_connector_info_from_db
 from app.db.all_models import Connectors
@@ -39,6 +46,7 @@ from app.integrations.alert_creation_settings.models.alert_creation_settings imp
 from app.integrations.alert_creation_settings.models.alert_creation_settings import (
     EventOrder,
 )
+from app.middleware.log_writer import request_log_writer
 
 
 ################## ! 422 VALIDATION ERROR TYPES FOR PYDANTIC VALUE ERROR RESPONSE ! ##################
@@ -122,6 +130,11 @@ class LogRetrieveModel(LogEntryModel):
 
 class LogsResponse(BaseModel):
     logs: List[LogRetrieveModel]
+    next_cursor: Optional[str] = Field(
+        None,
+        example="2024-05-15T16:21:47.803615_1042",
+        description="Cursor of the next page of logs, None on the last page",
+    )
     success: bool
     message: str
 
@@ -228,9 +241,113 @@ class TimeRangeModel(BaseModel):
             )
 
 
+################## ! LOG STORE ! ##################
+# Number of log entries returned per page by the log routes
+LOG_ENTRIES_PAGE_SIZE = int(os.getenv("LOG_ENTRIES_PAGE_SIZE", 500))
+# Largest page of log entries a client can ask for
+LOG_ENTRIES_MAX_PAGE_SIZE = 5000
+# Days log entries are kept before the retention job purges them. 0 keeps them forever.
+LOG_ENTRIES_RETENTION_DAYS = int(os.getenv("LOG_ENTRIES_RETENTION_DAYS", 30))
+# Number of log entries deleted per statement, so a purge does not lock the table for long
+LOG_ENTRIES_PURGE_CHUNK_SIZE = int(os.getenv("LOG_ENTRIES_PURGE_CHUNK_SIZE", 5000))
+
+
+def encode_log_cursor(log: LogEntry) -> str:
+    return f"{log.timestamp.isoformat()}_{log.id}"
+
+
+def decode_log_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        timestamp, log_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(timestamp), int(log_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+
+
+async def fetch_log_page(
+    session: AsyncSession,
+    *filters,
+    cursor: Optional[str] = None,
+    limit: int = LOG_ENTRIES_PAGE_SIZE,
+) -> Tuple[List[LogEntry], Optional[str]]:
+    """
+    Fetches a page of log entries matching the filters, newest first.
+
+    The page starts after the (timestamp, id) position encoded in the cursor rather than at an offset, so
+    deep pages cost as little as the first one.
+
+    Args:
+        session (AsyncSession): The database session.
+        *filters: The conditions the log entries must match.
+        cursor (Optional[str]): The cursor returned with the previous page.
+        limit (int): The number of log entries per page.
+
+    Returns:
+        Tuple[List[LogEntry], Optional[str]]: The log entries and the cursor of the next page, None on the last page.
+    """
+    stmt = select(LogEntry).where(*filters)
+    if cursor:
+        timestamp, log_id = decode_log_cursor(cursor)
+        stmt = stmt.where(
+            or_(LogEntry.timestamp < timestamp, and_(LogEntry.timestamp == timestamp, LogEntry.id < log_id)),
+        )
+    stmt = stmt.order_by(LogEntry.timestamp.desc(), LogEntry.id.desc()).limit(limit + 1)
+    result = await session.execute(stmt)
+    logs = result.scalars().all()
+    if len(logs) > limit:
+        return logs[:limit], encode_log_cursor(logs[limit - 1])
+    return logs, None
+
+
+def time_range_start(time_range: str) -> datetime:
+    """
+    Returns the start of a validated time range such as 12h, 1d or 1w.
+    """
+    units = {"h": "hours", "d": "days", "w": "weeks"}
+    return datetime.utcnow() - timedelta(**{units[time_range[-1]]: int(time_range[:-1])})
+
+
+async def purge_log_entries(session: AsyncSession, *filters) -> int:
+    """
+    Deletes the log entries matching the filters, `LOG_ENTRIES_PURGE_CHUNK_SIZE` at a time.
+
+    Each chunk is committed on its own, so a large purge neither holds locks for long nor builds one huge
+    transaction.
+
+    Args:
+        session (AsyncSession): The database session.
+        *filters: The conditions the log entries must match.
+
+    Returns:
+        int: The number of log entries deleted.
+    """
+    deleted = 0
+    while True:
+        result = await session.execute(select(LogEntry.id).where(*filters).order_by(LogEntry.id).limit(LOG_ENTRIES_PURGE_CHUNK_SIZE))
+        ids = result.scalars().all()
+        if not ids:
+            return deleted
+        await session.execute(delete(LogEntry).where(LogEntry.id.in_(ids)))
+        await session.commit()
+        deleted += len(ids)
+
+
+async def purge_expired_log_entries(session: AsyncSession) -> int:
+    """
+    Deletes the log entries older than `LOG_ENTRIES_RETENTION_DAYS`.
+
+    Returns:
+        int: The number of log entries deleted.
+    """
+    if LOG_ENTRIES_RETENTION_DAYS <= 0:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(days=LOG_ENTRIES_RETENTION_DAYS)
+    return await purge_log_entries(session, LogEntry.timestamp < cutoff)
+
+
 # ########! LOGGER CLASS !#########
 class Logger:
-    def __init__(self, session: AsyncSession, auth_handler: AuthHandler):
+    def __init__(self, session: Optional[AsyncSession], auth_handler: AuthHandler):
         self.session = session
         self.auth_handler = auth_handler
 
@@ -251,14 +368,14 @@ class Logger:
             except IndexError:
                 raise HTTPException(status_code=401, detail="Invalid token")
             username, _ = self.auth_handler.decode_token(token)
-            user = await find_user(username)  # Correctly using await for an async call
+            user = await find_cached_user(username)
             if user:
                 return user.id
         return None
 
     async def insert_log_entry(self, log_entry_model: LogEntryModel):
         """
-        Inserts a log entry into the database.
+        Queues a log entry to be written to the database by the request log writer.
 
         Args:
             log_entry_model (LogEntryModel): The log entry model to be inserted.
@@ -266,9 +383,7 @@ class Logger:
         Returns:
             None
         """
-        log_entry = LogEntry(**log_entry_model.dict())
-        self.session.add(log_entry)
-        await self.session.commit()
+        request_log_writer.enqueue(log_entry_model.dict())
 
     async def log_route_access(self, user_id, request: Request, response):
         """
@@ -340,16 +455,18 @@ class Logger:
         await self.log_error(user_id, request, exception)
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
-    async def fetch_all_logs(self):
+    async def fetch_all_logs(self, cursor: Optional[str] = None, limit: int = LOG_ENTRIES_PAGE_SIZE):
         """
-        Fetches all log entries asynchronously.
+        Fetches a page of log entries, newest first.
+
+        Args:
+            cursor (Optional[str]): The cursor returned with the previous page.
+            limit (int): The number of log entries per page.
 
         Returns:
-            A list of log entries.
+            A list of log entries and the cursor of the next page.
         """
-        result = await self.session.execute(select(LogEntry))
-        logs = result.scalars().all()
-        return logs
+        return await fetch_log_page(self.session, cursor=cursor, limit=limit)
 
 
 ################## ! RETRIEVE LOGS ROUTES ! ##################
@@ -362,12 +479,20 @@ logs_router = APIRouter()
     description="Fetch all logs",
     dependencies=[Security(AuthHandler().get_current_user, scopes=["admin"])],
 )
-async def get_logs(session: AsyncSession = Depends(get_db)) -> LogsResponse:
+async def get_logs(
+    cursor: Optional[str] = Query(None, description="Cursor of the page to fetch, from the previous page"),
+    limit: int = Query(LOG_ENTRIES_PAGE_SIZE, ge=1, le=LOG_ENTRIES_MAX_PAGE_SIZE, description="Number of logs per page"),
+    session: AsyncSession = Depends(get_db),
+) -> LogsResponse:
     """
-    Fetch all logs from the database.
+    Fetch a page of logs from the database, newest first.
+
+    This endpoint retrieves a page of the logs stored in the database and returns them
+    along with the cursor of the next page, a success status and message.
 
-    This endpoint retrieves all the logs stored in the database and returns them
-    along with a success status and message.
+    Args:
+        cursor (Optional[str]): The cursor returned with the previous page.
+        limit (int): The number of logs per page.
 
     Returns:
         LogsResponse: A Pydantic model containing a list of logs and additional metadata.
@@ -378,10 +503,11 @@ async def get_logs(session: AsyncSession = Depends(get_db)) -> LogsResponse:
     auth_handler_instance = AuthHandler()  # Initialize your AuthHandler
     logger_instance = Logger(session, auth_handler_instance)
 
-    logs = await logger_instance.fetch_all_logs()  # Assuming fetch_all_logs is an async function
+    logs, next_cursor = await logger_instance.fetch_all_logs(cursor=cursor, limit=limit)
     if logs:
         return LogsResponse(
             logs=logs,
+            next_cursor=next_cursor,
             success=True,
             message="Logs fetched successfully",
         )
@@ -397,16 +523,20 @@ async def get_logs(session: AsyncSession = Depends(get_db)) -> LogsResponse:
 )
 async def get_logs_by_user_id(
     user_id: int,
+    cursor: Optional[str] = Query(None, description="Cursor of the page to fetch, from the previous page"),
+    limit: int = Query(LOG_ENTRIES_PAGE_SIZE, ge=1, le=LOG_ENTRIES_MAX_PAGE_SIZE, description="Number of logs per page"),
     session: AsyncSession = Depends(get_db),
 ) -> LogsResponse:
     """
-    Fetch all logs from the database where the user_id matches the provided user_id.
+    Fetch a page of logs from the database where the user_id matches the provided user_id, newest first.
 
-    This endpoint retrieves all the logs stored in the database where the user_id matches the provided user_id
-    and returns them along with a success status and message.
+    This endpoint retrieves a page of the logs stored in the database where the user_id matches the provided user_id
+    and returns them along with the cursor of the next page, a success status and message.
 
     Args:
         user_id (int): The user_id to filter logs by.
+        cursor (Optional[str]): The cursor returned with the previous page.
+        limit (int): The number of logs per page.
 
     Returns:
         LogsResponse: A Pydantic model containing a list of logs and additional metadata.
@@ -414,8 +544,7 @@ async def get_logs_by_user_id(
     Raises:
         HTTPException: An exception with a 404 status code is raised if no logs are found.
     """
-    result = await session.execute(select(LogEntry).filter(LogEntry.user_id == user_id))
-    logs = result.scalars().all()
+    logs, next_cursor = await fetch_log_page(session, LogEntry.user_id == user_id, cursor=cursor, limit=limit)
 
     if not logs:
         raise HTTPException(
@@ -423,7 +552,7 @@ async def get_logs_by_user_id(
             detail=f"No logs found for user ID: {user_id}",
         )
 
-    return LogsResponse(logs=logs, success=True, message="Logs fetched successfully")
+    return LogsResponse(logs=logs, next_cursor=next_cursor, success=True, message="Logs fetched successfully")
 
 
 @logs_router.post(
@@ -434,16 +563,20 @@ async def get_logs_by_user_id(
 )
 async def get_logs_by_time_range(
     time_range: TimeRangeModel,
+    cursor: Optional[str] = Query(None, description="Cursor of the page to fetch, from the previous page"),
+    limit: int = Query(LOG_ENTRIES_PAGE_SIZE, ge=1, le=LOG_ENTRIES_MAX_PAGE_SIZE, description="Number of logs per page"),
     session: AsyncSession = Depends(get_db),
 ) -> LogsResponse:
     """
-    Fetch all logs from the database where the timestamp is within the provided time range.
+    Fetch a page of logs from the database where the timestamp is within the provided time range, newest first.
 
-    This endpoint retrieves all the logs stored in the database where the timestamp is within the provided time range
-    and returns them along with a success status and message.
+    This endpoint retrieves a page of the logs stored in the database where the timestamp is within the provided time range
+    and returns them along with the cursor of the next page, a success status and message.
 
     Args:
         time_range (TimeRangeModel): The time range to filter logs by.
+        cursor (Optional[str]): The cursor returned with the previous page.
+        limit (int): The number of logs per page.
 
     Returns:
         LogsResponse: A Pydantic model containing a list of logs and additional metadata.
@@ -451,26 +584,20 @@ async def get_logs_by_time_range(
     Raises:
         HTTPException: An exception with a 404 status code is raised if no logs are found.
     """
-    result = await session.execute(select(LogEntry))
-    logs = result.scalars().all()
+    logs, next_cursor = await fetch_log_page(
+        session,
+        LogEntry.timestamp >= time_range_start(time_range.time_range),
+        cursor=cursor,
+        limit=limit,
+    )
 
-    if logs:
-        logs = [log for log in logs if log.timestamp >= datetime.now() - timedelta(days=int(time_range.time_range[:-1]))]
-        if logs != []:
-            return LogsResponse(
-                logs=logs,
-                success=True,
-                message="Logs fetched successfully",
-            )
-        else:
-            raise HTTPException(
-                status_code=404,
-                detail=f"No logs found for time range: {time_range.time_range}".format(
-                    time_range=time_range.time_range,
-                ),
-            )
-    else:
-        raise HTTPException(status_code=404, detail="No logs found")
+    if not logs:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No logs found for time range: {time_range.time_range}",
+        )
+
+    return LogsResponse(logs=logs, next_cursor=next_cursor, success=True, message="Logs fetched successfully")
 
 
 @logs_router.post(
@@ -481,16 +608,20 @@ async def get_logs_by_time_range(
 )
 async def get_logs_by_event_type(
     event_type: EventType,
+    cursor: Optional[str] = Query(None, description="Cursor of the page to fetch, from the previous page"),
+    limit: int = Query(LOG_ENTRIES_PAGE_SIZE, ge=1, le=LOG_ENTRIES_MAX_PAGE_SIZE, description="Number of logs per page"),
     session: AsyncSession = Depends(get_db),
 ) -> LogsResponse:  # Update this line to use the new model
     """
-    Fetch all logs from the database where the event_type matches the provided event_type.
+    Fetch a page of logs from the database where the event_type matches the provided event_type, newest first.
 
-    This endpoint retrieves all the logs stored in the database where the event_type matches the provided event_type
-    and returns them along with a success status and message.
+    This endpoint retrieves a page of the logs stored in the database where the event_type matches the provided event_type
+    and returns them along with the cursor of the next page, a success status and message.
 
     Args:
         event_type (EventType): The event_type to filter logs by.
+        cursor (Optional[str]): The cursor returned with the previous page.
+        limit (int): The number of logs per page.
 
     Returns:
         LogsResponse: A Pydantic model containing a list of logs and additional metadata.
@@ -498,10 +629,7 @@ async def get_logs_by_event_type(
     Raises:
         HTTPException: An exception with a 404 status code is raised if no logs are found.
     """
-    result = await session.execute(
-        select(LogEntry).filter(LogEntry.event_type == event_type),
-    )
-    logs = result.scalars().all()
+    logs, next_cursor = await fetch_log_page(session, LogEntry.event_type == event_type, cursor=cursor, limit=limit)
 
     if not logs:
         raise HTTPException(
@@ -509,7 +637,7 @@ async def get_logs_by_event_type(
             detail=f"No logs found for event type: {event_type}",
         )
 
-    return LogsResponse(logs=logs, success=True, message="Logs fetched successfully")
+    return LogsResponse(logs=logs, next_cursor=next_cursor, success=True, message="Logs fetched successfully")
 
 
 @logs_router.delete(
@@ -532,13 +660,7 @@ async def purge_logs(
     Raises:
         HTTPException: An exception with a 404 status code is raised if no logs are found.
     """
-    result = await session.execute(select(LogEntry))
-    logs = result.scalars().all()
-
-    if logs:
-        for log in logs:
-            await session.delete(log)
-        await session.commit()
+    if await purge_log_entries(session):
         return LogsResponse(logs=[], success=True, message="Logs purged successfully")
     else:
         raise HTTPException(status_code=404, detail="No logs found")
@@ -569,29 +691,17 @@ async def purge_logs_by_time_range(
     Raises:
         HTTPException: An exception with a 404 status code is raised if no logs are found.
     """
-    result = await session.execute(select(LogEntry))
-    logs = result.scalars().all()
-
-    if logs:
-        logs = [log for log in logs if log.timestamp >= datetime.now() - timedelta(days=int(time_range.time_range[:-1]))]
-        if logs != []:
-            for log in logs:
-                await session.delete(log)
-            await session.commit()
-            return LogsResponse(
-                logs=[],
-                success=True,
-                message="Logs purged successfully",
-            )
-        else:
-            raise HTTPException(
-                status_code=404,
-                detail=f"No logs found for time range: {time_range.time_range}".format(
-                    time_range=time_range.time_range,
-                ),
-            )
+    if await purge_log_entries(session, LogEntry.timestamp >= time_range_start(time_range.time_range)):
+        return LogsResponse(
+            logs=[],
+            success=True,
+            message="Logs purged successfully",
+        )
     else:
-        raise HTTPException(status_code=404, detail="No logs found")
+        raise HTTPException(
+            status_code=404,
+            detail=f"No logs found for time range: {time_range.time_range}",
+        )
 
 
 ################## ! ALLOWED FILES ! ##################
@@ -636,6 +746,49 @@ async def get_connector_attribute(
     return None
 
 
+# How long customer alert settings are served from the cache. Writes through the settings routes invalidate
+# the cache right away; the expiry bounds how stale another worker's copy can get.
+ALERT_SETTINGS_CACHE_TTL_SECONDS = int(os.getenv("ALERT_SETTINGS_CACHE_TTL_SECONDS", 300))
+
+# Cached alert creation settings, keyed by (lookup column, lookup value). None is cached too, so customers
+# without settings do not cost a query per alert either.
+alert_settings_cache: Dict[Tuple[str, str], Tuple[float, Optional[AlertCreationSettings]]] = {}
+
+
+def get_cached_alert_settings(key: Tuple[str, str]) -> Tuple[bool, Optional[AlertCreationSettings]]:
+    cached = alert_settings_cache.get(key)
+    if cached is None or cached[0] <= time.monotonic():
+        return False, None
+    return True, cached[1]
+
+
+def cache_alert_settings(key: Tuple[str, str], settings: Optional[AlertCreationSettings]) -> Optional[AlertCreationSettings]:
+    """
+    Caches a detached copy of the settings, so the cached object does not depend on the session it was
+    loaded with. Only the columns are copied, not the event orders.
+    """
+    if settings is not None:
+        settings = AlertCreationSettings(**settings.dict())
+    alert_settings_cache[key] = (time.monotonic() + ALERT_SETTINGS_CACHE_TTL_SECONDS, settings)
+    return settings
+
+
+def invalidate_customer_alert_settings(customer_code: Optional[str] = None) -> None:
+    """
+    Drops the cached alert creation settings of the customer, whichever column they were looked up by.
+    Drops all of them if no customer code is given.
+
+    Args:
+        customer_code (Optional[str]): The code of the customer whose settings changed.
+    """
+    if customer_code is None:
+        alert_settings_cache.clear()
+        return
+    for key, (_, settings) in list(alert_settings_cache.items()):
+        if key[1] == customer_code or (settings is not None and settings.customer_code == customer_code):
+            del alert_settings_cache[key]
+
+
 async def get_customer_alert_settings(
     customer_code: str,
     session: AsyncSession,
@@ -643,6 +796,8 @@ async def get_customer_alert_settings(
     """
     Retrieve the alert creation settings for a specific customer.
 
+    The settings are cached per customer code for `ALERT_SETTINGS_CACHE_TTL_SECONDS`.
+
     Args:
         customer_code (str): The code of the customer.
         session (AsyncSession): The database session.
@@ -650,6 +805,11 @@ async def get_customer_alert_settings(
     Returns:
         Optional[AlertCreationSettings]: The alert creation settings for the customer, or None if not found.
     """
+    key = ("customer_code", customer_code)
+    found, settings = get_cached_alert_settings(key)
+    if found:
+        return settings
+
     result = await session.execute(
         select(AlertCreationSettings).filter(
             AlertCreationSettings.customer_code == customer_code,
@@ -665,7 +825,7 @@ async def get_customer_alert_settings(
         )
         settings = result.scalars().first()
 
-    return settings
+    return cache_alert_settings(key, settings)
 
 
 async def get_customer_alert_settings_office365(
@@ -675,6 +835,8 @@ async def get_customer_alert_settings_office365(
     """
     Retrieve the alert creation settings for a specific customer.
 
+    The settings are cached per organization ID for `ALERT_SETTINGS_CACHE_TTL_SECONDS`.
+
     Args:
         office365_organization_id (str): The Office365 Organization ID of the customer.
         session (AsyncSession): The database session.
@@ -682,6 +844,11 @@ async def get_customer_alert_settings_office365(
     Returns:
         Optional[AlertCreationSettings]: The alert creation settings for the customer, or None if not found.
     """
+    key = ("office365_organization_id", office365_organization_id)
+    found, settings = get_cached_alert_settings(key)
+    if found:
+        return settings
+
     result = await session.execute(
         select(AlertCreationSettings).filter(
             AlertCreationSettings.office365_organization_id == office365_organization_id,
@@ -689,9 +856,7 @@ async def get_customer_alert_settings_office365(
     )
     settings = result.scalars().first()
 
-    if settings:
-        return settings
-    return None
+    return cache_alert_settings(key, settings)
 
 
 async def get_customer_alert_event_configs(
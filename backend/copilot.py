@@ -10,8 +10,11 @@ from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
 
 from app.auth.utils import AuthHandler
+from app.connectors.shuffle.utils.universal import close_shuffle_client
+from app.connectors.utils import connector_cache
 from app.db.db_session import SQLALCHEMY_DATABASE_URI_NO_DB
 from app.db.db_session import async_engine
+from app.db.db_session import get_db_session
 from app.db.db_setup import add_connectors
 from app.db.db_setup import apply_migrations
 from app.db.db_setup import create_available_integrations
@@ -22,9 +25,14 @@ from app.db.db_setup import create_roles
 from app.db.db_setup import ensure_admin_user
 from app.db.db_setup import ensure_scheduler_user
 from app.db.db_setup import ensure_scheduler_user_removed
+from app.integrations.monitoring_alert.utils.dispatcher import (
+    monitoring_alert_dispatcher,
+)
+from app.integrations.utils.shuffle_dispatch import shuffle_dispatcher
 from app.middleware.exception_handlers import custom_http_exception_handler
 from app.middleware.exception_handlers import validation_exception_handler
 from app.middleware.exception_handlers import value_error_handler
+from app.middleware.log_writer import request_log_writer
 from app.middleware.logger import log_requests
 from app.routers import active_response
 from app.routers import agents
@@ -152,6 +160,9 @@ async def init_db():
         await create_copilot_user_if_not_exists(db_url=SQLALCHEMY_DATABASE_URI_NO_DB, db_user_name="copilot")
     apply_migrations()
     await add_connectors(async_engine)
+    # Load the connector settings, so connector lookups do not query the database
+    async with get_db_session() as session:
+        await connector_cache.load(session)
     await create_roles(async_engine)
     await create_available_integrations(async_engine)
     await create_available_network_connectors(async_engine)
@@ -180,6 +191,10 @@ async def shutdown_scheduler():
         logger.info("Scheduler is running, shutting down now...")
         scheduler.shutdown()
 
+    await monitoring_alert_dispatcher.stop()
+    await shuffle_dispatcher.stop()
+    await close_shuffle_client()
+    await request_log_writer.stop()
     await ensure_scheduler_user_removed(async_engine)
 
 
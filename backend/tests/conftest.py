@@ -0,0 +1,6 @@
+import os
+
+# app.db.db_session reads the database credentials at import time. The tests do not connect to the database,
+# so placeholder values are enough to import the modules under test.
+os.environ.setdefault("MYSQL_PASSWORD", "test")
+os.environ.setdefault("MYSQL_ROOT_PASSWORD", "test")
@@ -0,0 +1,71 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from app.connectors.event_shipper.utils.universal import GELF_CHUNK_HEADER_SIZE
+from app.connectors.event_shipper.utils.universal import GELF_CHUNK_MAGIC
+from app.connectors.event_shipper.utils.universal import GELF_MAX_CHUNKS
+from app.connectors.event_shipper.utils.universal import GelfMessageTooLarge
+from app.connectors.event_shipper.utils.universal import build_gelf_chunks
+from app.connectors.event_shipper.utils.universal import build_gelf_message
+from app.connectors.event_shipper.utils.universal import compress_gelf_payload
+
+CHUNK_SIZE = 512
+
+
+def reassemble(chunks):
+    """
+    Reassembles GELF chunks the way a Graylog UDP input does, checking their headers on the way.
+    """
+    message_ids = {chunk[2:10] for chunk in chunks}
+    assert len(message_ids) == 1
+    total_chunks = {chunk[11] for chunk in chunks}
+    assert total_chunks == {len(chunks)}
+    parts = {}
+    for chunk in chunks:
+        assert chunk[:2] == GELF_CHUNK_MAGIC
+        assert len(chunk) <= CHUNK_SIZE
+        parts[chunk[10]] = chunk[GELF_CHUNK_HEADER_SIZE:]
+    assert sorted(parts) == list(range(len(chunks)))
+    return b"".join(parts[sequence] for sequence in range(len(chunks)))
+
+
+def event_payload(size: int) -> bytes:
+    event = {"event": os.urandom(size // 2).hex(), "source": "test"}
+    return json.dumps(build_gelf_message(event)).encode("utf-8")
+
+
+def test_small_payload_is_not_chunked():
+    payload = event_payload(100)
+    assert build_gelf_chunks(payload, CHUNK_SIZE) == [payload]
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_chunks_reassemble_to_the_payload(compression):
+    plain = event_payload(20000)
+    payload = compress_gelf_payload(plain, compression)
+
+    chunks = build_gelf_chunks(payload, CHUNK_SIZE)
+
+    assert len(chunks) > 1
+    assert [chunk[10] for chunk in chunks] == list(range(len(chunks)))
+    reassembled = reassemble(chunks)
+    assert reassembled == payload
+    if compression == "gzip":
+        reassembled = gzip.decompress(reassembled)
+    assert reassembled == plain
+
+
+def test_each_message_gets_its_own_id():
+    payload = event_payload(5000)
+    assert build_gelf_chunks(payload, CHUNK_SIZE)[0][2:10] != build_gelf_chunks(payload, CHUNK_SIZE)[0][2:10]
+
+
+def test_chunk_limit():
+    data_size = CHUNK_SIZE - GELF_CHUNK_HEADER_SIZE
+
+    assert len(build_gelf_chunks(b"x" * data_size * GELF_MAX_CHUNKS, CHUNK_SIZE)) == GELF_MAX_CHUNKS
+    with pytest.raises(GelfMessageTooLarge):
+        build_gelf_chunks(b"x" * (data_size * GELF_MAX_CHUNKS + 1), CHUNK_SIZE)
@@ -0,0 +1,106 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime as dt
+from datetime import timedelta
+from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import HTTPException
+
+from app.db.universal_models import License
+from app.middleware import license as license_module
+from app.middleware.license import LICENSE_OFFLINE_GRACE_HOURS
+from app.middleware.license import LICENSE_VERIFICATION_TTL_SECONDS
+from app.middleware.license import get_license_verification
+from app.middleware.license import license_verification_cache
+
+FEATURES = ["MONITORING ALERTS", "SAP SIEM"]
+
+
+def verified_license(age: timedelta) -> License:
+    return License(
+        id=1,
+        license_key="license-key",
+        customer_name="Customer",
+        customer_email="customer@example.com",
+        company_name="Company",
+        verified_features=json.dumps(FEATURES),
+        verified_at=dt.utcnow() - age,
+    )
+
+
+@pytest.fixture
+def license_server(monkeypatch):
+    """
+    Replaces the database and the license server, returning the session and the mock answering the
+    verification requests.
+    """
+    session = MagicMock(commit=AsyncMock())
+
+    @asynccontextmanager
+    async def get_db_session():
+        yield session
+
+    send_post_request = AsyncMock()
+    monkeypatch.setattr(license_module, "get_db_session", get_db_session)
+    monkeypatch.setattr(license_module, "send_post_request", send_post_request)
+    monkeypatch.setattr(license_module, "license_refresh_task", None)
+    license_verification_cache.clear()
+    yield session, send_post_request
+    license_verification_cache.clear()
+
+
+def check_license(monkeypatch, session, license: License):
+    """
+    Checks the license the way the feature checks do and waits for the background refresh it started.
+    """
+    monkeypatch.setattr(license_module, "get_license", AsyncMock(return_value=license))
+
+    async def main():
+        verification = await get_license_verification(session)
+        if license_module.license_refresh_task is not None:
+            await license_module.license_refresh_task
+        return verification
+
+    return asyncio.run(main())
+
+
+def test_server_error_within_grace_keeps_the_verification(monkeypatch, license_server):
+    session, send_post_request = license_server
+    send_post_request.return_value = {"success": False, "message": "Failed to send POST request to verify-license"}
+    license = verified_license(timedelta(seconds=LICENSE_VERIFICATION_TTL_SECONDS + 60))
+    verified_at = license.verified_at
+
+    verification = check_license(monkeypatch, session, license)
+
+    send_post_request.assert_awaited_once()
+    assert verification.features == set(FEATURES)
+    assert license_verification_cache[license.license_key] is verification
+    assert (license.verified_at, license.verified_features) == (verified_at, json.dumps(FEATURES))
+
+
+def test_server_error_after_grace_is_unavailable(monkeypatch, license_server):
+    session, send_post_request = license_server
+    send_post_request.return_value = {"success": False, "message": "Failed to send POST request to verify-license"}
+    license = verified_license(timedelta(seconds=LICENSE_VERIFICATION_TTL_SECONDS, hours=LICENSE_OFFLINE_GRACE_HOURS + 1))
+
+    with pytest.raises(HTTPException) as error:
+        check_license(monkeypatch, session, license)
+
+    assert error.value.status_code == 503
+    assert license.verified_features == json.dumps(FEATURES)
+
+
+def test_rejected_license_is_revoked(monkeypatch, license_server):
+    session, send_post_request = license_server
+    send_post_request.return_value = {"success": True, "data": {"success": False, "message": "Invalid license key"}}
+    license = verified_license(timedelta(seconds=LICENSE_VERIFICATION_TTL_SECONDS, hours=LICENSE_OFFLINE_GRACE_HOURS + 1))
+
+    with pytest.raises(HTTPException) as error:
+        check_license(monkeypatch, session, license)
+
+    assert error.value.status_code == 403
+    assert (license.verified_at, license.verified_features) == (None, None)
+    assert license.license_key not in license_verification_cache
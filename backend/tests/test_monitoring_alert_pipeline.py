@@ -0,0 +1,102 @@
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock
+
+from app.integrations.monitoring_alert.models.monitoring_alert import MonitoringAlerts
+from app.integrations.monitoring_alert.utils import pipeline
+from app.integrations.monitoring_alert.utils.coalescing import alert_coalescer
+from app.integrations.monitoring_alert.utils.coalescing import coalesce_alert
+from app.integrations.monitoring_alert.utils.pipeline import AlertExcluded
+from app.integrations.monitoring_alert.utils.pipeline import run_analysis_pipeline
+
+
+def queue_alerts(monkeypatch, alerts):
+    """
+    Replaces the database with a queue holding `alerts`, returning the mock that settles the claimed batches.
+    """
+
+    @asynccontextmanager
+    async def get_db_session():
+        yield AsyncMock()
+
+    batches = [alerts]
+
+    async def claim_alerts(customer_code, alert_source, session, after_id=None):
+        return batches.pop(0) if batches else []
+
+    settle_alerts = AsyncMock()
+    monkeypatch.setattr(pipeline, "get_db_session", get_db_session)
+    monkeypatch.setattr(pipeline, "claim_alerts", claim_alerts)
+    monkeypatch.setattr(pipeline, "settle_alerts", settle_alerts)
+    monkeypatch.setattr(alert_coalescer, "flush", AsyncMock())
+    return settle_alerts
+
+
+def monitoring_alert(alert_id: int) -> MonitoringAlerts:
+    return MonitoringAlerts(
+        id=alert_id,
+        alert_id=f"doc-{alert_id}",
+        alert_index="wazuh-alerts",
+        customer_code="00001",
+        alert_source="WAZUH",
+    )
+
+
+def test_excluded_alert_is_acknowledged(monkeypatch):
+    settle_alerts = queue_alerts(monkeypatch, [monitoring_alert(1), monitoring_alert(2)])
+
+    async def analyze_alert(alert, session, document):
+        if alert.id == 1:
+            raise AlertExcluded("Alert excluded due to multi exclusion as set in the config.ini file.")
+
+    result = asyncio.run(run_analysis_pipeline("WAZUH", ["00001"], analyze_alert, workers=1))
+
+    assert (result.claimed, result.analyzed, result.excluded, result.failed) == (2, 1, 1, 0)
+    # Both alerts are acknowledged, so the excluded one is not claimed again
+    settle_alerts.assert_awaited_once()
+    claimed_ids, processed_ids, _ = settle_alerts.await_args.args
+    assert claimed_ids == [1, 2]
+    assert sorted(processed_ids) == [1, 2]
+
+
+def test_failed_alert_is_released(monkeypatch):
+    settle_alerts = queue_alerts(monkeypatch, [monitoring_alert(1), monitoring_alert(2)])
+
+    async def analyze_alert(alert, session, document):
+        if alert.id == 1:
+            raise RuntimeError("IRIS unavailable")
+
+    result = asyncio.run(run_analysis_pipeline("WAZUH", ["00001"], analyze_alert, workers=1))
+
+    assert (result.analyzed, result.excluded, result.failed) == (1, 0, 1)
+    _, processed_ids, _ = settle_alerts.await_args.args
+    assert processed_ids == [2]
+
+
+def test_escalations_of_the_same_rule_run_one_at_a_time():
+    running = set()
+    overlaps = []
+
+    async def escalate(rule_id: str, asset: str) -> int:
+        overlaps.extend((rule_id, other) for other in running if other[0] == rule_id)
+        running.add((rule_id, asset))
+        await asyncio.sleep(0.01)
+        running.discard((rule_id, asset))
+        return 1
+
+    async def analyze(rule_id: str, asset: str) -> int:
+        return await coalesce_alert(
+            key=("WAZUH", "00001", rule_id, asset),
+            alert=AsyncMock(alert_id=f"{rule_id}-{asset}"),
+            seen_at=None,
+            escalate=lambda: escalate(rule_id, asset),
+            session=AsyncMock(),
+        )
+
+    async def main():
+        await asyncio.gather(*(analyze(rule_id, asset) for rule_id in ("100", "200") for asset in ("host-a", "host-b", "host-c")))
+
+    asyncio.run(main())
+    alert_coalescer.entries.clear()
+    # Different rules still escalate concurrently, the same rule on other assets waits
+    assert overlaps == []
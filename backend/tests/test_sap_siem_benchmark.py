@@ -0,0 +1,85 @@
+import asyncio
+import os
+import sys
+
+import pytest
+from loguru import logger
+
+from app.integrations.sap_siem.utils.benchmark import generate_events
+from app.integrations.sap_siem.utils.benchmark import replay_events
+
+SMALL = 500
+LARGE = 2000
+
+# Detections per detector for the default seed of `generate_events`. A change here means a detector finds
+# different suspicious logins in the same events.
+EXPECTED_DETECTIONS = {
+    SMALL: {
+        "successful_user_login_with_different_ip": 2,
+        "same_user_failed_login_from_different_ip": 28,
+        "same_user_failed_login_from_different_geo_location": 28,
+        "same_user_successful_login_from_different_geo_location": 2,
+        "brute_force_failed_logins_multiple_ips": 2,
+        "brute_force_failed_logins_same_ip": 4,
+        "successful_login_after_multiple_failed_logins": 2,
+        "multiple_logins_same_ip": 3,
+        "suspicious_logins": 2,
+    },
+    LARGE: {
+        "successful_user_login_with_different_ip": 8,
+        "same_user_failed_login_from_different_ip": 64,
+        "same_user_failed_login_from_different_geo_location": 64,
+        "same_user_successful_login_from_different_geo_location": 8,
+        "brute_force_failed_logins_multiple_ips": 4,
+        "brute_force_failed_logins_same_ip": 37,
+        "successful_login_after_multiple_failed_logins": 8,
+        "multiple_logins_same_ip": 88,
+        "suspicious_logins": 8,
+    },
+}
+
+
+@pytest.fixture(scope="module")
+def reports():
+    """
+    Replays the synthetic events at both sizes once for all tests, without the per-hit debug logging.
+    """
+    logger.remove()
+    handler = logger.add(sys.stderr, level="WARNING")
+    try:
+        yield {size: asyncio.run(replay_events(generate_events(size))) for size in (SMALL, LARGE)}
+    finally:
+        logger.remove(handler)
+        logger.add(sys.stderr)
+
+
+@pytest.mark.parametrize("size", [SMALL, LARGE])
+def test_every_event_is_scanned(reports, size):
+    report = reports[size]
+    assert report["events_scanned"] == size
+    assert len(report["detectors"]) == 9
+    for name, detector in report["detectors"].items():
+        # multiple_logins_same_ip only looks at successful logins
+        if name != "multiple_logins_same_ip":
+            assert detector["events_processed"] == size
+
+
+@pytest.mark.parametrize("size", [SMALL, LARGE])
+def test_detections(reports, size):
+    detections = {name: detector["detections"] for name, detector in reports[size]["detectors"].items()}
+    assert detections == EXPECTED_DETECTIONS[size]
+
+
+def test_memory_grows_linearly(reports):
+    # Four times the events should take about four times as much memory. The allocations of a replay do not
+    # depend on the machine, so the bound only needs to leave room for a detector that goes quadratic.
+    small, large = reports[SMALL], reports[LARGE]
+    assert large["peak_memory"] <= 2.5 * LARGE / SMALL * small["peak_memory"]
+
+
+@pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="Wall clock timings are only checked with RUN_BENCHMARKS=1")
+def test_time_grows_linearly(reports):
+    # Four times the events should take about four times as long. Timings depend on the load of the machine,
+    # so this only runs when asked for.
+    small, large = reports[SMALL], reports[LARGE]
+    assert large["seconds"] / LARGE <= 2.5 * small["seconds"] / SMALL
@@ -13,8 +13,11 @@ type KeysOfLogsQuery<T> = T extends { [K in keyof T]: any } ? keyof T : never
 export type LogsQueryTypes = KeysOfLogsQuery<LogsQuery>
 export type LogsQueryValues = string | LogsQueryTimeRange | LogsQueryEventType
 
+type LogsResponse = FlaskBaseResponse & { logs: Log[]; next_cursor: string | null }
+
 export default {
-	getLogs(query?: LogsQuery) {
+	/** one page of logs, newest first; pass the next_cursor of a page to get the page after it */
+	getLogs(query?: LogsQuery, cursor?: string) {
 		let method: "get" | "post" = "get"
 		let url = "logs"
 		let body: any = undefined
@@ -35,7 +38,11 @@ export default {
 			body = undefined
 		}
 
-		return HttpClient[method]<FlaskBaseResponse & { logs: Log[] }>(url, body)
+		const config = { params: cursor ? { cursor } : undefined }
+
+		return method === "get"
+			? HttpClient.get<LogsResponse>(url, config)
+			: HttpClient.post<LogsResponse>(url, body, config)
 	},
 	purge(timeRange?: LogsQueryTimeRange) {
 		const url = timeRange ? `/logs/timerange` : `/logs`